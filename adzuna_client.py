@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import TokenBucket
+import metrics
+
+# --- Adzuna client settings ---
+ADZUNA_BASE_URL = os.getenv("ADZUNA_BASE_URL", "https://api.adzuna.com/v1/api/jobs")
+ADZUNA_CONNECT_TIMEOUT = float(os.getenv("ADZUNA_CONNECT_TIMEOUT", "3.05"))
+ADZUNA_READ_TIMEOUT = float(os.getenv("ADZUNA_READ_TIMEOUT", "10"))
+ADZUNA_CACHE_TTL = float(os.getenv("ADZUNA_CACHE_TTL", "900"))
+ADZUNA_CACHE_SIZE = int(os.getenv("ADZUNA_CACHE_SIZE", "4096"))
+ADZUNA_REQUESTS_PER_MINUTE = float(os.getenv("ADZUNA_REQUESTS_PER_MINUTE", "25"))
+ADZUNA_MAX_WORKERS = int(os.getenv("ADZUNA_MAX_WORKERS", "8"))
+
+
+class AdzunaError(Exception):
+    def __init__(self, message, status=None, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class AdzunaClient:
+    """
+    Adzuna job search client.
+
+    One pooled `requests.Session` with explicit connect/read timeouts, a TTL
+    cache keyed on (country, what, where, distance, page, results_per_page),
+    and a token bucket so the app stays under its Adzuna quota.
+    `count_many` runs several count queries concurrently.
+    """
+
+    def __init__(self, app_id=None, app_key=None, base_url=None, session=None,
+                 cache_ttl=None, cache_size=None, requests_per_minute=None, max_workers=None):
+        self.app_id = app_id if app_id is not None else os.getenv("ADZUNA_APP_ID")
+        self.app_key = app_key if app_key is not None else os.getenv("ADZUNA_APP_KEY")
+        self.base_url = (base_url or ADZUNA_BASE_URL).rstrip("/")
+        self.timeout = (ADZUNA_CONNECT_TIMEOUT, ADZUNA_READ_TIMEOUT)
+        self.cache_ttl = ADZUNA_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_size = cache_size or ADZUNA_CACHE_SIZE
+        self.max_workers = max_workers or ADZUNA_MAX_WORKERS
+        self.limiter = TokenBucket.per_minute(requests_per_minute or ADZUNA_REQUESTS_PER_MINUTE)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "requests": 0, "errors": 0}
+
+    @property
+    def configured(self):
+        return bool(self.app_id and self.app_key)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # --- Cache ---
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] < time.time():
+                self.stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = (time.time() + self.cache_ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # --- API ---
+
+    def search(self, country, what, where, distance=None, page=1, results_per_page=10):
+        """Raw search response as a dict; raises AdzunaError on HTTP, network or decoding failure."""
+        if not self.configured:
+            raise AdzunaError("Missing Adzuna credentials")
+
+        key = (country, what, where, distance, page, results_per_page)
+        cached = self._cache_get(key)
+        metrics.cache("adzuna", hits=cached is not None, misses=cached is None)
+        if cached is not None:
+            return cached
+
+        params = {
+            "app_id": self.app_id,
+            "app_key": self.app_key,
+            "what": what,
+            "where": where,
+            "results_per_page": results_per_page,
+        }
+        if distance is not None:
+            params["distance"] = distance
+
+        self.limiter.acquire()
+        self._count("requests")
+        url = f"{self.base_url}/{country}/search/{page}"
+        try:
+            with metrics.timer("adzuna.search"):
+                response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._count("errors")
+            raise AdzunaError(str(e)) from e
+
+        if response.status_code != 200:
+            self._count("errors")
+            raise AdzunaError("Adzuna API request failed", status=response.status_code,
+                              details=response.text)
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            self._count("errors")
+            raise AdzunaError("Adzuna returned a malformed response", status=response.status_code,
+                              details=response.text[:500]) from e
+        self._cache_put(key, data)
+        return data
+
+    def count(self, country, what, where, distance=None):
+        """Total number of matching jobs (fetches a single result)."""
+        return self.search(country, what, where, distance=distance, results_per_page=1).get("count", 0)
+
+    def count_many(self, queries):
+        """
+        Runs count queries concurrently. Each query is a dict of `count` kwargs;
+        returns counts in the same order, with None for queries that failed.
+        """
+        def run(query):
+            try:
+                return self.count(**query)
+            except AdzunaError as e:
+                print(f"⚠️ Adzuna count failed for {query.get('what')!r}: {e}")
+                return None
+
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as pool:
+            return list(pool.map(run, queries))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_adzuna_client():
+    """Process-wide AdzunaClient using ADZUNA_APP_ID / ADZUNA_APP_KEY."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AdzunaClient()
+        return _client
@@ -1,6 +1,8 @@
 import os
-import requests
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from adzuna_client import AdzunaError, get_adzuna_client
 
 # Load Adzuna credentials from environment
 ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID")
@@ -41,6 +43,12 @@ def clean_keywords(text):
 def map_keywords_to_roles(keywords):
     return list(set(KEYWORD_TO_ROLE[k] for k in keywords if k in KEYWORD_TO_ROLE))
 
+# Adzuna "what" terms for free-text keywords (sorted, so equal inputs share a cache entry)
+def build_search_terms(keywords):
+    keyword_list = sorted(clean_keywords(keywords))
+    role_terms = sorted(map_keywords_to_roles(keyword_list))
+    return " ".join(role_terms[:3]) if role_terms else " ".join(keyword_list[:5])
+
 # Infer country from location
 def detect_country(location):
     if not location:
@@ -57,72 +65,122 @@ def query_jobs(keywords, location="London", max_results=10):
         return {"error": "Missing Adzuna credentials"}
 
     country_code = detect_country(location)
-    keyword_list = clean_keywords(keywords)
-    role_terms = map_keywords_to_roles(keyword_list)
-    search_terms = " ".join(role_terms[:3]) if role_terms else " ".join(keyword_list[:5])
-
-    url = f"https://api.adzuna.com/v1/api/jobs/{country_code}/search/1"
-    params = {
-        "app_id": ADZUNA_APP_ID,
-        "app_key": ADZUNA_APP_KEY,
-        "what": search_terms,
-        "where": location,
-        "results_per_page": max_results,
-    }
+    search_terms = build_search_terms(keywords)
 
     try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "count": data.get("count", 0),
-                "examples": [
-                    {
-                        "title": job.get("title"),
-                        "description": job.get("description", ""),
-                        "url": job.get("redirect_url", "")
-                    }
-                    for job in data.get("results", [])
-                ]
-            }
-        else:
-            return {
-                "error": "Adzuna API request failed",
-                "status": response.status_code,
-                "details": response.text
-            }
+        data = get_adzuna_client().search(country_code, search_terms, location, results_per_page=max_results)
+        return {
+            "count": data.get("count", 0),
+            "examples": [
+                {
+                    "title": job.get("title"),
+                    "description": job.get("description", ""),
+                    "url": job.get("redirect_url", "")
+                }
+                for job in data.get("results", [])
+            ]
+        }
+    except AdzunaError as e:
+        if e.status is None:
+            return {"error": str(e)}
+        return {
+            "error": "Adzuna API request failed",
+            "status": e.status,
+            "details": e.details
+        }
     except Exception as e:
         return {"error": str(e)}
 
+# Words that show up in job ads but are never skills
+STOPWORDS = frozenset("""
+about above across after again against all also and any are around as because been before being
+below between both but can could did does doing during each etc every few for from further had has
+have having her here hers his how including into its just least less like may more most much must
+near need needs new not now off once only other our ours out over own per plus role roles same
+seeking she should some such than that the their theirs them then there these they this those
+through too under until upon using very via want was way well were what when where which while
+who whom why will with within without work working would year years you your yours
+ability able apply applicants applications benefits business candidate candidates client clients
+company competitive contract day days environment excellent experience full good great help hire
+hours job jobs join junior knowledge looking lead level manager offer opportunity part permanent
+position salary senior skills strong successful support team teams time training
+""".split())
+
+SKILL_EXPANSION_CANDIDATES = int(os.getenv("SKILL_EXPANSION_CANDIDATES", "10"))
+
+
+def candidate_skills(examples, current_skills, limit=SKILL_EXPANSION_CANDIDATES):
+    """Most common non-stopword terms across job ads (counted once per ad), minus skills already held."""
+    held = set(s.lower() for s in current_skills)
+    freq = Counter()
+    for job in examples:
+        freq.update(clean_keywords(f"{job.get('title', '')} {job.get('description', '')}"))
+    # Ties break alphabetically; clean_keywords' set order differs between processes
+    ranked = sorted(freq.items(), key=lambda item: (-item[1], item[0]))
+    return [word for word, _ in ranked
+            if word not in STOPWORDS and word not in held and not word.isdigit()][:limit]
+
+
 # Suggest additional skills to unlock more jobs
 def suggest_skill_expansion(current_skills, location, max_skills=3):
+    """
+    Suggests up to `max_skills` skills that would unlock more jobs.
+
+    The base 50-result search is cached by the Adzuna client, so repeat calls
+    for the same (skills, location) reuse its count. What-if counts for each
+    candidate skill run concurrently as one-result queries; candidates whose
+    search terms equal the base terms are skipped. Ties keep the candidates'
+    frequency order, so the same inputs always give the same suggestions.
+
+    No what-if search can match more jobs than the location holds in total,
+    so once the top `max_skills` suggestions each unlock that ceiling the
+    remaining candidates cannot beat them and their unsent queries are cancelled.
+    """
     base_result = query_jobs(keywords=" ".join(current_skills), location=location, max_results=50)
     if "examples" not in base_result or not base_result["examples"]:
         return []
 
-    all_descriptions = []
-    for job in base_result["examples"]:
-        text = f"{job.get('title', '')} {job.get('description', '')}"
-        all_descriptions.append(text.lower())
-
-    combined_text = " ".join(all_descriptions)
-    all_words = clean_keywords(combined_text)
-    skill_candidates = [word for word in all_words if word not in current_skills]
-
-    freq = {}
-    for word in skill_candidates:
-        freq[word] = freq.get(word, 0) + 1
-
-    sorted_skills = sorted(freq.items(), key=lambda x: x[1], reverse=True)
+    client = get_adzuna_client()
+    country_code = detect_country(location)
+    base_terms = build_search_terms(" ".join(current_skills))
+    base_count = base_result.get("count", 0)
+
+    queries = {}
+    for skill in candidate_skills(base_result["examples"], current_skills):
+        terms = build_search_terms(" ".join(list(current_skills) + [skill]))
+        if terms != base_terms:
+            queries[skill] = terms
+    if not queries:
+        return []
 
     suggestions = []
-    for skill, _ in sorted_skills[:10]:
-        simulated = query_jobs(keywords=" ".join(current_skills + [skill]), location=location, max_results=50)
-        extra_jobs = max(0, simulated.get("count", 0) - base_result.get("count", 0))
-        if extra_jobs > 0:
-            suggestions.append({
-                "skill": skill,
-                "extra_jobs_unlocked": extra_jobs
-            })
+    with ThreadPoolExecutor(max_workers=min(client.max_workers, len(queries))) as pool:
+        futures = {skill: pool.submit(client.count, country_code, terms, location)
+                   for skill, terms in queries.items()}
+        try:
+            bound = max(0, client.count(country_code, "", location) - base_count)
+        except AdzunaError as e:
+            print(f"⚠️ Skill expansion ceiling query failed: {e}")
+            bound = None
+        # Results are read in frequency order, so a later candidate only displaces
+        # one of the current top `max_skills` by unlocking strictly more jobs
+        pending = list(futures.items())
+        for i, (skill, future) in enumerate(pending):
+            try:
+                extra_jobs = max(0, future.result() - base_count)
+            except AdzunaError as e:
+                print(f"⚠️ Skill expansion query failed for {skill!r}: {e}")
+                continue
+            if extra_jobs > 0:
+                suggestions.append({
+                    "skill": skill,
+                    "extra_jobs_unlocked": extra_jobs
+                })
+            if bound is None or not 0 < max_skills <= len(suggestions):
+                continue
+            if sorted(s["extra_jobs_unlocked"] for s in suggestions)[-max_skills] >= bound:
+                for _, rest in pending[i + 1:]:
+                    rest.cancel()
+                break
 
     return sorted(suggestions, key=lambda x: x["extra_jobs_unlocked"], reverse=True)[:max_skills]
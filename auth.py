@@ -1,31 +1,23 @@
-import bcrypt
-from flask import Blueprint, request, redirect, render_template
-from sheets import get_gspread_client
+from functools import wraps
+from flask import Blueprint, request, redirect, render_template, g
+from repository import get_users_repository, get_candidates_repository, USERS_SHEET_NAME
+from sessions import (get_session_manager, fetch_profile, hash_password, check_password,
+                      SESSION_COOKIE_NAME, SESSION_COOKIE_SECURE)
 import os
 
 # Create Blueprint for authentication
 auth = Blueprint("auth", __name__)
 
-SHEET_NAME = "AI Talent Users"
+SHEET_NAME = USERS_SHEET_NAME
 
-# Function to retrieve a user by email from Google Sheets
+# Function to retrieve a user by email (cached, indexed lookup over the users sheet)
 def get_user_from_sheet(email):
-    client = get_gspread_client()
-    sheet = client.open(SHEET_NAME).sheet1
-    users = sheet.get_all_records()
-
-    for user in users:
-        if user["Email"].strip().lower() == email.strip().lower():
-            return user
-    return None
+    return get_users_repository().get(email)
 
 # Function to add a new user to Google Sheets
 def add_user_to_sheet(name, email, hashed_pwd, user_type, radius="50"):
-    client = get_gspread_client()
-
     # Add to AI Talent Users sheet
-    users_sheet = client.open(SHEET_NAME).sheet1
-    users_sheet.append_row([name, email, hashed_pwd.decode("utf-8"), user_type])
+    get_users_repository().append([name, email, hashed_pwd.decode("utf-8"), user_type])
     print(f"✅ Added user to {SHEET_NAME}")
 
     # If the user is a candidate, add a stub row to the Candidates sheet
@@ -37,17 +29,63 @@ def add_user_to_sheet(name, email, hashed_pwd, user_type, radius="50"):
             raise ValueError("❌ Environment variable CANDIDATES_SHEET_ID is missing.")
 
         try:
-            candidates_sheet = client.open_by_key(sheet_id).sheet1
             new_row = [""] * 11
             new_row[0] = email
             new_row[1] = name
             new_row[10] = radius  # Radius always in column K
-            candidates_sheet.append_row(new_row)
+            get_candidates_repository().append(new_row)
             print(f"✅ Stub row added to Candidates sheet for {email}")
         except Exception as e:
             print(f"🔥 Failed to write to Candidates sheet: {e}")
             raise
 
+# --- Sessions ---
+
+def set_session_cookie(response, token):
+    response.set_cookie(SESSION_COOKIE_NAME, token, max_age=get_session_manager().max_age,
+                        httponly=True, samesite="Lax", secure=SESSION_COOKIE_SECURE)
+    return response
+
+def current_session():
+    """Verified claims from the session cookie (or an `Authorization: Bearer` token), else None."""
+    token = request.cookies.get(SESSION_COOKIE_NAME)
+    header = request.headers.get("Authorization", "")
+    if not token and header.startswith("Bearer "):
+        token = header[len("Bearer "):].strip()
+    return get_session_manager().verify(token)
+
+def login_required(user_type=None):
+    """
+    Route decorator: sets g.session (token claims) and g.profile (cached
+    profile), or answers 401 (redirects page loads to the login form).
+    When the profile was refetched at a new version the response carries a
+    reissued session cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            claims = current_session()
+            profile, token = get_session_manager().resolve(claims) if claims else (None, None)
+            if profile is None or (user_type and claims["typ"] != user_type):
+                if request.method == "GET":
+                    return redirect("/auth/login")
+                return {"success": False, "error": "Not signed in."}, 401
+            g.session, g.profile = claims, profile
+            if token:
+                g.reissued_token = token
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@auth.after_app_request
+def _reissue_session_cookie(response):
+    """Sends the token for a profile that moved on, unless the view already set a session cookie."""
+    token = g.pop("reissued_token", None)
+    if token and not any(header.startswith(f"{SESSION_COOKIE_NAME}=")
+                         for header in response.headers.getlist("Set-Cookie")):
+        set_session_cookie(response, token)
+    return response
+
 # Route for signup page (GET and POST methods)
 @auth.route("/signup", methods=["GET", "POST"])
 def signup():
@@ -67,8 +105,8 @@ def signup():
     if get_user_from_sheet(email):
         return "User already exists", 400
 
-    # Hash the password
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    # Hash the password (on the bcrypt pool, off the request thread)
+    hashed = hash_password(password)
 
     try:
         print(f"🔐 Registering user: {email}")
@@ -96,15 +134,17 @@ def login():
     if not user:
         return "Invalid credentials", 401
 
-    stored_hash = user["Password_Hash"].encode("utf-8")
-    if not bcrypt.checkpw(password.encode("utf-8"), stored_hash):
+    if not check_password(password, str(user.get("Password_Hash", ""))):
         return "Invalid credentials", 401
 
     # Debugging to check the user type
     print(f"User {email} of type {user['Type']} logged in.")
 
+    # Issue a signed session; later requests read the profile from the per-worker cache
+    token = get_session_manager().start(fetch_profile(email))
+
     # Redirect to the appropriate dashboard based on user type
     if user["Type"].strip().lower() == "candidate":
-        return redirect(f"/dashboard?email={email}")
+        return set_session_cookie(redirect("/dashboard"), token)
     else:
-        return redirect("/employer_dashboard")
+        return set_session_cookie(redirect("/employer_dashboard"), token)
@@ -0,0 +1,63 @@
+"""
+Cold-start benchmark: in fresh interpreters, times `import main` and the first
+request to a cheap route, then prints the app's startup report.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; the workers are not started here, so the figure is import + Flask dispatch
+PROBE = """
+import json, os, sys, time, contextlib
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+with contextlib.redirect_stdout(sys.stderr):
+    import main
+imported = time.perf_counter()
+main._workers_started = True
+with main.app.test_client() as client:
+    client.get({route!r})
+served = time.perf_counter()
+import services
+print(json.dumps({{
+    "import_ms": round((imported - started) * 1000, 2),
+    "first_request_ms": round((served - imported) * 1000, 2),
+    "modules": len(sys.modules),
+    "report": services.startup_report(),
+}}))
+"""
+
+
+def run_once(route):
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"))
+    out = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, route=route)],
+                         capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--route", default="/health")
+    args = parser.parse_args()
+
+    runs = [run_once(args.route) for _ in range(args.runs)]
+    summary = {
+        "runs": args.runs,
+        "import_ms_median": statistics.median(r["import_ms"] for r in runs),
+        "first_request_ms_median": statistics.median(r["first_request_ms"] for r in runs),
+        "modules": runs[-1]["modules"],
+        "report": runs[-1]["report"],
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
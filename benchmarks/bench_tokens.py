@@ -0,0 +1,83 @@
+"""
+Microbenchmark: per-request cost of keyword overlap, reasons and missing-skill
+lists with inline tokenization (the old match_jobs loop) vs. cached token sets.
+
+    python benchmarks/bench_tokens.py --jobs 500 --requests 50
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_tokens import token_set, skill_set, overlap_counts, clear_cache  # noqa: E402
+
+VOCAB = ["python", "java", "sql", "aws", "react", "engineer", "data", "cloud", "team",
+         "automation", "plc", "scada", "process", "design", "build", "(remote)", "senior",
+         "manage", "pipelines", "api", "testing", "customer", "growth", "analytics"]
+
+
+def make_text(rng, words):
+    return " ".join(rng.choice(VOCAB) + rng.choice(["", ",", ".", ""]) for _ in range(words))
+
+
+def inline_request(summary, skills, job_summaries):
+    for job_summary in job_summaries:
+        summary_words = set(word.lower().strip(".,()") for word in summary.split())
+        job_words = set(word.lower().strip(".,()") for word in job_summary.split())
+        ", ".join(summary_words & job_words)
+        job_keywords = set(word.lower().strip(".,()") for word in job_summary.split())
+        cand_keywords = set(word.lower().strip() for word in skills.split(","))
+        list(job_keywords - cand_keywords)[:5]
+
+
+def cached_request(summary, skills, job_summaries):
+    summary_words = token_set(summary)
+    cand_keywords = skill_set(skills)
+    for job_summary in job_summaries:
+        job_words = token_set(job_summary)
+        ", ".join(summary_words & job_words)
+        list(job_words - cand_keywords)[:5]
+
+
+def vectorized_request(summary, skills, job_summaries):
+    overlap_counts(summary, job_summaries)
+
+
+def bench(fn, requests, args):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    job_summaries = [make_text(rng, args.words) for _ in range(args.jobs)]
+    summary = make_text(rng, args.words)
+    skills = ", ".join(rng.sample(VOCAB, 5))
+
+    clear_cache()
+    cached_request(summary, skills, job_summaries)  # warm the cache, as earlier requests would
+    overlap_counts(summary, job_summaries)
+
+    print(f"{args.jobs} jobs × {args.words} words, {args.requests} requests (p50 / max, ms)")
+    for name, fn in [("inline", inline_request), ("cached sets", cached_request),
+                     ("hashed ids", vectorized_request)]:
+        p50, worst = bench(fn, args.requests, (summary, skills, job_summaries))
+        print(f"  {name:<12} {p50:8.2f} {worst:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memory / recall trade-off of the compact vector codecs (vector_codec) used by
+reverse matching, on synthetic embeddings whose information is front-loaded
+the way Matryoshka-trained models (text-embedding-3-*) are.
+
+For every codec × search-dimension setting it reports resident bytes per
+vector (and MB per million), recall@k against an exact float32 scan, with
+and without the exact re-rank of a shortlist, and the median query time.
+It also prints the size of one sheet cell in each storage format.
+
+    python benchmarks/bench_vectors.py --n 50000 --dim 3072 --out vectors.json
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_codec import QuantizedMatrix
+from embedding_store import serialize_embedding, CELL_FORMATS
+
+
+def make_vectors(n, dim, clusters=256, decay=0.6, seed=0):
+    """Clustered unit vectors whose per-dimension scale decays as (i + 1) ** -decay."""
+    rng = np.random.default_rng(seed)
+    weights = (np.arange(dim, dtype=np.float32) + 1) ** -decay
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 8192):
+        stop = min(start + 8192, n)
+        assign = rng.integers(0, clusters, stop - start)
+        block = centers[assign] + 0.8 * rng.standard_normal((stop - start, dim)).astype(np.float32)
+        vectors[start:stop] = block * weights
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors, q, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), q)]
+    noisy = picks + 0.02 * rng.standard_normal(picks.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def top_k(scores, k):
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def run_setting(vectors, queries, truth, codec, dims, k, rerank_factor):
+    n, dim = vectors.shape
+    matrix = QuantizedMatrix(dim, codec=codec, dims=dims, capacity=n)
+    for row in range(n):
+        matrix.set(row, vectors[row])
+
+    recalls, timings = [], []
+    shortlist = k * max(1, rerank_factor)
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        scores = matrix.scores(query, n)
+        top = top_k(scores, min(shortlist, n))
+        if rerank_factor and not matrix.exact:
+            # Exact re-rank of the shortlist against full-precision rows, as ReverseMatcher does
+            exact = vectors[np.sort(top)] @ query
+            top = np.sort(top)[np.argsort(-exact)]
+        top = top[:k]
+        timings.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(top.tolist()) & set(expected.tolist())) / k)
+
+    return {
+        "codec": codec,
+        "search_dims": matrix.dim,
+        "rerank_factor": rerank_factor,
+        "bytes_per_vector": matrix.bytes_per_vector(),
+        "mb_per_million": round(matrix.bytes_per_vector() * 1_000_000 / 2**20, 1),
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "p50_query_ms": round(statistics.median(timings), 2),
+    }
+
+
+def cell_sizes(vector):
+    sizes = {fmt: len(serialize_embedding(vector, fmt)) for fmt in CELL_FORMATS}
+    sizes["json"] = len(base64.b64encode(json.dumps(vector.tolist()).encode()))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector codec memory/recall benchmark")
+    parser.add_argument("--n", type=int, default=20000, help="Stored vectors")
+    parser.add_argument("--dim", type=int, default=3072, help="Full embedding size")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", default="0,1024,512,256", help="Search dimensions to try (0 = full)")
+    parser.add_argument("--codecs", default="float32,float16,int8")
+    parser.add_argument("--rerank", type=int, default=4, help="Re-rank shortlist factor for lossy settings")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.n, args.dim)
+    queries = make_queries(vectors, args.queries)
+    truth = [top_k(vectors @ q, args.k) for q in queries]
+
+    results = []
+    for codec in [c.strip() for c in args.codecs.split(",") if c.strip()]:
+        for dims in [int(d) for d in args.dims.split(",") if d.strip()]:
+            exact = codec == "float32" and dims in (0, args.dim)
+            for rerank_factor in ([0] if exact else [0, args.rerank]):
+                result = run_setting(vectors, queries, truth, codec, dims, args.k, rerank_factor)
+                results.append(result)
+                print(json.dumps(result))
+
+    report = {
+        "config": vars(args),
+        "full_precision_mb_per_million": round(args.dim * 4 * 1_000_000 / 2**20, 1),
+        "cell_chars": cell_sizes(vectors[0]),
+        "results": results,
+    }
+    print(json.dumps({k: v for k, v in report.items() if k != "results"}, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Seeded synthetic candidates, jobs and user accounts shaped like the real sheets."""
+import random
+
+SKILLS = ["python", "sql", "aws", "react", "javascript", "css", "html", "docker", "kubernetes",
+          "terraform", "java", "node", "api", "excel", "tableau", "plc", "scada", "dcs",
+          "automation", "process", "refinery", "django", "flask", "spark", "airflow"]
+CITIES = ["London", "Manchester", "Leeds", "Birmingham", "Glasgow", "Bristol", "Reading",
+          "Cambridge", "Oxford", "Nowhere Town"]
+ROLES = ["software engineer", "data analyst", "cloud engineer", "automation engineer",
+         "frontend developer", "process engineer", "python developer"]
+FILLER = ["building", "reliable", "systems", "with", "a", "small", "team", "delivering",
+          "pipelines", "dashboards", "for", "clients", "across", "the", "uk"]
+
+
+def _summary(rng, skills, words=30):
+    text = [rng.choice(ROLES)] + skills + [rng.choice(FILLER) for _ in range(words)]
+    rng.shuffle(text)
+    return " ".join(text)
+
+
+def make_candidates(n, seed=0):
+    """Rows for the Candidates sheet (CANDIDATE_COLUMNS), embeddings left blank."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        skills = rng.sample(SKILLS, rng.randint(3, 8))
+        rows.append({
+            "Email": f"candidate{i}@example.com",
+            "Name": f"Candidate {i}",
+            "Skills": ", ".join(skills),
+            "Location": rng.choice(CITIES),
+            "Summary": _summary(rng, skills),
+            "Job Title": "",
+            "Job Count": "",
+            "Interview Questions": "",
+            "Embedding": "",
+            "Timestamp": "2025-01-01T00:00:00",
+            "Radius": str(rng.choice([10, 25, 50, 100, 250])),
+        })
+    return rows
+
+
+def make_jobs(m, seed=1):
+    """Job rows with the keys match_jobs and find_matches read."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(m):
+        skills = rng.sample(SKILLS, rng.randint(2, 6))
+        jobs.append({
+            "Job Title": rng.choice(ROLES).title(),
+            "Job Summary": f"Job {i}: " + _summary(rng, skills, words=40),
+            "Job Location": rng.choice(CITIES),
+            "Job Skills": ", ".join(skills),
+            "skills": ", ".join(skills),
+        })
+    return jobs
+
+
+def make_users(n, password_hash, candidate_share=0.8, seed=2):
+    """Rows for the "AI Talent Users" sheet; every account shares one precomputed bcrypt hash."""
+    rng = random.Random(seed)
+    return [{
+        "Name": f"User {i}",
+        "Email": f"user{i}@example.com",
+        "Password_Hash": password_hash,
+        "Type": "candidate" if rng.random() < candidate_share else "employer",
+    } for i in range(n)]
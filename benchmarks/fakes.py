@@ -0,0 +1,324 @@
+"""
+Deterministic local stand-ins for the external services the app talks to:
+OpenAI (embeddings + chat), Nominatim, Adzuna (a real local HTTP server, so
+AdzunaClient's session, timeouts and cache are exercised) and Google Sheets.
+
+Every fake shares FakeService: configurable latency (+ jitter), error rate
+and a per-minute quota, driven by a seeded RNG so runs are repeatable.
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from gspread.utils import a1_to_rowcol
+
+
+class FakeServiceError(Exception):
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class FakeService:
+    def __init__(self, name, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 quota_per_minute=None, seed=0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self._rng = random.Random(seed)
+        self._window = deque()
+        self._lock = threading.Lock()
+        self.calls = self.errors = self.throttled = 0
+
+    def _call(self):
+        """Books one call: enforces quota, injects errors, then sleeps the simulated latency."""
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            if self.quota_per_minute:
+                while self._window and now - self._window[0] > 60:
+                    self._window.popleft()
+                if len(self._window) >= self.quota_per_minute:
+                    self.throttled += 1
+                    raise FakeServiceError(f"{self.name}: quota exceeded", status=429)
+                self._window.append(now)
+            failed = self._rng.random() < self.error_rate
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000.0
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise FakeServiceError(f"{self.name}: injected failure")
+
+    def stats(self):
+        return {"calls": self.calls, "errors": self.errors, "throttled": self.throttled}
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+# --- OpenAI ---
+
+class FakeOpenAI(FakeService):
+    """
+    `client.embeddings.create` and `client.chat.completions.create`.
+    Embeddings are bag-of-words sums of per-word random vectors, so texts that
+    share words are similar and ranking has something real to do.
+    """
+
+    def __init__(self, dim=256, **kwargs):
+        super().__init__("openai", **kwargs)
+        self.dim = dim
+        self._word_vectors = {}
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            vector = np.random.default_rng(_seed(word)).standard_normal(self.dim).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+    def vector(self, text, dimensions=None):
+        words = [w.strip(".,()").lower() for w in text.split()] or [""]
+        vector = np.sum([self._word_vector(w) for w in words], axis=0)
+        vector = vector[:dimensions] if dimensions else vector
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def _embed(self, model, input, dimensions=None, **kwargs):
+        self._call()
+        texts = input if isinstance(input, list) else [input]
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=self.vector(text, dimensions)) for i, text in enumerate(texts)
+        ])
+
+    def _complete(self, model, messages, response_format=None, max_tokens=None, **kwargs):
+        self._call()
+        prompt = messages[-1]["content"]
+        if response_format is not None:
+            lines = [line for line in prompt.splitlines() if line[:1].isdigit()]
+            titles = [{"index": i, "title": self._title(line)} for i, line in enumerate(lines)]
+            content = json.dumps({"titles": titles})
+        elif max_tokens is not None and max_tokens <= 20:
+            content = self._title(prompt)
+        else:
+            content = "\n".join(f"{i}. Question {i} about {self._title(prompt).lower()}?" for i in range(1, 11))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    @staticmethod
+    def _title(text):
+        titles = ["Software Engineer", "Data Analyst", "Automation Engineer", "Cloud Engineer",
+                  "Frontend Developer", "Process Engineer"]
+        return titles[_seed(text) % len(titles)]
+
+
+# --- Nominatim ---
+
+class FakeNominatim(FakeService):
+    """`geolocator.geocode(name)`: a fixed table, else a stable point in Great Britain."""
+
+    KNOWN = {
+        "london": (51.5074, -0.1278), "manchester": (53.4808, -2.2426), "leeds": (53.8008, -1.5491),
+        "birmingham": (52.4862, -1.8904), "glasgow": (55.8642, -4.2518), "bristol": (51.4545, -2.5879),
+        "new york": (40.7128, -74.0060), "paris": (48.8566, 2.3522), "berlin": (52.52, 13.405),
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__("nominatim", **kwargs)
+
+    def geocode(self, name, timeout=None):
+        self._call()
+        key = " ".join((name or "").lower().split())
+        if not key or "nowhere" in key:
+            return None
+        if key in self.KNOWN:
+            lat, lon = self.KNOWN[key]
+        else:
+            rng = random.Random(_seed(key))
+            lat, lon = rng.uniform(50.5, 55.5), rng.uniform(-4.5, 1.5)
+        return SimpleNamespace(latitude=lat, longitude=lon)
+
+
+# --- Adzuna ---
+
+class FakeAdzunaServer(FakeService):
+    """
+    Adzuna search API on 127.0.0.1; `url` is the ADZUNA_BASE_URL to use.
+    Setting `raw_body` (bytes) answers every request with that 200 body instead.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__("adzuna", **kwargs)
+        self.raw_body = None
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                try:
+                    service._call()
+                except FakeServiceError as e:
+                    self.send_response(e.status)
+                    self.end_headers()
+                    self.wfile.write(str(e).encode())
+                    return
+                if service.raw_body is not None:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(service.raw_body)))
+                    self.end_headers()
+                    self.wfile.write(service.raw_body)
+                    return
+                what = query.get("what", [""])[0]
+                where = query.get("where", [""])[0]
+                per_page = int(query.get("results_per_page", ["10"])[0])
+                count = _seed(f"{what}|{where}") % 5000
+                results = [{"title": f"{what.title()} {i}",
+                            "description": f"{what} role using python sql aws docker in {where}",
+                            "redirect_url": f"https://example.invalid/{i}"}
+                           for i in range(min(per_page, count))]
+                body = json.dumps({"count": count, "results": results}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# --- Google Sheets ---
+
+class FakeWorksheet(FakeService):
+    """The gspread Worksheet calls the app makes, over an in-memory grid (row 1 is the header)."""
+
+    def __init__(self, title, header, rows=(), **kwargs):
+        super().__init__(f"sheets:{title}", **kwargs)
+        self.title = title
+        self.grid = [list(header)] + [list(r) for r in rows]
+
+    @property
+    def row_count(self):
+        return len(self.grid)
+
+    def _cell(self, row, col):
+        if row - 1 < len(self.grid) and col - 1 < len(self.grid[row - 1]):
+            return self.grid[row - 1][col - 1]
+        return ""
+
+    def cell(self, row, col):
+        self._call()
+        return SimpleNamespace(row=row, col=col, value=self._cell(row, col))
+
+    def row_values(self, row):
+        self._call()
+        values = list(self.grid[row - 1]) if row - 1 < len(self.grid) else []
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get_all_records(self):
+        self._call()
+        header = self.grid[0]
+        return [{h: (row[i] if i < len(row) else "") for i, h in enumerate(header)} for row in self.grid[1:]]
+
+    def batch_get(self, ranges):
+        self._call()
+        blocks = []
+        for a1 in ranges:
+            start, end = a1.split(":")
+            (r1, c1), (r2, c2) = a1_to_rowcol(start), a1_to_rowcol(end)
+            block = []
+            for r in range(r1, min(r2, len(self.grid)) + 1):
+                values = [self._cell(r, c) for c in range(c1, c2 + 1)]
+                while values and values[-1] == "":
+                    values.pop()
+                block.append(values)
+            while block and not block[-1]:
+                block.pop()
+            blocks.append(block)
+        return blocks
+
+    def append_row(self, row, **kwargs):
+        self._call()
+        self.grid.append(list(row))
+
+    def append_rows(self, rows, **kwargs):
+        self._call()
+        self.grid.extend(list(r) for r in rows)
+
+    def _set(self, row, col, value):
+        while len(self.grid) < row:
+            self.grid.append([])
+        line = self.grid[row - 1]
+        line.extend([""] * (col - len(line)))
+        line[col - 1] = value
+
+    def update_cell(self, row, col, value):
+        self._call()
+        self._set(row, col, value)
+
+    def batch_update(self, data, **kwargs):
+        self._call()
+        for item in data:
+            start = item["range"].split(":")[0]
+            r0, c0 = a1_to_rowcol(start)
+            for dr, values in enumerate(item["values"]):
+                for dc, value in enumerate(values):
+                    self._set(r0 + dr, c0 + dc, value)
+
+
+class FakeSheets:
+    """Registry of fake worksheets, addressable like sheets.get_worksheet and gspread.Client."""
+
+    def __init__(self):
+        self.by_key = {}
+        self.by_name = {}
+
+    def add(self, worksheet, key=None, name=None):
+        if key:
+            self.by_key[key] = worksheet
+        if name:
+            self.by_name[name] = worksheet
+        return worksheet
+
+    def get_worksheet(self, key=None, name=None, index=0):
+        worksheet = self.by_key.get(key) if key else self.by_name.get(name)
+        if worksheet is None:
+            raise KeyError(f"No fake worksheet for key={key!r} name={name!r}")
+        return worksheet
+
+    # gspread.Client surface used by precompute_embeddings
+    def open_by_key(self, key):
+        return SimpleNamespace(sheet1=self.get_worksheet(key=key))
+
+    def open(self, name):
+        return SimpleNamespace(sheet1=self.get_worksheet(name=name))
+
+    def stats(self):
+        worksheets = {id(w): w for w in list(self.by_key.values()) + list(self.by_name.values())}
+        return {w.title: w.stats() for w in worksheets.values()}
@@ -0,0 +1,372 @@
+"""
+Offline benchmark suite: runs the app's hot paths against local fakes of
+OpenAI, Nominatim, Adzuna and Google Sheets and writes a JSON report with
+throughput and p50/p99 latency per scenario.
+
+    python benchmarks/run.py --candidates 2000 --jobs 500 --out report.json
+    python benchmarks/run.py --baseline report.json      # exit 1 on regressions
+
+Scenarios: match_jobs, find_matches, login, dashboard, registration (sync and async),
+embedding_backfill and bulk_import. Every cache the app keeps on disk is redirected to a
+temporary directory, so runs start cold and never touch real services.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CANDIDATES_KEY = "bench-candidates"
+USERS_KEY = "bench-registered-users"
+
+
+def _isolate(workdir, adzuna_url):
+    """Points every on-disk cache and service setting at the sandbox; must run before app imports."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "ADZUNA_APP_ID": "bench",
+        "ADZUNA_APP_KEY": "bench",
+        "ADZUNA_BASE_URL": adzuna_url,
+        "ADZUNA_REQUESTS_PER_MINUTE": "100000",
+        "CANDIDATES_SHEET_ID": CANDIDATES_KEY,
+        "USERS_SHEET_ID": USERS_KEY,
+        "GOOGLE_CREDENTIALS_PATH": os.path.join(workdir, "credentials.json"),
+        "REPOSITORY_BACKEND": "sheets",
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+        "GEOCODE_CACHE_PATH": os.path.join(workdir, "geocode.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm.sqlite3"),
+        "ENRICHMENT_QUEUE_PATH": os.path.join(workdir, "queue.sqlite3"),
+        "MATCH_STORE_PATH": os.path.join(workdir, "matches.sqlite3"),
+        "BACKFILL_CHECKPOINT_PATH": os.path.join(workdir, "checkpoint.json"),
+        "BACKFILL_REQUESTS_PER_MINUTE": "100000",
+        "BACKFILL_TOKENS_PER_MINUTE": "100000000",
+        "BULK_IMPORT_REQUESTS_PER_MINUTE": "100000",
+        "BULK_IMPORT_TOKENS_PER_MINUTE": "100000000",
+        "BULK_IMPORT_STATUS_DIR": os.path.join(workdir, "imports"),
+    })
+
+
+def summarize(latencies, errors, wall):
+    latencies = sorted(latencies)
+    n = len(latencies)
+
+    def pct(q):
+        return round(latencies[min(n - 1, int(q * n))] * 1000, 3) if n else None
+
+    return {
+        "ops": n,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_ops_s": round(n / wall, 2) if wall > 0 else None,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(sum(latencies) / n * 1000, 3) if n else None,
+    }
+
+
+def timed(fn, items):
+    """Calls fn(item) for each item; returns (latencies, errors, wall seconds)."""
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        try:
+            if fn(item) is False:
+                errors += 1
+        except Exception as e:
+            errors += 1
+            print(f"  ! {type(e).__name__}: {e}")
+        latencies.append(time.perf_counter() - t0)
+    return latencies, errors, time.perf_counter() - started
+
+
+class Bench:
+    def __init__(self, args, fakes, workdir):
+        self.args = args
+        self.fakes = fakes
+        self.workdir = workdir
+
+        import datagen
+        import bcrypt
+        import services
+        import repository
+        import precompute_embeddings  # registers the "precompute_sheet" service
+        from repository import CANDIDATE_COLUMNS, USER_COLUMNS, USERS_SHEET_NAME
+        from fakes import FakeWorksheet
+
+        self.candidates = datagen.make_candidates(args.candidates)
+        self.jobs = datagen.make_jobs(args.jobs)
+        password_hash = bcrypt.hashpw(b"bench-password", bcrypt.gensalt(args.bcrypt_rounds)).decode()
+        self.users = datagen.make_users(args.users, password_hash)
+
+        sheet_kwargs = {"latency_ms": args.sheets_latency, "error_rate": args.error_rate,
+                        "quota_per_minute": args.sheets_quota}
+        sheets = fakes["sheets"]
+        sheets.add(FakeWorksheet("candidates", CANDIDATE_COLUMNS,
+                                 [[c[h] for h in CANDIDATE_COLUMNS] for c in self.candidates], **sheet_kwargs),
+                   key=CANDIDATES_KEY)
+        sheets.add(FakeWorksheet("users", USER_COLUMNS,
+                                 [[u[h] for h in USER_COLUMNS] for u in self.users], **sheet_kwargs),
+                   name=USERS_SHEET_NAME)
+        sheets.add(FakeWorksheet("registered_users", ["Email", "Password_Hash", "Type"], **sheet_kwargs),
+                   key=USERS_KEY)
+
+        repository.get_worksheet = sheets.get_worksheet
+        services.override("openai", fakes["openai"])
+        services.override("geolocator", fakes["nominatim"])
+        services.override("precompute_sheet", sheets.get_worksheet(key=CANDIDATES_KEY))
+
+    # --- Scenarios ---
+
+    def match_jobs(self):
+        import smart_matcher
+        sample = self.candidates[:self.args.requests]
+        cold = timed(lambda c: smart_matcher.match_jobs(c, self.jobs), sample[:1])
+        result = summarize(*timed(lambda c: bool(smart_matcher.match_jobs(c, self.jobs)), sample))
+        result["cold_ms"] = round(cold[0][0] * 1000, 3)
+        return result
+
+    def find_matches(self):
+        from matching_system import MatchingSystem
+        matcher = MatchingSystem()
+        jobs = self.jobs[:self.args.requests]
+        cold = timed(lambda j: matcher.find_matches(j, self.candidates, top_k=10), jobs[:1])
+        result = summarize(*timed(lambda j: matcher.find_matches(j, self.candidates, top_k=10) is not None, jobs))
+        result["cold_ms"] = round(cold[0][0] * 1000, 3)
+        return result
+
+    def login(self):
+        from flask import Flask
+        from auth import auth
+        app = Flask(__name__, template_folder=os.path.join(ROOT, "templates"))
+        app.register_blueprint(auth, url_prefix="/auth")
+        client = app.test_client()
+        users = [self.users[i % len(self.users)] for i in range(self.args.requests)]
+
+        def login(user):
+            response = client.post("/auth/login", data={"email": user["Email"], "password": "bench-password"})
+            return response.status_code == 302
+
+        return summarize(*timed(login, users))
+
+    def _sheets_calls(self):
+        return sum(s["calls"] for s in self.fakes["sheets"].stats().values())
+
+    def dashboard(self):
+        """Authenticated page loads after login; should be served without touching Sheets."""
+        import main
+        main._workers_started = True  # measure the request path only
+        users = [u for u in self.users if u["Type"] == "candidate"][:max(1, self.args.requests // 5)]
+        clients = []
+        for user in users:
+            client = main.app.test_client()
+            client.post("/auth/login", data={"email": user["Email"], "password": "bench-password"})
+            clients.append(client)
+        calls_before = self._sheets_calls()
+        sessions = [clients[i % len(clients)] for i in range(self.args.requests)]
+        result = summarize(*timed(lambda c: c.get("/dashboard").status_code == 200, sessions))
+        result["sheets_calls"] = self._sheets_calls() - calls_before
+        return result
+
+    def _registration(self, async_mode):
+        from flask import Flask, request
+        import candidate_registration
+        candidate_registration.REGISTRATION_ASYNC = async_mode
+        registration = candidate_registration.CandidateRegistrationSystem()
+        registration.openai_client = self.fakes["openai"]
+        app = Flask(__name__)
+        prefix = "async" if async_mode else "sync"
+
+        def register(i):
+            payload = {"name": f"New {i}", "email": f"{prefix}{i}@example.com",
+                       "skills": "python, sql, aws", "location": "London",
+                       "summary": f"Engineer {i} building data pipelines", "radius_km": 50}
+            with app.test_request_context("/register", method="POST", json=payload):
+                response = registration.register(request)
+            status = response[1] if isinstance(response, tuple) else response.status_code
+            return status in (200, 202)
+
+        result = summarize(*timed(register, range(self.args.registrations)))
+        if async_mode:
+            # Drain the queue inline so enrichment cost is reported too
+            started, tasks = time.perf_counter(), 0
+            while registration.workers.run_once():
+                tasks += 1
+            result["enrichment_tasks"] = tasks
+            result["enrichment_wall_s"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def registration_sync(self):
+        return self._registration(False)
+
+    def registration_async(self):
+        return self._registration(True)
+
+    def embedding_backfill(self):
+        import precompute_embeddings
+
+        sheet = self.fakes["sheets"].get_worksheet(key=CANDIDATES_KEY)
+        header = sheet.grid[0]
+        summary_col, embedding_col = header.index("Summary"), header.index("Embedding")
+        pending = sum(1 for row in sheet.grid[1:]
+                      if len(row) > summary_col and str(row[summary_col]).strip()
+                      and not (len(row) > embedding_col and str(row[embedding_col]).strip()))
+
+        started = time.perf_counter()
+        embedded = precompute_embeddings.precompute_embeddings(reset=True)
+        wall = time.perf_counter() - started
+        return {
+            "ops": embedded,
+            "errors": pending - embedded,
+            "wall_s": round(wall, 3),
+            "throughput_ops_s": round(embedded / wall, 2) if wall > 0 else None,
+            "p50_ms": None,
+            "p99_ms": None,
+        }
+
+
+    def bulk_import(self):
+        import csv
+        import datagen
+        import bulk_import
+        import candidate_registration
+
+        registration = candidate_registration.CandidateRegistrationSystem()
+        registration.openai_client = self.fakes["openai"]
+        # New candidates plus a slice of existing ones, which must be skipped as duplicates
+        rows = datagen.make_candidates(self.args.imports, seed=3)
+        for row in rows:
+            row["Email"] = row["Email"].replace("candidate", "bulk")
+        duplicates = self.candidates[:max(1, self.args.imports // 20)]
+        path = os.path.join(self.workdir, "import.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Email", "Name", "Skills", "Location", "Summary", "Radius"])
+            for row in rows + duplicates:
+                writer.writerow([row[c] for c in ("Email", "Name", "Skills", "Location", "Summary", "Radius")])
+
+        calls_before = self._sheets_calls()
+        started = time.perf_counter()
+        report = bulk_import.import_file(path, registration=registration)
+        wall = time.perf_counter() - started
+        return {
+            "ops": report["imported"],
+            "errors": len(rows) - report["imported"] + len(duplicates) - report["duplicates"],
+            "wall_s": round(wall, 3),
+            "throughput_ops_s": round(report["imported"] / wall, 2) if wall > 0 else None,
+            "p50_ms": None,
+            "p99_ms": None,
+            "sheets_calls": self._sheets_calls() - calls_before,
+            "queued_tasks": report["queued_tasks"],
+            "stages_s": report["stages_s"],
+        }
+
+
+SCENARIOS = ["match_jobs", "find_matches", "login", "dashboard", "registration_sync",
+             "registration_async", "embedding_backfill", "bulk_import"]
+
+
+def compare(report, baseline, tolerance):
+    """Regressions against a previous report: slower p50/p99 or lower throughput beyond `tolerance`."""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or "error" in result:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if result.get(metric) and old.get(metric) and result[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {old[metric]} → {result[metric]}")
+        metric = "throughput_ops_s"
+        if result.get(metric) and old.get(metric) and result[metric] < old[metric] * (1 - tolerance):
+            regressions.append(f"{name}.{metric}: {old[metric]} → {result[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50, help="Operations per read scenario")
+    parser.add_argument("--registrations", type=int, default=20)
+    parser.add_argument("--imports", type=int, default=2000, help="Rows in the bulk_import file")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--openai-latency", type=float, default=40.0, help="ms per OpenAI call")
+    parser.add_argument("--nominatim-latency", type=float, default=100.0, help="ms per geocode")
+    parser.add_argument("--adzuna-latency", type=float, default=80.0, help="ms per Adzuna call")
+    parser.add_argument("--sheets-latency", type=float, default=150.0, help="ms per Sheets call")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Extra uniform ms per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate, all services")
+    parser.add_argument("--openai-quota", type=int, default=None, help="OpenAI calls per minute")
+    parser.add_argument("--sheets-quota", type=int, default=None, help="Sheets calls per minute")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    from fakes import FakeOpenAI, FakeNominatim, FakeAdzunaServer, FakeSheets
+    common = {"jitter_ms": args.jitter, "error_rate": args.error_rate, "seed": args.seed}
+    fakes = {
+        "openai": FakeOpenAI(latency_ms=args.openai_latency, quota_per_minute=args.openai_quota, **common),
+        "nominatim": FakeNominatim(latency_ms=args.nominatim_latency, **common),
+        "adzuna": FakeAdzunaServer(latency_ms=args.adzuna_latency, **common).start(),
+        "sheets": FakeSheets(),
+    }
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    _isolate(workdir, fakes["adzuna"].url)
+
+    bench = Bench(args, fakes, workdir)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "scenarios": {},
+    }
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        print(f"▶ {name}")
+        try:
+            result = getattr(bench, name)()
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        report["scenarios"][name] = result
+        print(f"  {result}")
+    report["services"] = {
+        "openai": fakes["openai"].stats(),
+        "nominatim": fakes["nominatim"].stats(),
+        "adzuna": fakes["adzuna"].stats(),
+        "sheets": fakes["sheets"].stats(),
+    }
+    # Per-stage latency and cache hit rates as the app itself measured them
+    import metrics
+    snapshot = metrics.snapshot()
+    report["stages"] = {name: {k: v for k, v in stage.items() if k != "buckets"}
+                        for name, stage in snapshot["stages"].items()}
+    report["caches"] = snapshot["caches"]
+    fakes["adzuna"].stop()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
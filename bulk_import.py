@@ -0,0 +1,404 @@
+import os
+import csv
+import json
+import time
+import uuid
+import argparse
+import threading
+from itertools import islice
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import metrics
+from repository import get_registered_users_repository, get_candidates_repository, normalize_key
+
+load_dotenv()
+
+# --- Bulk import settings ---
+BULK_IMPORT_CHUNK_ROWS = int(os.getenv("BULK_IMPORT_CHUNK_ROWS", "500"))
+# Concurrent title / interview-question calls per chunk
+BULK_IMPORT_LLM_WORKERS = int(os.getenv("BULK_IMPORT_LLM_WORKERS", "4"))
+BULK_IMPORT_REQUESTS_PER_MINUTE = int(os.getenv("BULK_IMPORT_REQUESTS_PER_MINUTE", "500"))
+BULK_IMPORT_TOKENS_PER_MINUTE = int(os.getenv("BULK_IMPORT_TOKENS_PER_MINUTE", "1000000"))
+# Keep each append_rows request body comfortably under the Sheets API payload limit
+BULK_IMPORT_WRITE_BYTES = int(os.getenv("BULK_IMPORT_WRITE_BYTES", "2000000"))
+BULK_IMPORT_STATUS_DIR = os.getenv("BULK_IMPORT_STATUS_DIR", ".bulk_imports")
+DEFAULT_RADIUS_KM = 50
+
+FORMATS = ("csv", "jsonl")
+ENRICH_MODES = ("inline", "deferred", "none")
+REQUIRED_FIELDS = ("email", "name", "skills", "location", "summary")
+
+# Input column names (lower-cased, spaces/dashes as underscores) mapped to import fields
+FIELD_ALIASES = {
+    "e_mail": "email", "email_address": "email",
+    "full_name": "name", "candidate_name": "name",
+    "skill": "skills", "city": "location",
+    "bio": "summary", "profile": "summary",
+    "radius": "radius_km", "radius_(km)": "radius_km",
+}
+
+_pool = ThreadPoolExecutor(max_workers=BULK_IMPORT_LLM_WORKERS + 2, thread_name_prefix="bulk-import")
+
+
+# --- Reading ---
+
+def _field_name(name):
+    name = "_".join(str(name or "").strip().lower().replace("-", " ").split())
+    return FIELD_ALIASES.get(name, name)
+
+
+def _normalize(raw):
+    record = {}
+    for key, value in raw.items():
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v).strip() for v in value)
+        record[_field_name(key)] = "" if value is None else str(value).strip()
+    return record
+
+
+def read_records(stream, fmt="csv"):
+    """
+    Lazily yields records with normalized field names from a text stream of
+    CSV (header row first) or JSON Lines. Lines that cannot be parsed yield None.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format '{fmt}' (expected one of {FORMATS})")
+    if fmt == "csv":
+        for raw in csv.DictReader(stream):
+            yield _normalize({k: v for k, v in raw.items() if k is not None})
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield _normalize(raw) if isinstance(raw, dict) else None
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _radius(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RADIUS_KM
+
+
+def _write_groups(rows, max_bytes):
+    """Splits rows into consecutive groups whose JSON size stays under `max_bytes`."""
+    group, size = [], 0
+    for row in rows:
+        row_bytes = len(json.dumps(row, default=str))
+        if group and size + row_bytes > max_bytes:
+            yield group
+            group, size = [], 0
+        group.append(row)
+        size += row_bytes
+    if group:
+        yield group
+
+
+# --- Import ---
+
+class BulkImporter:
+    """
+    Imports candidates from a CSV/JSONL stream in chunks of `chunk_size` rows.
+
+    Emails are deduplicated against an in-memory index built once from the
+    candidates sheet (and against earlier rows of the same file); account
+    rows are only added for emails the users sheet does not hold yet.
+    With `enrich="inline"` each chunk resolves job titles in batched
+    structured-output calls and embeddings in batched, rate-limited API calls
+    concurrently, then job counts per distinct query and interview questions
+    per distinct title. Rows are then written with one append_rows call per
+    sheet (more only if the payload is large). Anything that fails
+    is handed to the enrichment queue rather than failing the chunk.
+    `"deferred"` writes stub rows and queues all enrichment; `"none"` only
+    writes the rows. Candidate rows are written before account rows, so
+    re-running a file after an interruption skips exactly the candidates
+    that were already written.
+    """
+
+    def __init__(self, registration=None, chunk_size=None, enrich="inline", write_bytes=None):
+        if enrich not in ENRICH_MODES:
+            raise ValueError(f"Unknown enrich mode '{enrich}' (expected one of {ENRICH_MODES})")
+        if registration is None:
+            from candidate_registration import CandidateRegistrationSystem
+            registration = CandidateRegistrationSystem()
+        self.registration = registration
+        self.chunk_size = chunk_size or BULK_IMPORT_CHUNK_ROWS
+        self.enrich = enrich
+        self.write_bytes = write_bytes or BULK_IMPORT_WRITE_BYTES
+        self.users = get_registered_users_repository()
+        self.candidates = get_candidates_repository()
+        from rate_limit import TokenBucket
+        self.rate_limiter = TokenBucket.per_minute(BULK_IMPORT_REQUESTS_PER_MINUTE)
+        self.token_limiter = TokenBucket.per_minute(BULK_IMPORT_TOKENS_PER_MINUTE)
+        self._seen = None
+        self._accounts = None
+
+    def _timed(self, stage, stages, fn, *args):
+        started = time.perf_counter()
+        with metrics.timer(f"bulk_import.{stage}"):
+            result = fn(*args)
+        stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - started
+        return result
+
+    # --- Enrichment stages (each takes the chunk's valid records) ---
+
+    def _titles(self, records):
+        from candidate_registration import TITLE_BATCH_SIZE
+        texts = [f"{r['skills']} {r['summary']}" for r in records]
+        batches = [texts[i:i + TITLE_BATCH_SIZE] for i in range(0, len(texts), TITLE_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=max(1, min(BULK_IMPORT_LLM_WORKERS, len(batches)))) as pool:
+            results = list(pool.map(self.registration.extract_job_titles, batches))
+        return [(title or "").strip() for batch in results for title in batch]
+
+    def _embeddings(self, records):
+        from smart_matcher import get_embeddings, candidate_text, model_spec, EMBEDDING_MODEL
+        from embedding_store import serialize_embedding
+        texts = [candidate_text({"Summary": r["summary"], "Location": r["location"]}) for r in records]
+        vectors = get_embeddings(texts, model=EMBEDDING_MODEL, rate_limiter=self.rate_limiter,
+                                 token_limiter=self.token_limiter)
+        spec = model_spec(EMBEDDING_MODEL)
+        return ["" if v is None else serialize_embedding(v, model=spec, text=text)
+                for v, text in zip(vectors, texts)]
+
+    def _job_counts(self, records, titles):
+        """Adzuna counts per (country, title, location, radius), one request per distinct query."""
+        from adzuna_client import get_adzuna_client
+        from adzuna_helper import detect_country
+        client = get_adzuna_client()
+        if not client.configured:
+            return [0 if title else "" for title in titles]
+        keys = [
+            (detect_country(r["location"]), title, r["location"], _radius(r.get("radius_km"))) if title else None
+            for r, title in zip(records, titles)
+        ]
+        distinct = list(dict.fromkeys(k for k in keys if k is not None))
+        counts = client.count_many([
+            {"country": country, "what": title, "where": location, "distance": radius}
+            for country, title, location, radius in distinct
+        ])
+        by_key = dict(zip(distinct, counts))
+        return ["" if k is None or by_key[k] is None else by_key[k] for k in keys]
+
+    def _questions(self, records, titles):
+        """Interview questions generated once per distinct title (the LLM cache keys them by title)."""
+        distinct = {}
+        for record, title in zip(records, titles):
+            if title:
+                distinct.setdefault(" ".join(title.lower().split()), (record["skills"], title))
+
+        def generate(item):
+            try:
+                return "\n".join(self.registration.generate_interview_questions(*item))
+            except Exception as e:
+                print(f"🔥 Interview questions failed for {item[1]!r}: {e}")
+                return ""
+
+        with ThreadPoolExecutor(max_workers=max(1, min(BULK_IMPORT_LLM_WORKERS, len(distinct)))) as pool:
+            by_title = dict(zip(distinct, pool.map(generate, distinct.values())))
+        return [by_title.get(" ".join(t.lower().split()), "") if t else "" for t in titles]
+
+    def _enrich_chunk(self, records, stages):
+        """(titles, job counts, questions, embeddings) aligned with `records`; failures are blank."""
+        embeddings_future = _pool.submit(self._timed, "embeddings", stages, self._embeddings, records)
+        titles = self._timed("titles", stages, self._titles, records)
+        counts_future = _pool.submit(self._timed, "job_counts", stages, self._job_counts, records, titles)
+        questions = self._timed("questions", stages, self._questions, records, titles)
+        return titles, counts_future.result(), questions, embeddings_future.result()
+
+    # --- Chunk processing ---
+
+    def _load_seen(self):
+        if self._seen is None:
+            started = time.perf_counter()
+            self._seen = self.candidates.keys()
+            self._accounts = self.users.keys()
+            print(f"📇 Indexed {len(self._seen)} existing candidates in {time.perf_counter() - started:.1f}s")
+        return self._seen
+
+    def _validate(self, chunk, totals):
+        """Valid, not-yet-seen records of the chunk; counts the rest in `totals`."""
+        seen = self._load_seen()
+        valid = []
+        for record in chunk:
+            if record is None or any(not record.get(f) for f in REQUIRED_FIELDS):
+                totals["invalid"] += 1
+                continue
+            email = normalize_key(record["email"])
+            if email in seen:
+                totals["duplicates"] += 1
+                continue
+            seen.add(email)
+            record["email"] = record["email"].strip()
+            valid.append(record)
+        return valid
+
+    def _retry_tasks(self, record, title, job_count, questions, embedding):
+        """Enrichment queue tasks for whatever this row is still missing."""
+        payload = {"skills": record["skills"], "summary": record["summary"],
+                   "location": record["location"], "radius_km": _radius(record.get("radius_km"))}
+        email = record["email"]
+        tasks = []
+        if not title:
+            tasks.append((email, "job_title", payload))
+        else:
+            follow_up = dict(payload, job_title=title)
+            if job_count == "":
+                tasks.append((email, "job_count", follow_up))
+            if not questions:
+                tasks.append((email, "interview_questions", follow_up))
+        if not embedding:
+            tasks.append((email, "embedding", payload))
+        return tasks
+
+    def import_chunk(self, chunk, totals, stages):
+        records = self._validate(chunk, totals)
+        if not records:
+            return 0
+
+        n = len(records)
+        if self.enrich == "inline":
+            titles, counts, questions, embeddings = self._enrich_chunk(records, stages)
+        else:
+            titles, counts, questions, embeddings = [""] * n, [""] * n, [""] * n, [""] * n
+
+        timestamp = datetime.now().isoformat()
+        user_rows, candidate_rows, tasks = [], [], []
+        for record, title, count, question_text, embedding in zip(records, titles, counts, questions, embeddings):
+            if normalize_key(record["email"]) not in self._accounts:
+                user_rows.append([record["email"], "", ""])
+            candidate_rows.append([
+                record["email"], record["name"], record["skills"], record["location"],
+                record["summary"], title, count, question_text, embedding, timestamp,
+                str(_radius(record.get("radius_km"))),
+            ])
+            if self.enrich != "none":
+                tasks.extend(self._retry_tasks(record, title, count, question_text, embedding))
+
+        def write():
+            for group in _write_groups(candidate_rows, self.write_bytes):
+                self.candidates.append_many(group)
+            if user_rows:
+                self.users.append_many(user_rows)
+                self._accounts.update(normalize_key(row[0]) for row in user_rows)
+            if tasks:
+                self.registration.queue.enqueue_many(tasks)
+
+        self._timed("write", stages, write)
+        totals["imported"] += n
+        totals["queued_tasks"] += len(tasks)
+        return n
+
+    def run(self, records, progress=None):
+        """
+        Imports an iterable of records (see `read_records`); `progress(report)`
+        is called after every chunk. Returns the final report.
+        """
+        totals = {"imported": 0, "duplicates": 0, "invalid": 0, "queued_tasks": 0}
+        stages = {}
+        started = time.perf_counter()
+        report = {}
+        for number, chunk in enumerate(_chunks(records, self.chunk_size), start=1):
+            self.import_chunk(chunk, totals, stages)
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            report = dict(totals, chunks=number, elapsed_s=round(elapsed, 2),
+                          rows_per_s=round(totals["imported"] / elapsed, 1),
+                          stages_s={k: round(v, 2) for k, v in sorted(stages.items())})
+            print(f"📦 Chunk {number}: {totals['imported']} imported, {totals['duplicates']} duplicates, "
+                  f"{totals['invalid']} invalid ({report['rows_per_s']} rows/s)")
+            if progress:
+                progress(report)
+        if not report:
+            report = dict(totals, chunks=0, elapsed_s=0.0, rows_per_s=0.0, stages_s={})
+        print(f"🏁 Import complete: {totals['imported']} candidates in {report['elapsed_s']}s")
+        return report
+
+
+def import_file(path, fmt=None, **options):
+    """Imports a CSV or JSONL file (format from the extension unless given)."""
+    fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    progress = options.pop("progress", None)
+    with open(path, newline="", encoding="utf-8-sig") as stream:
+        return BulkImporter(**options).run(read_records(stream, fmt), progress=progress)
+
+
+# --- Background jobs (status is kept on disk so any worker can report it) ---
+
+def _status_path(job_id):
+    return os.path.join(BULK_IMPORT_STATUS_DIR, f"{job_id}.json")
+
+
+def _save_status(job_id, status):
+    os.makedirs(BULK_IMPORT_STATUS_DIR, exist_ok=True)
+    tmp_path = _status_path(job_id) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, _status_path(job_id))
+
+
+def import_status(job_id):
+    """Latest status of a background import, or None for an unknown id."""
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_status_path(job_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def start_import(path, fmt=None, remove=False, **options):
+    """
+    Runs `import_file` on a background thread and returns its job id; with
+    `remove` the file is deleted afterwards (e.g. an uploaded temp file).
+    """
+    job_id = uuid.uuid4().hex[:12]
+    status = {"job_id": job_id, "state": "running", "started_at": time.time(), "progress": {}}
+    _save_status(job_id, status)
+
+    def progress(report):
+        status["progress"] = report
+        _save_status(job_id, status)
+
+    def run():
+        try:
+            status["progress"] = import_file(path, fmt, progress=progress, **options)
+            status["state"] = "done"
+        except Exception as e:
+            print(f"🔥 Bulk import {job_id} failed: {e}")
+            status.update(state="failed", error=str(e))
+        finally:
+            status["finished_at"] = time.time()
+            _save_status(job_id, status)
+            if remove:
+                os.remove(path)
+
+    threading.Thread(target=run, name=f"bulk-import-{job_id}", daemon=True).start()
+    return job_id
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import candidates from a CSV or JSONL file.")
+    parser.add_argument("path", help="CSV (header row) or JSON Lines file")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk")
+    parser.add_argument("--enrich", choices=ENRICH_MODES, default="inline",
+                        help="inline: enrich each chunk before writing; deferred: write stub rows "
+                             "and queue enrichment; none: write rows only")
+    args = parser.parse_args()
+    print(json.dumps(import_file(args.path, args.format, chunk_size=args.chunk_size,
+                                 enrich=args.enrich), indent=2))
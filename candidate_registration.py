@@ -1,29 +1,201 @@
 import os
+import time
 import bcrypt
+import requests
 from flask import jsonify
-from sheets import get_gspread_client
+from repository import get_registered_users_repository, get_candidates_repository
+from enrichment_queue import EnrichmentQueue, EnrichmentWorkerPool
+from sessions import get_session_manager
 from itsdangerous import URLSafeSerializer
 from datetime import datetime
-import requests
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import json
+import services
+from llm_cache import get_completion_cache, prompt_key
 from adzuna_helper import detect_country  # Ensure this exists
+from adzuna_client import AdzunaError, get_adzuna_client
+
+# --- Registration fan-out settings (seconds) ---
+REGISTRATION_MAX_WORKERS = int(os.getenv("REGISTRATION_MAX_WORKERS", "8"))
+TITLE_TIMEOUT = float(os.getenv("REGISTRATION_TITLE_TIMEOUT", "15"))
+ADZUNA_TIMEOUT = float(os.getenv("REGISTRATION_ADZUNA_TIMEOUT", "10"))
+QUESTIONS_TIMEOUT = float(os.getenv("REGISTRATION_QUESTIONS_TIMEOUT", "20"))
+
+# When enabled, register() writes the stub row and hands enrichment to the background queue
+REGISTRATION_ASYNC = os.getenv("REGISTRATION_ASYNC", "1") == "1"
+
+# --- LLM settings ---
+LLM_MODEL = "gpt-4o-mini"
+TITLE_PARAMS = {"max_tokens": 10, "temperature": 0.0}
+QUESTIONS_PARAMS = {"max_tokens": 300, "temperature": 0.7}
+# Popular titles get their questions generated once and reused for this long
+INTERVIEW_QUESTIONS_TTL = float(os.getenv("INTERVIEW_QUESTIONS_TTL", str(7 * 24 * 3600)))
+# Queued job_title tasks resolved together in one structured-output call
+TITLE_BATCH_SIZE = int(os.getenv("TITLE_BATCH_SIZE", "20"))
+
+# Shared across requests; calls that overrun their timeout finish here in the background
+_registration_pool = ThreadPoolExecutor(max_workers=REGISTRATION_MAX_WORKERS,
+                                        thread_name_prefix="registration")
+
+def _wait_for(future, timeout, default, label):
+    """Returns the future's result, or `default` plus a flag if it failed or timed out."""
+    try:
+        return future.result(timeout=timeout), False
+    except FutureTimeoutError:
+        print(f"⏱️ {label} timed out after {timeout}s")
+    except Exception as e:
+        print(f"🔥 {label} failed: {e}")
+    return default, True
 
 class CandidateRegistrationSystem:
     def __init__(self):
         self.serializer = URLSafeSerializer(os.getenv("APP_SECRET_KEY", "default-secret"))
-        self.openai_client = OpenAI()
+        self._openai_client = None
         self.adzuna_app_id = os.getenv("ADZUNA_APP_ID")
         self.adzuna_app_key = os.getenv("ADZUNA_APP_KEY")
+        self.adzuna = get_adzuna_client()
+        self.queue = EnrichmentQueue()
+        self.workers = EnrichmentWorkerPool(self.queue, {
+            "job_title": self._task_job_title,
+            "job_count": self._task_job_count,
+            "interview_questions": self._task_interview_questions,
+            "embedding": self._task_embedding,
+        }, batch_handlers={
+            "job_title": (self._task_job_titles, TITLE_BATCH_SIZE),
+        })
+        self.llm_cache = get_completion_cache()
 
-    def extract_job_title(self, skills_summary):
+    @property
+    def openai_client(self):
+        # Shared lazily built client; assigning one overrides it for this instance
+        return self._openai_client or services.get("openai")
+
+    @openai_client.setter
+    def openai_client(self, client):
+        self._openai_client = client
+
+    def start_enrichment_workers(self):
+        self.workers.start()
+
+    def enrichment_status(self, email):
+        return self.queue.status(email)
+
+    # --- Background enrichment tasks (run by EnrichmentWorkerPool, retried on error) ---
+
+    def _task_job_title(self, email, payload):
+        job_title = self.extract_job_title(f"{payload['skills']} {payload['summary']}")
+        if not job_title:
+            raise ValueError("Empty job title")
+        get_candidates_repository().update(email, {"Job Title": job_title})
+        print(f"🧠 AI-derived job title for {email}: {job_title}")
+        follow_up = dict(payload, job_title=job_title)
+        self.queue.enqueue(email, "job_count", follow_up)
+        self.queue.enqueue(email, "interview_questions", follow_up)
+
+    def _task_job_titles(self, items):
+        """Batch form of _task_job_title; returns one error (or None) per (email, payload)."""
+        titles = self.extract_job_titles([f"{p['skills']} {p['summary']}" for _, p in items])
+        errors = []
+        for (email, payload), job_title in zip(items, titles):
+            try:
+                if not job_title:
+                    raise ValueError("Empty job title")
+                get_candidates_repository().update(email, {"Job Title": job_title})
+                print(f"🧠 AI-derived job title for {email}: {job_title}")
+                follow_up = dict(payload, job_title=job_title)
+                self.queue.enqueue(email, "job_count", follow_up)
+                self.queue.enqueue(email, "interview_questions", follow_up)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def _task_job_count(self, email, payload):
+        job_count = self.query_adzuna_job_counts(
+            payload["job_title"], payload["location"], radius_km=payload.get("radius_km", 50))
+        get_candidates_repository().update(email, {"Job Count": job_count})
+
+    def _task_interview_questions(self, email, payload):
+        questions = self.generate_interview_questions(payload["skills"], payload["job_title"])
+        if not questions:
+            raise ValueError("No interview questions generated")
+        get_candidates_repository().update(email, {"Interview Questions": "\n".join(questions)})
+
+    def _task_embedding(self, email, payload):
+        from smart_matcher import get_embedding, candidate_text, model_spec, EMBEDDING_MODEL
+        from embedding_store import serialize_embedding
+        text = candidate_text({"Summary": payload["summary"], "Location": payload["location"]})
+        embedding = get_embedding(text, model=EMBEDDING_MODEL)
+        if embedding is None:
+            raise ValueError("Embedding request failed")
+        cell = serialize_embedding(embedding, model=model_spec(EMBEDDING_MODEL), text=text)
+        get_candidates_repository().update(email, {"Embedding": cell})
+
+    def _title_messages(self, skills_summary):
         prompt = f"Based on these skills and summary, suggest the most relevant job title:\n{skills_summary}\nJob Title:"
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=10,
-            temperature=0.0,
-        )
-        return response.choices[0].message.content.strip()
+        return [{"role": "user", "content": prompt}]
+
+    def extract_job_title(self, skills_summary):
+        return self.llm_cache.complete(
+            self.openai_client, LLM_MODEL, self._title_messages(skills_summary), **TITLE_PARAMS)
+
+    def extract_job_titles(self, skills_summaries):
+        """
+        Job titles for many candidates. Cached titles are reused; the rest are
+        requested together in one structured-output call and cached under the
+        same keys extract_job_title uses. Falls back to one call per item if
+        the batch response is unusable.
+        """
+        keys = [prompt_key(LLM_MODEL, self._title_messages(s), TITLE_PARAMS) for s in skills_summaries]
+        titles = [self.llm_cache.get(key) for key in keys]
+        missing = [i for i, title in enumerate(titles) if title is None]
+        if not missing:
+            return titles
+
+        if len(missing) > 1:
+            numbered = "\n".join(f"{n}. {skills_summaries[i]}" for n, i in enumerate(missing))
+            prompt = (
+                "For each numbered candidate below, suggest the most relevant job title "
+                "based on their skills and summary. Answer with one short title per candidate.\n"
+                f"{numbered}"
+            )
+            try:
+                response = self.openai_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.0,
+                    response_format={"type": "json_schema", "json_schema": {
+                        "name": "job_titles",
+                        "strict": True,
+                        "schema": {
+                            "type": "object",
+                            "properties": {"titles": {"type": "array", "items": {
+                                "type": "object",
+                                "properties": {"index": {"type": "integer"}, "title": {"type": "string"}},
+                                "required": ["index", "title"],
+                                "additionalProperties": False,
+                            }}},
+                            "required": ["titles"],
+                            "additionalProperties": False,
+                        },
+                    }},
+                )
+                answers = json.loads(response.choices[0].message.content)["titles"]
+                for answer in answers:
+                    n, title = answer["index"], answer["title"].strip()
+                    if 0 <= n < len(missing) and title and titles[missing[n]] is None:
+                        titles[missing[n]] = title
+                        self.llm_cache.put(keys[missing[n]], LLM_MODEL, title)
+            except Exception as e:
+                print(f"🔥 Batch title extraction failed, falling back to single calls: {e}")
+
+        for i in missing:
+            if titles[i] is None:
+                try:
+                    titles[i] = self.extract_job_title(skills_summaries[i])
+                except Exception as e:
+                    print(f"🔥 Title extraction failed: {e}")
+        return titles
 
     def query_adzuna_job_counts(self, job_title, location, radius_km=50):
         if not self.adzuna_app_id or not self.adzuna_app_key:
@@ -31,48 +203,74 @@ class CandidateRegistrationSystem:
             return 0
 
         country_code = detect_country(location)
-        base_url = f"https://api.adzuna.com/v1/api/jobs/{country_code}/search/1"
-
-        params = {
-            "app_id": self.adzuna_app_id,
-            "app_key": self.adzuna_app_key,
-            "what": job_title,
-            "where": location,
-            "results_per_page": 1,
-            "distance": radius_km,
-        }
-
         try:
-            print(f"Querying Adzuna API with URL: {base_url}")
-            print(f"Parameters: {params}")
-            res = requests.get(base_url, params=params)
-            if res.status_code == 200:
-                data = res.json()
-                total_count = data.get("count", 0)
-                print(f"Jobs found: {total_count}")
-                return total_count
+            print(f"Querying Adzuna for {job_title!r} in {location!r} ({country_code}, {radius_km} km)")
+            total_count = self.adzuna.count(country_code, job_title, location, distance=radius_km)
+            print(f"Jobs found: {total_count}")
+            return total_count
+        except AdzunaError as e:
+            if e.status is not None:
+                print(f"⚠️ Adzuna API error: {e.status} - {e.details}")
             else:
-                print(f"⚠️ Adzuna API error: {res.status_code} - {res.text}")
-                return 0
-        except Exception as e:
+                print(f"🔥 Exception querying Adzuna: {e}")
+            return 0
+        except (ValueError, requests.RequestException) as e:
+            # Anything the client did not wrap (bad JSON, transport errors) still degrades to 0
             print(f"🔥 Exception querying Adzuna: {e}")
             return 0
 
     def generate_interview_questions(self, skills, job_title):
+        # Cached per normalized title, so popular titles are generated once
         prompt = (
             f"Generate 10 interview questions a candidate should prepare for a job titled '{job_title}', "
             f"based on these skills: {skills}."
         )
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300,
-            temperature=0.7,
-        )
-        questions_text = response.choices[0].message.content.strip()
+        questions_text = self.llm_cache.complete(
+            self.openai_client, LLM_MODEL, [{"role": "user", "content": prompt}],
+            cache_key=("interview_questions", " ".join(job_title.lower().split())),
+            ttl=INTERVIEW_QUESTIONS_TTL, **QUESTIONS_PARAMS)
         questions = [q.strip() for q in questions_text.split("\n") if q.strip()]
         return questions[:10]
 
+    def enrich(self, skills, summary, location, radius_km=50, title_future=None):
+        """
+        Derives job title, Adzuna job count and interview questions.
+        The title call starts first (or is passed in already running); the two
+        title-dependent calls then run in parallel. Anything that fails or
+        overruns its timeout is listed in `pending` instead of failing the whole run.
+        """
+        if title_future is None:
+            title_future = _registration_pool.submit(self.extract_job_title, f"{skills} {summary}")
+
+        pending = []
+        job_title, failed = _wait_for(title_future, TITLE_TIMEOUT, "", "Job title extraction")
+        if failed or not job_title:
+            return {"job_title": "", "job_count": 0, "interview_questions": [],
+                    "pending": ["job_title", "job_count", "interview_questions"]}
+        print(f"🧠 AI-derived job title: {job_title}")
+
+        count_future = _registration_pool.submit(
+            self.query_adzuna_job_counts, job_title, location, radius_km=radius_km)
+        questions_future = _registration_pool.submit(
+            self.generate_interview_questions, skills, job_title)
+        started = time.monotonic()
+
+        job_count, failed = _wait_for(count_future, ADZUNA_TIMEOUT, 0, "Adzuna job count")
+        if failed:
+            pending.append("job_count")
+        print(f"📊 Jobs found for '{job_title}' near '{location}' within {radius_km} km: {job_count}")
+
+        remaining = max(0.0, QUESTIONS_TIMEOUT - (time.monotonic() - started))
+        interview_questions, failed = _wait_for(questions_future, remaining, [],
+                                                "Interview question generation")
+        if failed:
+            pending.append("interview_questions")
+        else:
+            print(f"❓ Interview questions generated")
+
+        return {"job_title": job_title, "job_count": job_count,
+                "interview_questions": interview_questions, "pending": pending}
+
     def register(self, request):
         try:
             data = request.get_json()
@@ -89,28 +287,26 @@ class CandidateRegistrationSystem:
                     "error": "Email, name, skills, location, and summary are required."
                 }), 400
 
-            client = get_gspread_client()
+            if REGISTRATION_ASYNC:
+                return self._register_async(email, name, skills, location, summary, radius_km)
+
+            # Title extraction does not depend on the sheet, so start it before the duplicate check
+            title_future = _registration_pool.submit(self.extract_job_title, f"{skills} {summary}")
 
-            users_sheet = client.open_by_key(os.getenv("USERS_SHEET_ID")).sheet1
-            users = users_sheet.get_all_records()
+            users = get_registered_users_repository()
 
-            if any(row["Email"] == email for row in users):
+            if users.exists(email):
+                title_future.cancel()
                 return jsonify({"success": False, "error": "Email already registered."}), 400
 
-            users_sheet.append_row([email, "", ""])
+            users.append([email, "", ""])
             print(f"✅ Registered user: {email} in USERS sheet")
 
-            combined_text = f"{skills} {summary}"
-            job_title = self.extract_job_title(combined_text)
-            print(f"🧠 AI-derived job title: {job_title}")
-
-            job_count = self.query_adzuna_job_counts(job_title, location, radius_km=radius_km)
-            print(f"📊 Jobs found for '{job_title}' near '{location}' within {radius_km} km: {job_count}")
-
-            interview_questions = self.generate_interview_questions(skills, job_title)
-            print(f"❓ Interview questions generated")
+            enrichment = self.enrich(skills, summary, location, radius_km, title_future=title_future)
+            job_title = enrichment["job_title"]
+            job_count = enrichment["job_count"]
+            interview_questions = enrichment["interview_questions"]
 
-            candidates_sheet = client.open_by_key(os.getenv("CANDIDATES_SHEET_ID")).sheet1
             timestamp = datetime.now().isoformat()
 
             # Make sure we write exactly 11 columns
@@ -128,7 +324,7 @@ class CandidateRegistrationSystem:
                 str(radius_km)       # K - Radius
             ]
 
-            candidates_sheet.append_row(row)
+            get_candidates_repository().append(row)
             print(f"✅ Created profile for: {email}")
 
             dashboard_link = "https://ai-talent-marketplace.onrender.com/dashboard"
@@ -138,9 +334,43 @@ class CandidateRegistrationSystem:
                 "job_title": job_title,
                 "job_count": job_count,
                 "interview_questions": interview_questions,
+                "interview_questions_pending": "interview_questions" in enrichment["pending"],
+                "pending": enrichment["pending"],
                 "dashboard_link": dashboard_link
             })
 
         except Exception as e:
             print(f"🔥 Error in register_user: {e}")
             return jsonify({"success": False, "error": str(e)}), 500
+
+    def _register_async(self, email, name, skills, location, summary, radius_km):
+        """Writes the stub profile now; title, job count, questions and embedding fill in later."""
+        users = get_registered_users_repository()
+        if users.exists(email):
+            return jsonify({"success": False, "error": "Email already registered."}), 400
+
+        users.append([email, "", ""])
+        print(f"✅ Registered user: {email} in USERS sheet")
+
+        row = [
+            email, name, skills, location, summary,
+            "", "", "", "",                  # F-I filled in by enrichment tasks
+            datetime.now().isoformat(),      # J - Timestamp
+            str(radius_km)                   # K - Radius
+        ]
+        get_candidates_repository().append(row)
+        print(f"✅ Created stub profile for: {email}")
+
+        payload = {"skills": skills, "summary": summary, "location": location, "radius_km": radius_km}
+        self.queue.enqueue(email, "job_title", payload)
+        self.queue.enqueue(email, "embedding", payload)
+
+        # The caller has no session yet, so the status URL carries a signed, expiring token
+        status_token = get_session_manager().issue_status_token(email)
+        return jsonify({
+            "success": True,
+            "message": "Registration received. Your profile is being enriched.",
+            "status_token": status_token,
+            "status_url": f"/registration_status/{email}?token={status_token}",
+            "dashboard_link": "https://ai-talent-marketplace.onrender.com/dashboard"
+        }), 202
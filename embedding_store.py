@@ -0,0 +1,392 @@
+import os
+import json
+import time
+import base64
+import fcntl
+import heapq
+import hashlib
+import threading
+import numpy as np
+from vector_codec import quantize, dequantize
+
+# --- Embedding store settings ---
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+# The index journal is folded into index.json once it has more lines than this (or than entries)
+EMBEDDING_JOURNAL_COMPACT_LINES = int(os.getenv("EMBEDDING_JOURNAL_COMPACT_LINES", "5000"))
+# A full store evicts at least this fraction of its capacity at once, so eviction is amortized
+EMBEDDING_EVICT_FRACTION = 0.01
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different copies share one entry."""
+    return " ".join((text or "").split())
+
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# Prefixes marking the compact sheet-cell formats (base64 of little-endian bytes):
+# float32 values, float16 values, or a float32 scale followed by int8 codes
+F32_PREFIX = "f32:"
+F16_PREFIX = "f16:"
+I8_PREFIX = "i8:"
+CELL_FORMATS = {"f32": F32_PREFIX, "f16": F16_PREFIX, "i8": I8_PREFIX}
+# Format new cells are written in; at 3072 dims f16 is ~8 KB and i8 ~4 KB of text
+EMBEDDING_CELL_FORMAT = os.getenv("EMBEDDING_CELL_FORMAT", "f16")
+# Hex digits of the embedded text's hash recorded in a tagged cell
+CELL_TEXT_KEY_LENGTH = 16
+
+
+def cell_format(encoded):
+    """"f32", "f16", "i8" or "json" (legacy base64-of-JSON) for a stored cell."""
+    for name, prefix in CELL_FORMATS.items():
+        if encoded.startswith(prefix):
+            return name
+    return "json"
+
+
+def cell_info(encoded):
+    """
+    What a stored cell says about itself: {"format", "model", "dim", "text_key"}.
+    Tagged cells ("<fmt>:<model>:<dim>:<text key>:<base64>") record the model
+    and the hash of the exact text embedded; untagged and legacy cells give None
+    for those, since nothing is known about what produced them.
+    """
+    fmt = cell_format(encoded)
+    info = {"format": fmt, "model": None, "dim": None, "text_key": None}
+    if fmt != "json":
+        parts = encoded[len(CELL_FORMATS[fmt]):].split(":")
+        if len(parts) == 4:
+            info.update(model=parts[0], dim=int(parts[1]), text_key=parts[2] or None)
+    return info
+
+
+def _cell_payload(encoded, fmt):
+    return encoded[len(CELL_FORMATS[fmt]):].rsplit(":", 1)[-1]
+
+
+def is_current_cell(encoded, model, text):
+    """True if the cell is tagged as `model`'s embedding of exactly `text`."""
+    info = cell_info(encoded)
+    return (info["model"] == model
+            and info["text_key"] == text_key(text)[:CELL_TEXT_KEY_LENGTH])
+
+
+def serialize_embedding(embedding, fmt=None, model=None, text=None):
+    """
+    Sheet-cell encoding of a vector in `fmt` (default EMBEDDING_CELL_FORMAT).
+    With `model` the cell is tagged with the model, dimension and (with `text`)
+    the hash of the embedded text, so readers can tell whether it still applies.
+    """
+    fmt = fmt or EMBEDDING_CELL_FORMAT
+    if fmt == "f32":
+        data = np.asarray(embedding, dtype="<f4").tobytes()
+    elif fmt == "f16":
+        data = np.asarray(embedding, dtype=np.float32).astype("<f2").tobytes()
+    elif fmt == "i8":
+        codes, scales = quantize(embedding, "int8")
+        data = scales.astype("<f4").tobytes() + codes.tobytes()
+    else:
+        raise ValueError(f"Unknown embedding cell format '{fmt}'")
+    tag = ""
+    if model:
+        key = text_key(text)[:CELL_TEXT_KEY_LENGTH] if text is not None else ""
+        tag = f"{model}:{len(embedding)}:{key}:"
+    return CELL_FORMATS[fmt] + tag + base64.b64encode(data).decode()
+
+
+def deserialize_embedding(encoded):
+    """Decodes every compact format (tagged or not) and legacy base64-of-JSON cells."""
+    fmt = cell_format(encoded)
+    if fmt == "json":
+        return json.loads(base64.b64decode(encoded.encode()).decode())
+    data = base64.b64decode(_cell_payload(encoded, fmt))
+    if fmt == "f32":
+        return np.frombuffer(data, dtype="<f4").tolist()
+    if fmt == "f16":
+        return np.frombuffer(data, dtype="<f2").astype(np.float32).tolist()
+    scale = np.frombuffer(data[:4], dtype="<f4")
+    codes = np.frombuffer(data[4:], dtype=np.int8)
+    return dequantize(codes, scale)[0].tolist()
+
+
+def _tag(key):
+    # Non-zero 63-bit tag written next to each slot so readers can detect reuse
+    return (int(key[:16], 16) >> 1) or 1
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache for one model, keyed by a hash of the normalized text.
+
+    Vectors live in a memory-mapped float32 file (`vectors.f32`, one slot per row)
+    with a parallel tag file. `index.json` is a snapshot mapping key →
+    [slot, last_access]; each write appends its changes to `index.log` and
+    the snapshot is only rewritten when the log grows past
+    EMBEDDING_JOURNAL_COMPACT_LINES. New keys take a freed slot or the next
+    one past the high-water mark, so a put costs O(items), not O(capacity).
+    Writers take an exclusive flock; readers replay new log lines (or reload
+    a replaced snapshot) and verify the slot tag after copying, so several
+    gunicorn workers can share one directory safely. When full, the least
+    recently used entries are evicted in batches.
+    """
+
+    def __init__(self, model, root=None, max_entries=None):
+        self.model = model
+        self.max_entries = max_entries or EMBEDDING_CACHE_MAX_ENTRIES
+        safe_model = "".join(c if c.isalnum() or c in "-_." else "_" for c in model)
+        self.path = os.path.join(root or EMBEDDING_CACHE_DIR, safe_model)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._index_path = os.path.join(self.path, "index.json")
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._tags_path = os.path.join(self.path, "tags.u64")
+        self._lock_path = os.path.join(self.path, "index.lock")
+        self._journal_path = os.path.join(self.path, "index.log")
+
+        self._mutex = threading.Lock()
+        self._index_mtime = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._dim = None
+        self._entries = {}
+        self._free = set()
+        self._high_water = 0
+        self._touched = {}
+        self._vectors = None
+        self._tags = None
+        self.hits = 0
+        self.misses = 0
+
+    # --- File handling ---
+
+    def _flock(self, mode):
+        handle = open(self._lock_path, "a")
+        fcntl.flock(handle, mode)
+        return handle
+
+    def _open_arrays(self, mode="r"):
+        if self._dim is None or not os.path.exists(self._vectors_path):
+            self._vectors = self._tags = None
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode,
+                                  shape=(self.max_entries, self._dim))
+        self._tags = np.memmap(self._tags_path, dtype=np.uint64, mode=mode,
+                               shape=(self.max_entries,))
+
+    def _changed(self):
+        try:
+            index_mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        try:
+            journal_size = os.stat(self._journal_path).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return index_mtime != self._index_mtime or journal_size != self._journal_offset
+
+    def _refresh(self, locked=False):
+        if not self._changed():
+            return
+
+        handle = None if locked else self._flock(fcntl.LOCK_SH)
+        try:
+            index_mtime = os.stat(self._index_path).st_mtime_ns
+            if index_mtime != self._index_mtime:
+                with open(self._index_path) as f:
+                    index = json.load(f)
+                self._index_mtime = index_mtime
+                self._load_snapshot(index)
+            self._replay_journal()
+        finally:
+            if handle:
+                handle.close()
+        self._open_arrays()
+
+    def _load_snapshot(self, index):
+        if index.get("max_entries") != self.max_entries:
+            # Another process created the store with a different capacity
+            self.max_entries = index["max_entries"]
+        self._dim = index.get("dim")
+        self._entries = index.get("entries", {})
+        used = {entry[0] for entry in self._entries.values()}
+        self._high_water = index.get("high_water", max(used, default=-1) + 1)
+        self._free = set(range(self._high_water)) - used
+        self._journal_offset = self._journal_lines = 0
+
+    def _replay_journal(self):
+        """Applies log lines written since the last replay: [key, slot, atime] sets, [key] evicts."""
+        try:
+            with open(self._journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            record = json.loads(line)
+            self._apply(record)
+            self._journal_lines += 1
+        self._journal_offset += len(complete)
+
+    def _apply(self, record):
+        if len(record) == 1:
+            entry = self._entries.pop(record[0], None)
+            if entry is not None:
+                self._free.add(entry[0])
+            return
+        key, slot, atime = record
+        self._entries[key] = [slot, atime]
+        self._free.discard(slot)
+        self._high_water = max(self._high_water, slot + 1)
+
+    def _take_slot(self):
+        if self._free:
+            return self._free.pop()
+        if self._high_water < self.max_entries:
+            self._high_water += 1
+            return self._high_water - 1
+        return None
+
+    def _write_index(self):
+        """Writes a snapshot of the index and empties the log it supersedes (exclusive flock held)."""
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "model": self.model,
+                "dim": self._dim,
+                "max_entries": self.max_entries,
+                "high_water": self._high_water,
+                "entries": self._entries,
+            }, f)
+        os.replace(tmp_path, self._index_path)
+        open(self._journal_path, "w").close()
+        self._index_mtime = os.stat(self._index_path).st_mtime_ns
+        self._journal_offset = self._journal_lines = 0
+
+    def _append_journal(self, records):
+        with open(self._journal_path, "ab") as f:
+            f.write(b"".join(json.dumps(r).encode() + b"\n" for r in records))
+            self._journal_offset = f.tell()
+        self._journal_lines += len(records)
+
+    # --- Public API ---
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        """Returns cached vectors (lists of floats) aligned with `texts`, None for misses."""
+        results = [None] * len(texts)
+        with self._mutex:
+            self._refresh()
+            if self._vectors is None:
+                self.misses += len(texts)
+                return results
+
+            now = time.time()
+            for i, text in enumerate(texts):
+                key = text_key(text)
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                slot = entry[0]
+                vector = np.array(self._vectors[slot])
+                if int(self._tags[slot]) != _tag(key):
+                    # Slot was recycled by another worker after our index snapshot
+                    self.misses += 1
+                    continue
+                results[i] = vector.tolist()
+                self._touched[key] = now
+                self.hits += 1
+        return results
+
+    def put_many(self, texts, vectors):
+        """Stores vectors for texts, skipping None vectors; evicts LRU entries when full."""
+        items = {}
+        for text, vector in zip(texts, vectors):
+            if vector is not None and text and text.strip():
+                items[text_key(text)] = vector
+        if not items:
+            return
+
+        with self._mutex:
+            handle = self._flock(fcntl.LOCK_EX)
+            try:
+                self._refresh(locked=True)
+                if self._dim is None:
+                    self._dim = len(next(iter(items.values())))
+                    np.memmap(self._vectors_path, dtype=np.float32, mode="w+",
+                              shape=(self.max_entries, self._dim)).flush()
+                    np.memmap(self._tags_path, dtype=np.uint64, mode="w+",
+                              shape=(self.max_entries,)).flush()
+                    self._write_index()
+                self._open_arrays(mode="r+")
+
+                # Carry over last-access times recorded by reads since the last write
+                records = []
+                for key, atime in self._touched.items():
+                    entry = self._entries.get(key)
+                    if entry is not None and atime > entry[1]:
+                        entry[1] = atime
+                        records.append([key, entry[0], atime])
+                self._touched.clear()
+
+                now = time.time()
+                new_keys = [k for k in items if k not in self._entries]
+                available = len(self._free) + self.max_entries - self._high_water
+                overflow = len(new_keys) - available
+                if overflow > 0:
+                    n = max(overflow, int(self.max_entries * EMBEDDING_EVICT_FRACTION))
+                    oldest = heapq.nsmallest(n, self._entries.items(), key=lambda kv: kv[1][1])
+                    for key, (slot, _) in oldest:
+                        del self._entries[key]
+                        self._tags[slot] = 0
+                        self._free.add(slot)
+                        records.append([key])
+
+                for key, vector in items.items():
+                    if len(vector) != self._dim:
+                        print(f"⚠️ Skipping cached vector with dim {len(vector)} != {self._dim}")
+                        continue
+                    entry = self._entries.get(key)
+                    slot = entry[0] if entry is not None else self._take_slot()
+                    if slot is None:
+                        continue
+                    self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+                    self._tags[slot] = _tag(key)
+                    self._entries[key] = [slot, now]
+                    records.append([key, slot, now])
+
+                self._vectors.flush()
+                self._tags.flush()
+                if self._journal_lines + len(records) > max(EMBEDDING_JOURNAL_COMPACT_LINES, len(self._entries)):
+                    self._write_index()
+                else:
+                    self._append_journal(records)
+                self._open_arrays()
+            finally:
+                handle.close()
+
+    def put(self, text, vector):
+        self.put_many([text], [vector])
+
+    def __len__(self):
+        with self._mutex:
+            self._refresh()
+            return len(self._entries)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(model):
+    """Returns the process-wide EmbeddingStore for `model`."""
+    with _stores_lock:
+        if model not in _stores:
+            _stores[model] = EmbeddingStore(model)
+        return _stores[model]
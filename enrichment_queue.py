@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+import metrics
+
+# --- Enrichment queue settings ---
+ENRICHMENT_QUEUE_PATH = os.getenv("ENRICHMENT_QUEUE_PATH", ".enrichment_queue.sqlite3")
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "2"))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "5"))
+ENRICHMENT_BACKOFF_BASE = float(os.getenv("ENRICHMENT_BACKOFF_BASE", "2"))
+ENRICHMENT_BACKOFF_MAX = float(os.getenv("ENRICHMENT_BACKOFF_MAX", "300"))
+ENRICHMENT_LEASE_SECONDS = float(os.getenv("ENRICHMENT_LEASE_SECONDS", "300"))
+ENRICHMENT_POLL_INTERVAL = float(os.getenv("ENRICHMENT_POLL_INTERVAL", "1"))
+
+
+class EnrichmentQueue:
+    """
+    Durable task queue in SQLite, safe to share between gunicorn workers.
+
+    A task is claimed atomically (BEGIN IMMEDIATE) and leased for
+    ENRICHMENT_LEASE_SECONDS; tasks whose worker died are reclaimed after the
+    lease. Failures are retried with exponential backoff and jitter up to
+    ENRICHMENT_MAX_ATTEMPTS, then marked failed.
+    """
+
+    def __init__(self, path=None, max_attempts=None):
+        self.path = path or ENRICHMENT_QUEUE_PATH
+        self.max_attempts = max_attempts or ENRICHMENT_MAX_ATTEMPTS
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " email TEXT NOT NULL,"
+                " task TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'queued',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_run_at REAL NOT NULL,"
+                " last_error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_email ON tasks (email)")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, next_run_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, email, task, payload=None, delay=0.0):
+        now = time.time()
+        cur = self._connect().execute(
+            "INSERT INTO tasks (email, task, payload, next_run_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (email, task, json.dumps(payload or {}), now + delay, now, now),
+        )
+        return cur.lastrowid
+
+    def enqueue_many(self, items, delay=0.0):
+        """Enqueues (email, task, payload) tuples in one transaction; returns how many."""
+        now = time.time()
+        rows = [(email, task, json.dumps(payload or {}), now + delay, now, now)
+                for email, task, payload in items]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO tasks (email, task, payload, next_run_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def claim(self):
+        """Leases the oldest ready task; returns (id, email, task, payload, attempts) or None."""
+        claimed = self._claim(None, 1)
+        return claimed[0] if claimed else None
+
+    def claim_batch(self, task, limit):
+        """Leases up to `limit` ready tasks of one kind, oldest first."""
+        return self._claim(task, limit) if limit > 0 else []
+
+    def _claim(self, task, limit):
+        conn = self._connect()
+        now = time.time()
+        task_filter = "" if task is None else " AND task = ?"
+        params = (now, now - ENRICHMENT_LEASE_SECONDS) + (() if task is None else (task,)) + (limit,)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, email, task, payload, attempts FROM tasks"
+                " WHERE ((status = 'queued' AND next_run_at <= ?)"
+                "    OR (status = 'running' AND updated_at <= ?))" + task_filter +
+                " ORDER BY id LIMIT ?",
+                params,
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'running', updated_at = ? WHERE id = ?",
+                [(now, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(task_id, email, name, json.loads(payload), attempts)
+                for task_id, email, name, payload, attempts in rows]
+
+    def complete(self, task_id):
+        self._connect().execute(
+            "UPDATE tasks SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), task_id),
+        )
+
+    def fail(self, task_id, attempts, error):
+        attempts += 1
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, next_run_at = "failed", now
+        else:
+            delay = min(ENRICHMENT_BACKOFF_MAX, ENRICHMENT_BACKOFF_BASE * 2 ** attempts)
+            status, next_run_at = "queued", now + delay * random.uniform(0.8, 1.2)
+        self._connect().execute(
+            "UPDATE tasks SET status = ?, attempts = ?, next_run_at = ?, last_error = ?, updated_at = ?"
+            " WHERE id = ?",
+            (status, attempts, next_run_at, str(error)[:500], now, task_id),
+        )
+        return status
+
+    def status(self, email):
+        """Latest state of each task for one candidate, plus an overall summary state."""
+        rows = self._connect().execute(
+            "SELECT task, status, attempts, last_error, updated_at FROM tasks"
+            " WHERE email = ? ORDER BY id",
+            (email,),
+        ).fetchall()
+        tasks = {}
+        for task, status, attempts, last_error, updated_at in rows:
+            tasks[task] = {"status": status, "attempts": attempts,
+                           "last_error": last_error, "updated_at": updated_at}
+
+        states = {t["status"] for t in tasks.values()}
+        if not tasks:
+            overall = "unknown"
+        elif states <= {"done"}:
+            overall = "done"
+        elif "failed" in states and not states & {"queued", "running"}:
+            overall = "failed"
+        else:
+            overall = "pending"
+        return {"email": email, "status": overall, "tasks": tasks}
+
+
+class EnrichmentWorkerPool:
+    """
+    Background threads that claim tasks and dispatch them to handlers by task name.
+
+    `batch_handlers` maps a task name to (handler, max_batch): when one such
+    task is claimed, up to max_batch - 1 more ready tasks of the same kind are
+    leased with it and the handler receives [(email, payload)], returning one
+    exception (or None) per item.
+    """
+
+    def __init__(self, queue, handlers, workers=None, batch_handlers=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.batch_handlers = batch_handlers or {}
+        self.workers = workers or ENRICHMENT_WORKERS
+        self._threads = []
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"enrichment-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 Started {self.workers} enrichment workers")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self):
+        """Processes one ready task; returns False if the queue had nothing ready."""
+        claimed = self.queue.claim()
+        if claimed is None:
+            return False
+        task_id, email, task, payload, attempts = claimed
+        if task in self.batch_handlers:
+            handler, max_batch = self.batch_handlers[task]
+            self._run_batch(task, handler, [claimed] + self.queue.claim_batch(task, max_batch - 1))
+            return True
+        handler = self.handlers.get(task)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for task '{task}'")
+            with metrics.timer(f"enrichment.{task}"):
+                handler(email, payload)
+            self.queue.complete(task_id)
+            print(f"✅ Enrichment task '{task}' done for {email}")
+        except Exception as e:
+            status = self.queue.fail(task_id, attempts, e)
+            print(f"🔥 Enrichment task '{task}' for {email} failed ({status}): {e}")
+        return True
+
+    def _run_batch(self, task, handler, claimed):
+        try:
+            with metrics.timer(f"enrichment.{task}"):
+                errors = handler([(email, payload) for _, email, _, payload, _ in claimed])
+        except Exception as e:
+            errors = [e] * len(claimed)
+        for (task_id, email, _, _, attempts), error in zip(claimed, errors):
+            if error is None:
+                self.queue.complete(task_id)
+                print(f"✅ Enrichment task '{task}' done for {email}")
+            else:
+                status = self.queue.fail(task_id, attempts, error)
+                print(f"🔥 Enrichment task '{task}' for {email} failed ({status}): {error}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(ENRICHMENT_POLL_INTERVAL)
+            except Exception as e:
+                print(f"🔥 Enrichment worker error: {e}")
+                self._stop.wait(ENRICHMENT_POLL_INTERVAL)
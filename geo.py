@@ -0,0 +1,147 @@
+import threading
+import numpy as np
+
+# WGS-84 ellipsoid, same model geopy's geodesic uses
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+EARTH_RADIUS_KM = 6371.0088
+
+# Penalty bounds of geo_penalties, the ranker's geo term
+MIN_GEO_PENALTY = 0.5
+PENALTY_DISTANCE_KM = 20000.0
+
+
+def haversine_km(lat1, lon1, lats, lons):
+    """Great-circle distance from one point to arrays of points, in km."""
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lats, lons = np.radians(lats), np.radians(lons)
+    h = (np.sin((lats - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def vincenty_km(lat1, lon1, lats, lons, max_iter=200, tol=1e-12):
+    """
+    Ellipsoidal (Vincenty inverse) distance from one point to arrays of points, in km.
+    Agrees with geopy's geodesic to well under a metre; the rare nearly antipodal
+    pairs that do not converge fall back to haversine.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lats)))
+    L = np.radians(lons - lon1)
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    sin_sigma = cos_sigma = sigma = cos2_alpha = cos_2sigma_m = np.zeros_like(lam)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2
+                                + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0,
+                                    cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * WGS84_F * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam - lam_prev) < tol
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distance = WGS84_B * A * (sigma - delta_sigma) / 1000.0
+
+    fallback = ~converged | ~np.isfinite(distance)
+    if fallback.any():
+        distance = np.where(fallback, haversine_km(lat1, lon1, lats, lons), distance)
+    return distance
+
+
+def bounding_box_mask(origin, coords, radius_km):
+    """
+    Cheap prefilter: True for rows of `coords` inside the lat/lon box that
+    encloses a `radius_km` circle around `origin`. Unknown coords are False.
+    """
+    lat, lon = origin
+    dlat = radius_km / 111.0
+    cos_lat = max(np.cos(np.radians(lat)), 1e-6)
+    dlon = min(180.0, radius_km / (111.320 * cos_lat))
+    lat_ok = np.abs(coords[:, 0] - lat) <= dlat
+    lon_diff = np.abs(coords[:, 1] - lon)
+    lon_ok = np.minimum(lon_diff, 360.0 - lon_diff) <= dlon
+    return lat_ok & lon_ok
+
+
+def geo_penalties(distances_km):
+    """Vectorized `max(0.5, 1 - d/20000)`; unknown (NaN) distances get no penalty."""
+    distances_km = np.asarray(distances_km, dtype=np.float64)
+    penalties = np.maximum(MIN_GEO_PENALTY, 1 - distances_km / PENALTY_DISTANCE_KM)
+    return np.where(np.isnan(distances_km), 1.0, penalties)
+
+
+class CoordinateTable:
+    """
+    Location name → (lat, lon) table backed by NumPy arrays.
+    Each distinct name is geocoded once; names that fail to resolve are left
+    out so they are retried on the next call.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._coords = np.empty((0, 2), dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def resolve(self, names, geocode):
+        """Returns an (N, 2) lat/lon array for `names` (NaN where unknown), geocoding unseen ones."""
+        with self._lock:
+            unseen = [n for n in dict.fromkeys(names) if n not in self._rows]
+
+        resolved = {}
+        for name in unseen:
+            coords = geocode(name)
+            if coords:
+                resolved[name] = coords
+
+        with self._lock:
+            new_names = [n for n in resolved if n not in self._rows]
+            if new_names:
+                for offset, name in enumerate(new_names):
+                    self._rows[name] = len(self._coords) + offset
+                self._coords = np.vstack([
+                    self._coords, np.array([resolved[n] for n in new_names], dtype=np.float64)])
+
+            rows = np.fromiter((self._rows.get(n, -1) for n in names), dtype=np.int64, count=len(names))
+            result = np.full((len(names), 2), np.nan)
+            found = rows >= 0
+            result[found] = self._coords[rows[found]]
+            return result
+
+
+def distances_from(origin, coords):
+    """Distances in km from an (lat, lon) origin to each row of `coords`; NaN where unknown."""
+    distances = np.full(len(coords), np.nan)
+    if origin is None or not len(coords):
+        return distances
+    known = ~np.isnan(coords).any(axis=1)
+    if known.any():
+        distances[known] = vincenty_km(origin[0], origin[1], coords[known, 0], coords[known, 1])
+    return distances
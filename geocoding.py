@@ -0,0 +1,194 @@
+import os
+import csv
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+import metrics
+
+# --- Geocoding cache settings ---
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", ".geocode_cache.sqlite3")
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", str(24 * 3600)))
+GEOCODE_POSITIVE_TTL = float(os.getenv("GEOCODE_POSITIVE_TTL", str(90 * 24 * 3600)))
+GEOCODE_MEMORY_SIZE = int(os.getenv("GEOCODE_MEMORY_SIZE", "10000"))
+GEOCODE_OFFLINE_GAZETTEER = os.getenv("GEOCODE_OFFLINE_GAZETTEER", "1") == "1"
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+
+# Extra spellings accepted after a city name, e.g. "London, UK"
+COUNTRY_ALIASES = {
+    "gb": ["uk", "england", "scotland", "wales", "great britain"],
+    "us": ["usa", "us", "united states of america"],
+    "ae": ["uae"],
+}
+
+_MISS = object()
+
+
+def normalize_location(name):
+    return " ".join((name or "").lower().replace(" ,", ",").split())
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Reads the bundled city list into {normalized name: (lat, lon)}."""
+    gazetteer = {}
+    if not os.path.exists(path):
+        return gazetteer
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            coords = (float(row["lat"]), float(row["lon"]))
+            city = normalize_location(row["name"])
+            code = row["country_code"].lower()
+            suffixes = [normalize_location(row["country"]), code] + COUNTRY_ALIASES.get(code, [])
+            gazetteer.setdefault(city, coords)
+            for suffix in suffixes:
+                gazetteer.setdefault(f"{city}, {suffix}", coords)
+    return gazetteer
+
+
+_default_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def default_gazetteer():
+    """The bundled gazetteer, parsed once per process (before fork when gunicorn preloads)."""
+    global _default_gazetteer
+    with _gazetteer_lock:
+        if _default_gazetteer is None:
+            _default_gazetteer = load_gazetteer()
+        return _default_gazetteer
+
+
+class Geocoder:
+    """
+    Location name → (lat, lon) lookup layered as:
+    in-memory LRU → offline gazetteer → SQLite cache → network (`geocode_fn`).
+
+    The SQLite file (WAL mode) is shared by every gunicorn worker and survives
+    restarts. Misses are cached too, for GEOCODE_NEGATIVE_TTL seconds, and
+    concurrent lookups of the same name within a process wait on one call.
+    """
+
+    def __init__(self, geocode_fn, path=None, negative_ttl=None, positive_ttl=None,
+                 memory_size=None, use_gazetteer=None):
+        self.geocode_fn = geocode_fn
+        self.path = path or GEOCODE_CACHE_PATH
+        self.negative_ttl = GEOCODE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.positive_ttl = GEOCODE_POSITIVE_TTL if positive_ttl is None else positive_ttl
+        self.memory_size = memory_size or GEOCODE_MEMORY_SIZE
+        use_gazetteer = GEOCODE_OFFLINE_GAZETTEER if use_gazetteer is None else use_gazetteer
+        self.gazetteer = default_gazetteer() if use_gazetteer else {}
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._local = threading.local()
+        self.stats = {"memory": 0, "gazetteer": 0, "sqlite": 0, "network": 0, "coalesced": 0}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " name TEXT PRIMARY KEY, lat REAL, lon REAL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    # --- Cache layers ---
+
+    def _remember(self, key, coords, expires_at):
+        with self._lock:
+            self._memory[key] = (coords, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return _MISS
+            coords, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return _MISS
+            self._memory.move_to_end(key)
+            return coords
+
+    def _from_sqlite(self, key):
+        row = self._connect().execute(
+            "SELECT lat, lon, updated_at FROM geocode WHERE name = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _MISS
+        lat, lon, updated_at = row
+        coords = (lat, lon) if lat is not None else None
+        expires_at = updated_at + (self.positive_ttl if coords else self.negative_ttl)
+        if expires_at < time.time():
+            return _MISS
+        self._remember(key, coords, expires_at)
+        return coords
+
+    def _store(self, key, coords):
+        now = time.time()
+        lat, lon = coords if coords else (None, None)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (name, lat, lon, updated_at) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, now),
+            )
+        self._remember(key, coords, now + (self.positive_ttl if coords else self.negative_ttl))
+
+    # --- Public API ---
+
+    def lookup(self, name):
+        key = normalize_location(name)
+        if not key:
+            return None
+
+        coords = self._from_memory(key)
+        if coords is not _MISS:
+            self.stats["memory"] += 1
+            metrics.cache("geocode", hits=1)
+            return coords
+
+        if key in self.gazetteer:
+            self.stats["gazetteer"] += 1
+            metrics.cache("geocode", hits=1)
+            return self.gazetteer[key]
+
+        coords = self._from_sqlite(key)
+        if coords is not _MISS:
+            self.stats["sqlite"] += 1
+            metrics.cache("geocode", hits=1)
+            return coords
+
+        # Coalesce: the first caller resolves, everyone else waits for its answer
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            self.stats["coalesced"] += 1
+            event.wait(timeout=30)
+            coords = self._from_memory(key)
+            return None if coords is _MISS else coords
+
+        try:
+            self.stats["network"] += 1
+            metrics.cache("geocode", misses=1)
+            coords = self.geocode_fn(name)
+            self._store(key, coords)
+            return coords
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
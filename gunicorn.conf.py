@@ -0,0 +1,31 @@
+"""
+Gunicorn settings. The app is preloaded in the master so workers fork with
+modules (and the gazetteer) already imported and share those pages
+copy-on-write. Nothing preloaded may hold a SQLite connection, socket or
+thread: those are created per worker, lazily or in post_fork.
+"""
+import os
+import threading
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def on_starting(server):
+    # Fork-safe, read-only state worth sharing across workers
+    import geocoding
+    geocoding.default_gazetteer()
+
+
+def post_fork(server, worker):
+    import main
+    # Start enrichment workers / match refresher without delaying the worker's boot;
+    # before_request still guarantees they are running before the first request is handled
+    threading.Thread(target=main.start_background_workers, name="warm-start", daemon=True).start()
+
+
+def when_ready(server):
+    import services
+    server.log.info(f"Startup report: {services.startup_report()}")
@@ -0,0 +1,193 @@
+import os
+import threading
+import numpy as np
+
+# Above this many jobs, search switches to the cluster-partitioned (IVF) mode
+IVF_THRESHOLD = int(os.getenv("JOB_INDEX_IVF_THRESHOLD", "100000"))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first, without sorting everything."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part])]
+
+
+class JobIndex:
+    """
+    In-memory cosine-similarity index over job embeddings.
+
+    Vectors are L2-normalized on insert and kept in one contiguous float32 matrix,
+    so a query is a single matrix-vector product followed by `argpartition`.
+    Removal swaps the last row into the freed slot, keeping the matrix dense.
+
+    With `ivf=True` (or "auto" once the index grows past IVF_THRESHOLD) jobs are
+    clustered with spherical k-means and a query only scores the `nprobe`
+    closest clusters.
+    """
+
+    def __init__(self, dim=None, capacity=1024, ivf="auto", n_lists=None, nprobe=8):
+        self.dim = dim
+        self._capacity = capacity
+        self._matrix = None
+        self._ids = []
+        self._rows = {}
+        self._lock = threading.RLock()
+
+        self.ivf = ivf
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self._centroids = None
+        self._assign = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, job_id):
+        return job_id in self._rows
+
+    @property
+    def ids(self):
+        return list(self._ids)
+
+    def get_vectors(self, job_ids):
+        """Returns (ids found, their normalized vectors as an (n, dim) matrix)."""
+        with self._lock:
+            found = [j for j in job_ids if j in self._rows]
+            rows = [self._rows[j] for j in found]
+            if self._matrix is None:
+                return found, np.empty((0, self.dim or 0), dtype=np.float32)
+            return found, self._matrix[rows]
+
+    # --- Mutation ---
+
+    def _ensure_capacity(self, needed):
+        if self._matrix is None:
+            self._capacity = max(self._capacity, needed)
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            self._assign = np.full(self._capacity, -1, dtype=np.int32)
+            return
+        if needed <= self._capacity:
+            return
+        while self._capacity < needed:
+            self._capacity *= 2
+        matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        assign = np.full(self._capacity, -1, dtype=np.int32)
+        assign[:len(self._ids)] = self._assign[:len(self._ids)]
+        self._matrix, self._assign = matrix, assign
+
+    def add(self, job_id, vector):
+        self.add_many([job_id], [vector])
+
+    def add_many(self, job_ids, vectors):
+        """Adds or replaces vectors for the given job ids."""
+        if not job_ids:
+            return
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dim {self.dim}, got {vectors.shape[1]}")
+
+            new_count = sum(1 for job_id in set(job_ids) if job_id not in self._rows)
+            self._ensure_capacity(len(self._ids) + new_count)
+
+            for job_id, vector in zip(job_ids, vectors):
+                row = self._rows.get(job_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(job_id)
+                    self._rows[job_id] = row
+                self._matrix[row] = vector
+                if self._centroids is not None:
+                    self._assign[row] = int(np.argmax(self._centroids @ vector))
+
+            self._maybe_build_ivf()
+
+    def remove(self, job_id):
+        with self._lock:
+            row = self._rows.pop(job_id, None)
+            if row is None:
+                return False
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._assign[row] = self._assign[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids.pop()
+            return True
+
+    def sync(self, job_ids):
+        """Drops every indexed job not in `job_ids`; returns the ids still missing."""
+        wanted = set(job_ids)
+        with self._lock:
+            for job_id in [j for j in self._ids if j not in wanted]:
+                self.remove(job_id)
+            return [j for j in wanted if j not in self._rows]
+
+    # --- IVF mode ---
+
+    def _maybe_build_ivf(self):
+        if self.ivf == "auto" and self._centroids is None and len(self._ids) >= IVF_THRESHOLD:
+            self.build_ivf()
+
+    def build_ivf(self, n_lists=None, n_iter=10, seed=0):
+        """Clusters the current vectors with spherical k-means (default ~sqrt(n) lists)."""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return
+            n_lists = min(n, n_lists or self.n_lists or max(1, int(np.sqrt(n))))
+            data = self._matrix[:n]
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(n, n_lists, replace=False)].copy()
+
+            for _ in range(n_iter):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = np.bincount(assign, minlength=n_lists) == 0
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+
+            self._centroids = centroids.astype(np.float32)
+            self._assign[:n] = np.argmax(data @ self._centroids.T, axis=1)
+            print(f"🗂️ Built IVF job index: {n} jobs in {n_lists} lists")
+
+    # --- Query ---
+
+    def search(self, query, k=5):
+        """Returns up to k (job_id, cosine_similarity) pairs, best first."""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or query is None:
+                return []
+            q = _normalize(np.asarray(query, dtype=np.float32))
+
+            if self._centroids is not None and self.ivf:
+                probe = _top_k(self._centroids @ q, self.nprobe)
+                rows = np.flatnonzero(np.isin(self._assign[:n], probe))
+                scores = self._matrix[rows] @ q
+            else:
+                rows = None
+                scores = self._matrix[:n] @ q
+
+            best = _top_k(scores, k)
+            if rows is not None:
+                return [(self._ids[rows[i]], float(scores[i])) for i in best]
+            return [(self._ids[i], float(scores[i])) for i in best]
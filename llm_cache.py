@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import metrics
+
+# --- LLM completion cache settings ---
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+# Evict expired/least-recently-used rows once every this many writes
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+
+
+def prompt_key(model, messages, params, cache_key=None):
+    """
+    Cache key for a chat completion: (model, prompt hash, params). Passing
+    `cache_key` replaces the prompt, for calls cached by meaning rather than text.
+    """
+    prompt = messages if cache_key is None else {"cache_key": cache_key}
+    blob = json.dumps({"model": model, "prompt": prompt, "params": params},
+                      sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Persistent prompt → completion cache in SQLite (WAL, shared by every
+    gunicorn worker). Entries expire after their TTL and the table is trimmed
+    to LLM_CACHE_MAX_ENTRIES by last access.
+
+    Only deterministic calls (temperature 0) are cached by prompt; sampled
+    calls are cached only when the caller supplies an explicit `cache_key`.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or LLM_CACHE_PATH
+        self.ttl = LLM_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or LLM_CACHE_MAX_ENTRIES
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, completion TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT completion FROM completions WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key, model, completion, ttl=None):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, completion, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, completion, now + (self.ttl if ttl is None else ttl), now),
+            )
+        self._count("writes")
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % LLM_CACHE_EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drops expired rows, then the least recently used beyond max_entries."""
+        conn = self._connect()
+        with conn:
+            removed = conn.execute("DELETE FROM completions WHERE expires_at <= ?", (time.time(),)).rowcount
+            removed += conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                " SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self._count("evicted", removed)
+        return removed
+
+    def complete(self, client, model, messages, cache_key=None, ttl=None, **params):
+        """
+        Text of a chat completion, served from the cache when possible.
+        Uncacheable calls (sampled, no `cache_key`) go straight to the API.
+        """
+        cacheable = cache_key is not None or params.get("temperature", 1.0) == 0
+        key = prompt_key(model, messages, params, cache_key) if cacheable else None
+        if key is not None:
+            cached = self.get(key)
+            metrics.cache("llm", hits=cached is not None, misses=cached is None)
+            if cached is not None:
+                return cached
+
+        with metrics.timer("openai.chat"):
+            response = client.chat.completions.create(model=model, messages=messages, **params)
+        completion = response.choices[0].message.content.strip()
+        if key is not None and completion:
+            self.put(key, model, completion, ttl=ttl)
+        return completion
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache():
+    """Process-wide CompletionCache at LLM_CACHE_PATH."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache()
+        return _cache
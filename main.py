@@ -1,11 +1,20 @@
-from flask import Flask
+import time
+import threading
+import services
+import metrics
+
+_import_started = time.perf_counter()
+
+from flask import Flask, request, g, redirect, render_template
 from flask_cors import CORS
 import os
 
-from auth import auth
-from candidate_registration import CandidateRegistrationSystem
-from matching_system import MatchingSystem
-from sheets import get_gspread_client  # Ensure you have a get_gspread_client() function in sheets.py
+from auth import auth, login_required, set_session_cookie
+from sessions import get_session_manager, SESSION_COOKIE_NAME
+from sheets import get_client_stats
+from repository import get_candidates_repository, normalize_key, CANDIDATE_COLUMNS
+
+services.record_phase("import", _import_started)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -15,9 +24,218 @@ app.secret_key = os.getenv("APP_SECRET_KEY", "super-secret-key")
 # Register Blueprints and services
 app.register_blueprint(auth, url_prefix="/auth")  # Changed URL prefix to '/auth'
 
-# Instantiate systems (if used later in other routes)
-registration = CandidateRegistrationSystem()
-matcher = MatchingSystem()
+# Systems are built on first use, so importing the app (and gunicorn's preload)
+# opens no databases, threads or network clients
+def _make_registration():
+    from candidate_registration import CandidateRegistrationSystem
+    return CandidateRegistrationSystem()
+
+def _make_matcher():
+    from matching_system import MatchingSystem
+    return MatchingSystem()
+
+def _make_match_refresher():
+    from match_store import get_match_refresher
+    return get_match_refresher()
+
+services.register("registration", _make_registration)
+services.register("matcher", _make_matcher)
+services.register("match_refresher", _make_match_refresher)
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+def start_background_workers():
+    """Starts enrichment workers and the match refresher once per process (gunicorn calls this post-fork)."""
+    global _workers_started
+    if _workers_started:
+        return
+    with _workers_lock:
+        if not _workers_started:
+            started = time.perf_counter()
+            services.get("registration").start_enrichment_workers()
+            services.get("match_refresher").start()
+            services.record_phase("background_workers", started)
+            _workers_started = True
+
+@app.before_request
+def _ensure_background_workers():
+    start_background_workers()
+
+# Per-endpoint latency, plus a sampled trace of the stages each request went through
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_trace(f"{request.method} {request.path}")
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        stage = f"http.{request.endpoint or 'unmatched'}"
+        metrics.observe(stage, (time.perf_counter() - started) * 1000)
+        if response.status_code >= 500:
+            metrics.inc(f"{stage}.errors")
+    metrics.finish_trace(response.status_code)
+    return response
+
+# Candidate registration (enrichment runs in the background queue)
+@app.route("/register", methods=["POST"])
+def register():
+    return services.get("registration").register(request)
+
+# Enrichment progress for one profile: polled with the status token /register returned
+# (?token= or X-Status-Token), or by the signed-in candidate's dashboard for their own profile
+@app.route("/registration_status/<email>", methods=["GET"])
+def registration_status(email):
+    token = request.args.get("token") or request.headers.get("X-Status-Token")
+    if not token:
+        return _own_registration_status(email)
+    if get_session_manager().verify_status_token(token) != normalize_key(email):
+        return {"success": False, "error": "Invalid or expired status token."}, 403
+    return services.get("registration").enrichment_status(email.strip()), 200
+
+@login_required("candidate")
+def _own_registration_status(email):
+    if normalize_key(email) != normalize_key(g.session["uid"]):
+        return {"success": False, "error": "Forbidden."}, 403
+    return services.get("registration").enrichment_status(email.strip()), 200
+
+def _import_authorized():
+    expected = os.getenv("BULK_IMPORT_TOKEN")
+    return bool(expected) and request.headers.get("X-Import-Token") == expected
+
+# Bulk candidate import, for callers whose X-Import-Token matches BULK_IMPORT_TOKEN.
+# The upload (multipart `file` or raw body) is spooled to disk and imported in chunks
+# on a background thread; poll the returned status URL
+@app.route("/admin/import", methods=["POST"])
+def admin_import():
+    import tempfile
+    from bulk_import import start_import, FORMATS, ENRICH_MODES
+    if not _import_authorized():
+        return {"success": False, "error": "Forbidden."}, 403
+
+    upload = request.files.get("file")
+    filename = upload.filename if upload else ""
+    fmt = request.args.get("format") or ("jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    enrich = request.args.get("enrich", "inline")
+    if fmt not in FORMATS or enrich not in ENRICH_MODES:
+        return {"success": False, "error": f"format must be one of {FORMATS}, enrich one of {ENRICH_MODES}."}, 400
+
+    with tempfile.NamedTemporaryFile(prefix="bulk-import-", suffix=f".{fmt}", delete=False) as f:
+        if upload:
+            upload.save(f)
+        else:
+            while True:
+                block = request.stream.read(1 << 20)
+                if not block:
+                    break
+                f.write(block)
+        path = f.name
+    job_id = start_import(path, fmt, remove=True, enrich=enrich,
+                          chunk_size=request.args.get("chunk_size", type=int),
+                          registration=services.get("registration"))
+    return {"success": True, "job_id": job_id, "status_url": f"/admin/import/{job_id}"}, 202
+
+@app.route("/admin/import/<job_id>", methods=["GET"])
+def admin_import_status(job_id):
+    from bulk_import import import_status
+    if not _import_authorized():
+        return {"success": False, "error": "Forbidden."}, 403
+    status = import_status(job_id)
+    if status is None:
+        return {"success": False, "error": "Unknown import job."}, 404
+    return status, 200
+
+# Candidate dashboard, rendered from the session's cached profile (no Sheets calls)
+@app.route("/dashboard", methods=["GET"])
+@login_required("candidate")
+def dashboard():
+    return render_template("candidate_dashboard.html", data=g.profile)
+
+# Profile edits: one sheet write, then the session is re-issued at the new profile version
+@app.route("/update_candidate_profile", methods=["POST"])
+@login_required("candidate")
+def update_candidate_profile():
+    form = request.get_json(silent=True) or request.form
+    fields = {}
+    for column, name in (("Location", "location"), ("Radius", "radius"), ("Summary", "summary")):
+        if name in form:
+            fields[column] = str(form.get(name) or "").strip()
+    if "Radius" in fields and fields["Radius"] and not fields["Radius"].isdigit():
+        return {"success": False, "error": "Radius must be a whole number of km."}, 400
+    email = g.session["uid"]
+    try:
+        get_candidates_repository().update(email, fields)
+    except Exception as e:
+        return {"success": False, "error": str(e)}, 500
+
+    token = get_session_manager().update(g.profile, fields)
+    services.get("match_refresher").mark_dirty(email)
+    if "Summary" in fields or "Location" in fields:
+        profile = dict(g.profile, **fields)
+        services.get("registration").queue.enqueue(email, "embedding", {
+            "skills": profile.get("Skills", ""), "summary": profile.get("Summary", ""),
+            "location": profile.get("Location", ""), "radius_km": profile.get("Radius", ""),
+        })
+    return set_session_cookie(redirect("/dashboard"), token)
+
+# Skills that would unlock the most extra Adzuna results for the signed-in candidate
+@app.route("/suggest_skills", methods=["POST"])
+@login_required("candidate")
+def suggest_skills():
+    from adzuna_helper import suggest_skill_expansion
+    skills = [s.strip() for s in str(g.profile.get("Skills", "")).split(",") if s.strip()]
+    try:
+        suggestions = suggest_skill_expansion(skills, str(g.profile.get("Location", "")))
+    except Exception as e:
+        return {"success": False, "error": str(e)}, 500
+    return {"success": True, "suggestions": suggestions}, 200
+
+@app.route("/logout", methods=["GET"])
+def logout():
+    response = redirect("/auth/login")
+    response.delete_cookie(SESSION_COOKIE_NAME)
+    return response
+
+# Dashboard job matches for the signed-in candidate: one indexed lookup in the materialized match table
+@app.route("/match_jobs", methods=["POST"])
+@login_required("candidate")
+def match_jobs():
+    from match_store import MatchingUnavailable
+    try:
+        result = services.get("match_refresher").get_matches(g.session["uid"])
+    except MatchingUnavailable as e:
+        return {"success": False, "error": str(e)}, 503
+    except Exception as e:
+        return {"success": False, "error": str(e)}, 500
+    if result is None:
+        return {"success": False, "error": "Candidate not found."}, 404
+    return dict(result, success=True), 200
+
+# Employer view: candidates ranked for a job posting, paged
+@app.route("/employer/match_candidates", methods=["POST"])
+def match_candidates():
+    payload = request.get_json(silent=True) or request.form
+    summary = (payload.get("summary") or "").strip()
+    if not summary:
+        return {"success": False, "error": "Job summary is required."}, 400
+    job = {
+        "Job Summary": summary,
+        "Job Location": (payload.get("location") or "").strip(),
+        "skills": payload.get("skills") or "",
+    }
+    try:
+        page = int(payload.get("page") or 1)
+        per_page = int(payload.get("per_page") or 0) or None
+        candidates = get_candidates_repository()
+        result = services.get("matcher").rank_candidates(job, candidates.all(), page=page, per_page=per_page,
+                                                         version=candidates.version)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}, 400
+    except Exception as e:
+        return {"success": False, "error": str(e)}, 500
+    return dict(result, success=True), 200
 
 # Debug route to inspect environment variables (for testing only)
 @app.route("/debug/env", methods=["GET"])
@@ -29,6 +247,16 @@ def debug_env():
         "PORT": os.getenv("PORT"),
     }, 200
 
+# Debug route: startup phase timings and which lazy services have been built
+@app.route("/debug/startup", methods=["GET"])
+def debug_startup():
+    return services.startup_report(), 200
+
+# Debug route to inspect Sheets client/handle cache counters
+@app.route("/debug/sheets-stats", methods=["GET"])
+def sheets_stats():
+    return get_client_stats(), 200
+
 # Test route to check if the credentials file is accessible
 @app.route("/test-credentials")
 def test_credentials():
@@ -38,14 +266,41 @@ def test_credentials():
     except Exception as e:
         return f"Error: {e}", 500
 
+# Columns returned by paginated candidate listings unless ?columns= asks for others
+LISTING_COLUMNS = [c for c in CANDIDATE_COLUMNS if c != "Embedding"]
+MAX_PER_PAGE = 200
+
+def _page_args():
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(max(1, request.args.get("per_page", 50, type=int)), MAX_PER_PAGE)
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()]
+    return page, per_page, columns or LISTING_COLUMNS
+
+def _paged_candidates():
+    page, per_page, columns = _page_args()
+    records, has_more = get_candidates_repository().page(page, per_page, columns)
+    return {
+        "records": [record.to_dict() for record in records],
+        "page": page,
+        "per_page": per_page,
+        "has_more": has_more,
+    }
+
+# Paginated candidate listing (streams ranged blocks; only the requested columns are read)
+@app.route("/candidates", methods=["GET"])
+def list_candidates():
+    try:
+        return _paged_candidates(), 200
+    except KeyError as e:
+        return {"success": False, "error": str(e)}, 400
+    except Exception as e:
+        return {"success": False, "error": str(e)}, 500
+
 # Test route for Google Sheets integration
 @app.route("/test-sheet")
 def test_sheet():
     try:
-        client = get_gspread_client()
-        sheet = client.open_by_key(os.getenv("CANDIDATES_SHEET_ID")).sheet1
-        records = sheet.get_all_records()
-        return {"records": records}, 200
+        return _paged_candidates(), 200
     except Exception as e:
         return f"Error accessing Google Sheets: {e}", 500
 
@@ -64,6 +319,18 @@ def test_server():
 def health():
     return {"status": "ok"}, 200
 
+# Stage latencies, counters and cache hit rates for this worker (?format=prometheus for scraping)
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if request.args.get("format") == "prometheus":
+        return metrics.prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+    return metrics.snapshot(), 200
+
+# Recently sampled request traces (TRACE_SAMPLE_RATE > 0 enables sampling)
+@app.route("/debug/traces", methods=["GET"])
+def debug_traces():
+    return {"traces": metrics.traces(request.args.get("limit", type=int))}, 200
+
 # Print the list of all registered routes (for debugging purposes)
 print("🔍 Registered routes:", app.url_map)
 
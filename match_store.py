@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import smart_matcher
+import metrics
+from embedding_store import text_key
+from repository import get_candidates_repository, get_jobs_repository, jobs_configured, normalize_key
+
+# --- Materialized match settings ---
+MATCH_STORE_PATH = os.getenv("MATCH_STORE_PATH", ".match_store.sqlite3")
+MATCH_TOP_N = int(os.getenv("MATCH_TOP_N", "5"))
+MATCH_REFRESH_INTERVAL = float(os.getenv("MATCH_REFRESH_INTERVAL", "60"))
+# Dirty candidates fully recomputed per refresh pass; the rest wait for the next pass
+MATCH_REFRESH_BATCH = int(os.getenv("MATCH_REFRESH_BATCH", "200"))
+
+
+class MatchingUnavailable(RuntimeError):
+    """Job matching is switched off because no jobs source is configured."""
+
+
+# Bumped when match scores change meaning, so every stored list is recomputed once
+MATCH_SCORE_VERSION = "2"
+
+
+def candidate_fingerprint(record):
+    """Hash of everything match_jobs reads from a candidate (summary, location, skills and radius)."""
+    return text_key("\n".join([MATCH_SCORE_VERSION, smart_matcher.candidate_text(record),
+                               str(record.get("Skills", "")), str(record.get("Radius", ""))]))
+
+
+class MatchStore:
+    """
+    Materialized top-N job matches per candidate in SQLite (WAL), indexed by
+    email, so the dashboard read path is a single indexed lookup.
+
+    A dirty set records candidates whose list must be recomputed in full: new
+    or edited candidates (their fingerprint changed) and candidates whose list
+    contains a job that was removed or edited. Jobs added since the last sync
+    are scored against the clean candidates only and merged into their lists,
+    which gives the same top-N as a full recompute.
+    """
+
+    def __init__(self, path=None, top_n=None):
+        self.path = path or MATCH_STORE_PATH
+        self.top_n = top_n or MATCH_TOP_N
+        self._local = threading.local()
+        self._holder = uuid.uuid4().hex
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                " email TEXT NOT NULL, rank INTEGER NOT NULL, job_id TEXT NOT NULL,"
+                " match TEXT NOT NULL, PRIMARY KEY (email, rank))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS matches_job ON matches (job_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS candidates ("
+                " email TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, computed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, added_at REAL NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirty ("
+                " email TEXT PRIMARY KEY, reason TEXT, marked_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    # --- Read path ---
+
+    def get(self, email):
+        """Stored matches for one candidate with their freshness, or None if never computed."""
+        email = normalize_key(email)
+        conn = self._connect()
+        state = conn.execute(
+            "SELECT computed_at FROM candidates WHERE email = ?", (email,)
+        ).fetchone()
+        if state is None:
+            return None
+        rows = conn.execute(
+            "SELECT match FROM matches WHERE email = ? ORDER BY rank", (email,)
+        ).fetchall()
+        dirty = conn.execute("SELECT 1 FROM dirty WHERE email = ?", (email,)).fetchone()
+        return {
+            "email": email,
+            "matches": [json.loads(match) for match, in rows],
+            "computed_at": state[0],
+            "stale": dirty is not None,
+        }
+
+    # --- Dirty tracking ---
+
+    def mark_dirty(self, emails, reason="edited"):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO dirty (email, reason, marked_at) VALUES (?, ?, ?)",
+                [(normalize_key(e), reason, now) for e in emails],
+            )
+
+    def dirty_emails(self, limit=None):
+        return [email for email, in self._connect().execute(
+            "SELECT email FROM dirty ORDER BY marked_at LIMIT ?", (limit or -1,))]
+
+    def sync_candidates(self, candidates_by_email):
+        """Marks new or edited candidates dirty and drops rows for candidates that are gone."""
+        conn = self._connect()
+        stored = dict(conn.execute("SELECT email, fingerprint FROM candidates"))
+        changed = [email for email, record in candidates_by_email.items()
+                   if stored.get(email) != candidate_fingerprint(record)]
+        removed = [(email,) for email in stored if email not in candidates_by_email]
+        with conn:
+            conn.executemany("DELETE FROM matches WHERE email = ?", removed)
+            conn.executemany("DELETE FROM candidates WHERE email = ?", removed)
+            conn.executemany("DELETE FROM dirty WHERE email = ?", removed)
+        self.mark_dirty(changed, reason="candidate")
+        return changed
+
+    def sync_jobs(self, candidates_by_email, jobs_by_id):
+        """
+        Applies job changes since the last sync: candidates listing a removed
+        job become dirty; added jobs are merged into every clean candidate's list.
+        Returns (added, removed) job counts.
+        """
+        conn = self._connect()
+        known = {job for job, in conn.execute("SELECT job_id FROM jobs")}
+        added = [j for j in jobs_by_id if j not in known]
+        removed = [j for j in known if j not in jobs_by_id]
+
+        if removed:
+            affected = set()
+            for start in range(0, len(removed), 500):
+                chunk = removed[start:start + 500]
+                affected.update(email for email, in conn.execute(
+                    "SELECT DISTINCT email FROM matches WHERE job_id IN (%s)" % ",".join("?" * len(chunk)),
+                    chunk))
+            self.mark_dirty(affected, reason="job removed")
+
+        if added:
+            dirty = set(self.dirty_emails())
+            computed = {email for email, in conn.execute("SELECT email FROM candidates")}
+            for email, record in candidates_by_email.items():
+                if email in computed and email not in dirty:
+                    self._merge(email, smart_matcher.score_job_ids(record, jobs_by_id, added))
+
+        now = time.time()
+        with conn:
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(j,) for j in removed])
+            conn.executemany("INSERT OR IGNORE INTO jobs (job_id, added_at) VALUES (?, ?)",
+                             [(j, now) for j in added])
+        return len(added), len(removed)
+
+    # --- Writes ---
+
+    def _write(self, email, ranked, fingerprint=None):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM matches WHERE email = ?", (email,))
+            conn.executemany(
+                "INSERT INTO matches (email, rank, job_id, match) VALUES (?, ?, ?, ?)",
+                [(email, rank, key, json.dumps(match)) for rank, (key, match) in enumerate(ranked)],
+            )
+            if fingerprint is None:
+                conn.execute("UPDATE candidates SET computed_at = ? WHERE email = ?", (time.time(), email))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO candidates (email, fingerprint, computed_at) VALUES (?, ?, ?)",
+                    (email, fingerprint, time.time()),
+                )
+                conn.execute("DELETE FROM dirty WHERE email = ?", (email,))
+
+    def _merge(self, email, scored):
+        if not scored:
+            return
+        current = [(key, json.loads(match)) for key, match in self._connect().execute(
+            "SELECT job_id, match FROM matches WHERE email = ? ORDER BY rank", (email,))]
+        if len(current) >= self.top_n and scored[0][1]["score"] <= current[-1][1]["score"]:
+            return
+        seen = {key for key, _ in scored}
+        merged = [item for item in current if item[0] not in seen] + scored
+        merged.sort(key=lambda item: item[1]["score"], reverse=True)
+        self._write(email, merged[:self.top_n])
+
+    def recompute(self, record, job_rows):
+        """Full top-N for one candidate; stores it and returns the read-path view."""
+        email = normalize_key(record.get("Email"))
+        with metrics.timer("match_store.recompute"):
+            ranked = smart_matcher.rank_job_ids(record, job_rows, top_n=self.top_n)
+        self._write(email, ranked, fingerprint=candidate_fingerprint(record))
+        return self.get(email)
+
+    def refresh(self, candidates, job_rows, limit=None):
+        """
+        One incremental pass: sync candidates and jobs, then fully recompute up
+        to `limit` dirty candidates. Returns counts for logging.
+        """
+        candidates_by_email = {}
+        for record in candidates:
+            email = normalize_key(record.get("Email"))
+            if email:
+                candidates_by_email.setdefault(email, record)
+        jobs_by_id = smart_matcher.index_jobs(job_rows)
+
+        self.sync_candidates(candidates_by_email)
+        added, removed = self.sync_jobs(candidates_by_email, jobs_by_id)
+
+        recomputed = 0
+        for email in self.dirty_emails(limit or MATCH_REFRESH_BATCH):
+            record = candidates_by_email.get(email)
+            if record is None:
+                self._connect().execute("DELETE FROM dirty WHERE email = ?", (email,))
+                self._connect().commit()
+                continue
+            self.recompute(record, job_rows)
+            recomputed += 1
+        return {"jobs_added": added, "jobs_removed": removed, "recomputed": recomputed,
+                "still_dirty": len(self.dirty_emails())}
+
+    # --- Cross-process refresh lease ---
+
+    def try_lease(self, name, seconds):
+        """True if this process holds (or just took) the named lease."""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at"
+                " WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+                (name, self._holder, now + seconds, now),
+            )
+            row = conn.execute("SELECT holder FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == self._holder
+
+
+class MatchRefresher:
+    """
+    Keeps a MatchStore current from the candidate and job repositories.
+    Only one process refreshes at a time (SQLite lease); every process can read.
+    """
+
+    def __init__(self, store=None, interval=None):
+        self.store = store or MatchStore()
+        self.interval = MATCH_REFRESH_INTERVAL if interval is None else interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._warned_unconfigured = False
+
+    def get_matches(self, email):
+        """Read path: the stored row, computed on first view if the candidate has none yet."""
+        if not jobs_configured():
+            raise MatchingUnavailable("Job matching is not configured (JOBS_SHEET_ID is not set).")
+        result = self.store.get(email)
+        if result is not None:
+            return result
+        record = get_candidates_repository().get(email)
+        if record is None:
+            return None
+        return self.store.recompute(record, get_jobs_repository().all())
+
+    def mark_dirty(self, email, reason="edited"):
+        self.store.mark_dirty([email], reason=reason)
+
+    def refresh_once(self):
+        if not jobs_configured():
+            # Idle without a jobs sheet; say so once rather than failing every cycle
+            if not self._warned_unconfigured:
+                print("⚠️ JOBS_SHEET_ID is not set; match refresh is disabled.")
+                self._warned_unconfigured = True
+            return None
+        if not self.store.try_lease("refresh", self.interval * 2):
+            return None
+        with metrics.timer("match_store.refresh"):
+            stats = self.store.refresh(get_candidates_repository().all(), get_jobs_repository().all())
+        if stats["jobs_added"] or stats["jobs_removed"] or stats["recomputed"]:
+            print(f"🔁 Match refresh: {stats}")
+        return stats
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="match-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"🔥 Match refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_match_refresher():
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = MatchRefresher()
+        return _refresher
@@ -1,38 +1,56 @@
+from skill_index import SkillIndex
+from reverse_matching import ReverseMatcher
+
+
+def _candidate_keys(candidates):
+    """
+    Index key per candidate: (email, n) for the n-th row with that email, so
+    duplicate rows stay separate entries; rows without an email use their position.
+    """
+    keys, counts = [], {}
+    for position, candidate in enumerate(candidates):
+        email = candidate.get("Email")
+        if not email:
+            keys.append(("", position))
+            continue
+        counts[email] = n = counts.get(email, 0) + 1
+        keys.append((email, n))
+    return keys
+
+
 class MatchingSystem:
     def __init__(self):
-        pass
-
-    def find_matches(self, job, candidates):
-        # Normalize job skills
-        job_skills = job.get("skills", "")
-        if isinstance(job_skills, str):
-            job_skills = set(s.strip().lower() for s in job_skills.split(",") if s.strip())
-        elif isinstance(job_skills, list):
-            job_skills = set(s.strip().lower() for s in job_skills if isinstance(s, str))
-        else:
-            job_skills = set()
-
-        matches = []
-
-        for candidate in candidates:
-            # Normalize candidate skills
-            candidate_skills_raw = candidate.get("Skills", "")
-            if isinstance(candidate_skills_raw, str):
-                candidate_skills = set(s.strip().lower() for s in candidate_skills_raw.split(",") if s.strip())
-            elif isinstance(candidate_skills_raw, list):
-                candidate_skills = set(s.strip().lower() for s in candidate_skills_raw if isinstance(s, str))
-            else:
-                candidate_skills = set()
-
-            # Compute intersection (match score)
-            score = len(job_skills & candidate_skills)
-
-            if score > 0:
-                matches.append({
-                    "name": candidate.get("Name", "Unknown"),
-                    "email": candidate.get("Email", "Unknown"),
-                    "match_score": score
-                })
+        # Inverted skill index, kept in sync with the candidates passed to find_matches
+        self.index = SkillIndex()
+        # Stored candidate embeddings as one float32 matrix, for semantic ranking
+        self.reverse = ReverseMatcher()
+
+    def _sync(self, candidates):
+        keys = _candidate_keys(candidates)
+        self.index.sync(candidates, lambda c, position: keys[position], lambda c: c.get("Skills", ""))
+
+    @staticmethod
+    def _format(candidate, score):
+        return {
+            "name": candidate.get("Name", "Unknown"),
+            "email": candidate.get("Email", "Unknown"),
+            "match_score": score
+        }
+
+    def find_matches(self, job, candidates, top_k=None):
+        # Only candidates sharing at least one skill with the job are touched
+        self._sync(candidates)
+        matches = self.index.match(job.get("skills", ""), k=top_k)
 
         # Return sorted list of matches
-        return sorted(matches, key=lambda x: x["match_score"], reverse=True)
+        return [self._format(candidate, score) for candidate, score in matches]
+
+    def find_matches_batch(self, jobs, candidates, top_k=10):
+        """Scores many jobs against the candidates with one sparse matrix multiply."""
+        self._sync(candidates)
+        results = self.index.score_jobs([job.get("skills", "") for job in jobs], k=top_k)
+        return [[self._format(candidate, score) for candidate, score in matches] for matches in results]
+
+    def rank_candidates(self, job, candidates, page=1, per_page=None, version=None):
+        """Ranks candidates for a job by stored-embedding similarity within each candidate's radius."""
+        return self.reverse.rank(job, candidates, page=page, per_page=per_page, version=version)
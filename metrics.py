@@ -0,0 +1,200 @@
+import os
+import time
+import random
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# --- Instrumentation settings ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Fraction of requests whose stage timings are kept as a trace (0 disables tracing)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; `quantile` interpolates within a bucket."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BUCKETS_MS[i - 1] if i else 0.0
+                high = min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+                return round(min(low + (high - low) * (rank - seen) / n, self.max), 3)
+            seen += n
+        return round(self.max, 3)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": {str(b): n for b, n in zip(BUCKETS_MS + ("+Inf",), self.counts)},
+        }
+
+
+class Registry:
+    """
+    Process-wide counters and stage histograms. Every update is one dict
+    lookup under a lock, so instrumenting hot paths costs microseconds.
+    Each gunicorn worker keeps its own registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._traces = deque(maxlen=TRACE_BUFFER_SIZE)
+        self._local = threading.local()
+
+    # --- Recording ---
+
+    def inc(self, name, n=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, stage, ms):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(ms)
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace["spans"].append((stage, round(ms, 3)))
+
+    def cache(self, name, hits=0, misses=0):
+        """Counts lookups against a named cache (booleans count as 0/1)."""
+        if hits:
+            self.inc(f"cache.{name}.hits", int(hits))
+        if misses:
+            self.inc(f"cache.{name}.misses", int(misses))
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the block into the `stage` histogram; exceptions also count `<stage>.errors`."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{stage}.errors")
+            raise
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    # --- Request traces ---
+
+    def start_trace(self, name):
+        """Begins a trace for this thread's request if it is sampled; returns whether it was."""
+        if not METRICS_ENABLED or TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+            self._local.trace = None
+            return False
+        self._local.trace = {"name": name, "started_at": time.time(), "spans": []}
+        return True
+
+    def finish_trace(self, status=None):
+        trace = getattr(self._local, "trace", None)
+        self._local.trace = None
+        if trace is None:
+            return None
+        trace["duration_ms"] = round((time.time() - trace["started_at"]) * 1000, 3)
+        trace["status"] = status
+        with self._lock:
+            self._traces.append(trace)
+        return trace
+
+    # --- Export ---
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            stages = {name: h.to_dict() for name, h in sorted(self._histograms.items())}
+            traces = list(self._traces)
+        caches = {}
+        for name, value in counters.items():
+            if name.startswith("cache."):
+                cache, kind = name[len("cache."):].rsplit(".", 1)
+                caches.setdefault(cache, {"hits": 0, "misses": 0})[kind] = value
+        for stats in caches.values():
+            total = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else None
+        return {
+            "pid": os.getpid(),
+            "stages": stages,
+            "counters": {k: v for k, v in sorted(counters.items()) if not k.startswith("cache.")},
+            "caches": dict(sorted(caches.items())),
+            "traces_kept": len(traces),
+        }
+
+    def traces(self, limit=None):
+        with self._lock:
+            traces = list(self._traces)
+        return traces[-limit:] if limit else traces
+
+    def prometheus(self):
+        """The registry in Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: (list(h.counts), h.count, h.sum) for name, h in self._histograms.items()}
+        lines = ["# TYPE app_events_total counter"]
+        for name, value in sorted(counters.items()):
+            lines.append(f'app_events_total{{name="{name}"}} {value}')
+        lines.append("# TYPE app_stage_duration_ms histogram")
+        for name, (counts, count, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f'app_stage_duration_ms_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'app_stage_duration_ms_sum{{stage="{name}"}} {round(total, 3)}')
+            lines.append(f'app_stage_duration_ms_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._traces.clear()
+
+
+_registry = Registry()
+
+# Module-level shortcuts so call sites read `metrics.timer("sheets.batch_get")`
+inc = _registry.inc
+observe = _registry.observe
+cache = _registry.cache
+timer = _registry.timer
+start_trace = _registry.start_trace
+finish_trace = _registry.finish_trace
+snapshot = _registry.snapshot
+traces = _registry.traces
+prometheus = _registry.prometheus
+reset = _registry.reset
@@ -1,41 +1,127 @@
 import os
 import json
-import base64
 import time
+import argparse
 from dotenv import load_dotenv
-import openai
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import rowcol_to_a1
+import services
+import metrics
+from smart_matcher import (get_embedding as get_cached_embedding, get_embeddings, candidate_text,
+                           embedding_store, model_spec, EMBEDDING_MODEL)
+from embedding_store import (serialize_embedding, deserialize_embedding, cell_format, cell_info,
+                             is_current_cell, EMBEDDING_CELL_FORMAT)
+from rate_limit import TokenBucket
 
 # Load environment variables
 load_dotenv()
 
-# OpenAI settings
-openai.api_key = os.getenv("OPENAI_API_KEY")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+# Backfill settings
+BACKFILL_CHUNK_ROWS = int(os.getenv("BACKFILL_CHUNK_ROWS", "500"))
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "100"))
+BACKFILL_MAX_WORKERS = int(os.getenv("BACKFILL_MAX_WORKERS", "4"))
+BACKFILL_REQUESTS_PER_MINUTE = int(os.getenv("BACKFILL_REQUESTS_PER_MINUTE", "500"))
+BACKFILL_TOKENS_PER_MINUTE = int(os.getenv("BACKFILL_TOKENS_PER_MINUTE", "1000000"))
+# Keep each batch_update request body comfortably under the Sheets API payload limit
+BACKFILL_WRITE_BYTES = int(os.getenv("BACKFILL_WRITE_BYTES", "2000000"))
+CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", ".precompute_checkpoint.json")
 
 # Google Sheets settings
 scope = [
     "https://spreadsheets.google.com/feeds",
     "https://www.googleapis.com/auth/drive"
 ]
-creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
-if not creds_path:
-    raise EnvironmentError("Missing GOOGLE_CREDENTIALS_PATH environment variable.")
 
-creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-client = gspread.authorize(creds)
-sheet = client.open_by_key(os.getenv("CANDIDATES_SHEET_ID")).sheet1
+def _open_candidates_sheet():
+    """Authorizes and opens the Candidates sheet; runs on first use, not at import."""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
+    if not creds_path:
+        raise EnvironmentError("Missing GOOGLE_CREDENTIALS_PATH environment variable.")
+
+    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
+    client = gspread.authorize(creds)
+    return client.open_by_key(os.getenv("CANDIDATES_SHEET_ID")).sheet1
+
+services.register("precompute_sheet", _open_candidates_sheet)
 
 def get_embedding(text, model=EMBEDDING_MODEL):
-    response = openai.Embedding.create(model=model, input=text)
-    return response.data[0]["embedding"]
+    # Goes through the shared embedding store, so texts match_jobs already paid for are reused
+    embedding = get_cached_embedding(text, model=model)
+    if embedding is None:
+        raise ValueError("Embedding request failed")
+    return embedding
+
+# --- Checkpointing ---
+
+def load_checkpoint(sheet_id, model):
+    """Last sheet row fully written by a previous run of the same sheet/model, else 1 (header)."""
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return 1
+    if checkpoint.get("sheet_id") != sheet_id or checkpoint.get("model") != model:
+        return 1
+    return checkpoint.get("last_row", 1)
+
+def save_checkpoint(sheet_id, model, last_row):
+    tmp_path = f"{CHECKPOINT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"sheet_id": sheet_id, "model": model, "last_row": last_row,
+                   "updated_at": time.time()}, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+# --- Backfill ---
+
+def _write_cells(col_index, updates):
+    """Writes {row: value} into one column with as few ranged batch_update calls as the payload limit allows."""
+    sheet = services.get("precompute_sheet")
+    batch, size = [], 0
+    for row, value in sorted(updates.items()):
+        if batch and size + len(value) > BACKFILL_WRITE_BYTES:
+            with metrics.timer("sheets.batch_update"):
+                sheet.batch_update(batch)
+            batch, size = [], 0
+        batch.append({"range": rowcol_to_a1(row, col_index), "values": [[value]]})
+        size += len(value)
+    if batch:
+        with metrics.timer("sheets.batch_update"):
+            sheet.batch_update(batch)
+
+def precompute_embeddings(chunk_rows=None, batch_size=None, max_workers=None,
+                          convert_legacy=False, reset=False):
+    """
+    Backfills the Embedding column in chunks of `chunk_rows` rows.
 
-def serialize_embedding(embedding):
-    return base64.b64encode(json.dumps(embedding).encode()).decode()
+    Each chunk embeds its missing summaries in batched, rate-limited API calls,
+    writes results with a few ranged batch_update calls, then records a checkpoint so an
+    interrupted run resumes after the last completed chunk (or before the first
+    row whose embedding failed).
 
-def precompute_embeddings():
-    records = sheet.get_all_records()
+    Only cells tagged as this model's embedding of the row's current text seed
+    the shared embedding store. Tagged cells for another model or older text
+    are re-embedded; untagged (legacy) cells are left alone unless
+    `convert_legacy`, which re-embeds them since what they embed is unknown.
+    Current cells in another format are rewritten in EMBEDDING_CELL_FORMAT.
+    """
+    chunk_rows = chunk_rows or BACKFILL_CHUNK_ROWS
+    sheet_id = os.getenv("CANDIDATES_SHEET_ID")
+    spec = model_spec(EMBEDDING_MODEL)
+    store = embedding_store(EMBEDDING_MODEL)
+    rate_limiter = TokenBucket.per_minute(BACKFILL_REQUESTS_PER_MINUTE)
+    token_limiter = TokenBucket.per_minute(BACKFILL_TOKENS_PER_MINUTE)
+
+    if reset and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    resume_after = load_checkpoint(sheet_id, EMBEDDING_MODEL)
+    if resume_after > 1:
+        print(f"↩️ Resuming after row {resume_after}")
+
+    sheet = services.get("precompute_sheet")
+    with metrics.timer("sheets.get_all_records"):
+        records = sheet.get_all_records()
     header = sheet.row_values(1)
 
     # Ensure 'Embedding' column exists
@@ -44,28 +130,83 @@ def precompute_embeddings():
         header.append("Embedding")
 
     embedding_col_index = header.index("Embedding") + 1
+    rows = [(i, row) for i, row in enumerate(records, start=2) if i > resume_after]
+
+    started = time.time()
+    embedded = 0
+    first_failed = None
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        to_embed, updates = [], {}
+        seed_texts, seed_vectors = [], []
+
+        for i, row in chunk:
+            summary = str(row.get("Summary", "")).strip()
+            already_embedded = str(row.get("Embedding", "")).strip()
+
+            if not summary:
+                continue
+            text = candidate_text(row)
+            if already_embedded and is_current_cell(already_embedded, spec, text):
+                # Seed the shared store so the matcher can reuse sheet-held vectors
+                try:
+                    vector = deserialize_embedding(already_embedded)
+                except Exception as e:
+                    print(f"⚠️ Row {i}: Could not decode stored embedding: {e}")
+                    to_embed.append((i, text))
+                    continue
+                seed_texts.append(text)
+                seed_vectors.append(vector)
+                if cell_format(already_embedded) != EMBEDDING_CELL_FORMAT:
+                    updates[i] = serialize_embedding(vector, model=spec, text=text)
+                continue
+            if already_embedded and cell_info(already_embedded)["model"] is None and not convert_legacy:
+                # Untagged cell: keep it, but never let it stand in for this text's vector
+                continue
+            to_embed.append((i, text))
+
+        store.put_many(seed_texts, seed_vectors)
+
+        vectors = get_embeddings(
+            [text for _, text in to_embed], model=EMBEDDING_MODEL,
+            batch_size=batch_size or BACKFILL_BATCH_SIZE,
+            max_workers=max_workers or BACKFILL_MAX_WORKERS,
+            rate_limiter=rate_limiter, token_limiter=token_limiter,
+        )
+        failed_rows = []
+        for (i, text), vector in zip(to_embed, vectors):
+            if vector is None:
+                failed_rows.append(i)
+                continue
+            updates[i] = serialize_embedding(vector, model=spec, text=text)
+        failed = len(failed_rows)
+        embedded += len(to_embed) - failed
+
+        _write_cells(embedding_col_index, updates)
+        last_row = chunk[-1][0]
+        # The checkpoint never moves past a failed row, so a resumed run retries it;
+        # rows written after it are then only re-read, since their cells are current
+        if first_failed is None and failed_rows:
+            first_failed = min(failed_rows)
+        save_checkpoint(sheet_id, EMBEDDING_MODEL, last_row if first_failed is None else first_failed - 1)
+
+        elapsed = max(time.time() - started, 1e-6)
+        print(f"✅ Rows {chunk[0][0]}–{last_row}: {len(to_embed) - failed} embedded, "
+              f"{failed} failed, {len(updates)} cells written ({embedded / elapsed:.1f} rows/s)")
 
-    for i, row in enumerate(records, start=2):
-        summary = row.get("Summary", "").strip()
-        already_embedded = row.get("Embedding", "").strip()
-
-        if not summary:
-            print(f"⏭️ Row {i}: No summary found. Skipping.")
-            continue
-        if already_embedded:
-            print(f"✅ Row {i}: Embedding already exists. Skipping.")
-            continue
-
-        try:
-            print(f"🔄 Row {i}: Computing embedding...")
-            embedding = get_embedding(summary)
-            encoded = serialize_embedding(embedding)
-            sheet.update_cell(i, embedding_col_index, encoded)
-            print(f"✅ Row {i}: Embedding stored.")
-            time.sleep(1)  # Rate limiting
-        except Exception as e:
-            print(f"❌ Row {i}: Error occurred: {e}")
-            time.sleep(3)  # Backoff for errors
+    print(f"🏁 Backfill complete: {embedded} embeddings in {time.time() - started:.1f}s")
+    return embedded
 
 if __name__ == "__main__":
-    precompute_embeddings()
+    parser = argparse.ArgumentParser(description="Backfill candidate embeddings into the Candidates sheet.")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Rows per checkpointed chunk")
+    parser.add_argument("--batch-size", type=int, default=None, help="Texts per embeddings API call")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent embeddings API calls")
+    parser.add_argument("--convert-legacy", action="store_true",
+                        help="Re-embed untagged cells (e.g. legacy base64-JSON of the summary alone) "
+                             "so every cell records its model and text")
+    parser.add_argument("--reset", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+    precompute_embeddings(chunk_rows=args.chunk_rows, batch_size=args.batch_size,
+                          max_workers=args.workers, convert_legacy=args.convert_legacy,
+                          reset=args.reset)
@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+import numpy as np
+import smart_matcher
+from geo import bounding_box_mask, distances_from, geo_penalties
+from skill_index import SkillIndex, parse_skills
+from text_tokens import token_set
+
+# --- Default blend weights (normalized at runtime) ---
+RANK_WEIGHT_SKILL = float(os.getenv("RANK_WEIGHT_SKILL", "0.3"))
+RANK_WEIGHT_EMBEDDING = float(os.getenv("RANK_WEIGHT_EMBEDDING", "0.5"))
+RANK_WEIGHT_GEO = float(os.getenv("RANK_WEIGHT_GEO", "0.2"))
+DEFAULT_RADIUS_KM = float(os.getenv("DEFAULT_RADIUS_KM", "50"))
+
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+def parse_radius(value, default=DEFAULT_RADIUS_KM):
+    """Candidate radius (sheet column K) in km; blank or invalid values fall back to the default."""
+    try:
+        radius = float(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+    return radius if radius > 0 else default
+
+
+def job_skill_terms(job):
+    """
+    Terms a job can match candidate skills on: its explicit skills column if
+    present, plus the words and two-word phrases of its summary.
+    """
+    terms = parse_skills(job.get("Job Skills") or job.get("Skills") or "")
+    words = _WORD_RE.findall(job.get("Job Summary", "").lower())
+    terms.update(w.strip(".") for w in words)
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return sorted(t for t in terms if t)
+
+
+class HybridRanker:
+    """
+    One-pass job ranking for a candidate that blends skill overlap, embedding
+    similarity and the geo penalty (geo.geo_penalties) within the candidate's
+    own radius.
+
+    Work is pruned cheapest-first: a lat/lon bounding box and exact distance
+    drop jobs outside the radius, the inverted skill index drops jobs with no
+    skill overlap, and only the survivors are embedded. Top-N ranking reads
+    the job index's top-k search, widening k until no unseen job could still
+    make the list. Jobs whose location does not geocode ("Remote", blank) are
+    kept with no geo penalty unless `keep_unknown_locations` is False.
+    """
+
+    def __init__(self, weights=None, require_skill_overlap=True, keep_unknown_locations=True):
+        weights = weights or {}
+        self.weights = {
+            "skill": weights.get("skill", RANK_WEIGHT_SKILL),
+            "embedding": weights.get("embedding", RANK_WEIGHT_EMBEDDING),
+            "geo": weights.get("geo", RANK_WEIGHT_GEO),
+        }
+        self.require_skill_overlap = require_skill_overlap
+        self.keep_unknown_locations = keep_unknown_locations
+        self.job_skills = SkillIndex()
+        self._terms = {}
+        self._lock = threading.RLock()
+        self.last_stats = {}
+
+    def _sync_jobs(self, jobs_by_id):
+        # Job ids carry a hash of the job text, so a known id never needs re-tokenizing
+        for key, job in jobs_by_id.items():
+            if key not in self._terms:
+                self._terms[key] = job_skill_terms(job)
+                self.job_skills.add(key, key, self._terms[key])
+        for key in [k for k in self._terms if k not in jobs_by_id]:
+            self.job_skills.remove(key)
+            del self._terms[key]
+
+    def _skill_overlap(self, jobs_by_id, cand_skills):
+        # One lock over sync and lookup, so a concurrent catalogue can't change the index mid-query
+        with self._lock:
+            self._sync_jobs(jobs_by_id)
+            return {key: n for key, n in self.job_skills.match(sorted(cand_skills))}
+
+    def _search(self, index, query, survivors, top_n, blend):
+        """
+        (ids, similarities) of the best surviving jobs from the index's top-k
+        search; k doubles until the index is exhausted or no unseen job (whose
+        similarity is at most the last hit's, with full skill and geo terms)
+        could beat the current top_n.
+        """
+        total = sum(self.weights.values()) or 1.0
+        k = max(top_n * 4, 1)
+        while True:
+            hits = index.search(query, k)
+            kept = [(j, sim) for j, sim in hits if j in survivors]
+            found = [j for j, _ in kept]
+            sims = np.array([sim for _, sim in kept], dtype=np.float32)
+            if len(hits) < k or len(hits) >= len(index):
+                return found, sims
+            if len(found) >= top_n:
+                scores = np.sort(blend(found, sims))[::-1]
+                best_unseen = (self.weights["skill"] + self.weights["embedding"] * hits[-1][1]
+                               + self.weights["geo"]) / total
+                if best_unseen <= scores[top_n - 1]:
+                    return found, sims
+            k *= 2
+
+    def _score(self, candidate_record, jobs_by_id, job_ids, top_n=None):
+        """
+        (found ids, blended scores, match entries builder) for the `job_ids` that
+        survive pruning; with `top_n`, only the index search's shortlist is scored.
+        """
+        stats = {"catalogue": len(job_ids)}
+
+        # 1. Geo: bounding box, then exact distance, against the candidate's radius
+        radius_km = parse_radius(candidate_record.get("Radius"))
+        origin = smart_matcher.get_coordinates(candidate_record.get("Location", "").strip())
+        coords = smart_matcher.resolve_locations(
+            [jobs_by_id[j].get("Job Location", "").strip() for j in job_ids])
+        distances = np.full(len(job_ids), np.nan)
+
+        if origin is not None:
+            known = ~np.isnan(coords).any(axis=1)
+            in_box = np.zeros(len(job_ids), dtype=bool)
+            in_box[known] = bounding_box_mask(origin, coords[known], radius_km)
+            distances[in_box] = distances_from(origin, coords[in_box])
+            keep = in_box & (distances <= radius_km)
+            if self.keep_unknown_locations:
+                keep |= ~known
+        else:
+            keep = np.ones(len(job_ids), dtype=bool)
+        geo_ok = {job_ids[i] for i in np.flatnonzero(keep)}
+        stats["after_geo"] = len(geo_ok)
+
+        # 2. Skills: only jobs sharing a term with the candidate's skills
+        cand_skills = parse_skills(candidate_record.get("Skills", ""))
+        overlap = self._skill_overlap(jobs_by_id, cand_skills)
+        if self.require_skill_overlap and cand_skills:
+            survivors = [j for j in job_ids if j in geo_ok and j in overlap]
+        else:
+            survivors = [j for j in job_ids if j in geo_ok]
+        stats["after_skills"] = len(survivors)
+        self.last_stats = stats
+        if not survivors:
+            return [], np.empty(0), None
+
+        # 3. Embeddings only for the plausible set
+        cand_emb = smart_matcher.get_embedding(smart_matcher.candidate_text(candidate_record))
+        if cand_emb is None:
+            return [], np.empty(0), None
+        q = np.asarray(cand_emb, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+
+        index_of = {key: i for i, key in enumerate(job_ids)}
+        total = sum(self.weights.values()) or 1.0
+
+        def blend(found, sims):
+            rows = np.array([index_of[j] for j in found], dtype=np.int64)
+            skill_score = np.array([overlap.get(j, 0) for j in found], dtype=np.float64)
+            skill_score /= max(len(cand_skills), 1)
+            return (self.weights["skill"] * skill_score
+                    + self.weights["embedding"] * sims
+                    + self.weights["geo"] * geo_penalties(distances[rows])) / total
+
+        if top_n is None:
+            found, vectors = smart_matcher.get_job_vectors(jobs_by_id, survivors)
+            sims = vectors @ q
+        else:
+            wanted = set(survivors)
+            found, sims = smart_matcher.with_indexed_jobs(
+                jobs_by_id, survivors, lambda index: self._search(index, q, wanted, top_n, blend))
+        if not found:
+            return [], np.empty(0), None
+        scores = blend(found, sims)
+        dist = distances[np.array([index_of[j] for j in found], dtype=np.int64)]
+        penalties = geo_penalties(dist)
+
+        summary_words = token_set(candidate_record.get("Summary", "").strip())
+
+        def entry(i):
+            job = jobs_by_id[found[i]]
+            shared = summary_words & token_set(job.get("Job Summary", ""))
+            return {
+                "summary": job.get("Job Summary", ""),
+                "location": job.get("Job Location", ""),
+                "score": round(float(scores[i]), 4),
+                "skill_overlap": int(overlap.get(found[i], 0)),
+                "similarity": round(float(sims[i]), 4),
+                "geo_penalty": round(float(penalties[i]), 4),
+                "geo_distance_km": None if np.isnan(dist[i]) else round(float(dist[i]), 2),
+                "reason": ", ".join(shared) or "Semantic and location match",
+            }
+        return found, scores, entry
+
+    def rank_ids(self, candidate_record, job_rows, top_n=5):
+        """[(job id, match)] for the top_n jobs, best first."""
+        jobs_by_id = smart_matcher.index_jobs(job_rows)
+        found, scores, entry = self._score(candidate_record, jobs_by_id, list(jobs_by_id), top_n=top_n)
+        if not found:
+            return []
+        k = min(top_n, len(found))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(found[i], entry(i)) for i in best]
+
+    def score_ids(self, candidate_record, jobs_by_id, job_ids):
+        """
+        [(job id, match)] for just `job_ids` of the catalogue `jobs_by_id`, best
+        first, scored exactly as rank_ids would; pruned jobs are left out.
+        """
+        found, scores, entry = self._score(candidate_record, jobs_by_id, list(job_ids))
+        order = np.argsort(-scores, kind="stable")
+        return [(found[i], entry(i)) for i in order]
+
+    def rank(self, candidate_record, job_rows, top_n=5):
+        return [match for _, match in self.rank_ids(candidate_record, job_rows, top_n=top_n)]
+
+
+_default_ranker = None
+_default_ranker_lock = threading.Lock()
+
+
+def default_ranker():
+    """The shared HybridRanker behind smart_matcher.match_jobs and the match store."""
+    global _default_ranker
+    with _default_ranker_lock:
+        if _default_ranker is None:
+            _default_ranker = HybridRanker()
+        return _default_ranker
+
+
+def rank_jobs(candidate_record, job_rows, top_n=5):
+    """Ranks jobs for a candidate with the shared default HybridRanker."""
+    return default_ranker().rank(candidate_record, job_rows, top_n=top_n)
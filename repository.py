@@ -0,0 +1,374 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from gspread.utils import rowcol_to_a1
+from sheets import get_worksheet
+from sheet_reader import Record, RecordReader
+import metrics
+
+# --- Repository settings ---
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "sheets")  # "sheets" or "sqlite"
+REPOSITORY_SQLITE_PATH = os.getenv("REPOSITORY_SQLITE_PATH", ":memory:")
+REPOSITORY_TTL = float(os.getenv("REPOSITORY_TTL", "300"))
+# A miss refetches at most this often, so rows added by other workers still show up
+REPOSITORY_MISS_REFRESH = float(os.getenv("REPOSITORY_MISS_REFRESH", "2"))
+
+USERS_SHEET_NAME = "AI Talent Users"
+
+USER_COLUMNS = ["Name", "Email", "Password_Hash", "Type"]
+CANDIDATE_COLUMNS = [
+    "Email", "Name", "Skills", "Location", "Summary", "Job Title", "Job Count",
+    "Interview Questions", "Embedding", "Timestamp", "Radius",
+]
+JOB_COLUMNS = ["Job Title", "Job Summary", "Job Location", "Job Skills"]
+
+
+def normalize_key(value):
+    return str(value or "").strip().lower()
+
+
+class SheetsBackend:
+    """
+    Reads and appends rows of one Google Sheets worksheet. With `columns`,
+    full loads read only those columns, block by block.
+    """
+
+    def __init__(self, open_worksheet, columns=None):
+        self._open_worksheet = open_worksheet
+        self._columns = columns
+        self._header = None
+
+    def fetch_all(self):
+        if self._columns is None:
+            with metrics.timer("sheets.get_all_records"):
+                return self._open_worksheet().get_all_records()
+        columns = [c for c in self._columns if c in self.header()]
+        return [record.to_dict() for record in RecordReader(self._open_worksheet(), columns).all_records()]
+
+    def stream(self, columns=None, offset=0, limit=None):
+        """Lazily yields Records of the projected columns, fetched in ranged blocks."""
+        return RecordReader(self._open_worksheet(), columns).iter_records(offset, limit)
+
+    def page(self, page=1, per_page=50, columns=None):
+        return RecordReader(self._open_worksheet(), columns).page(page, per_page)
+
+    def header(self):
+        if self._header is None:
+            with metrics.timer("sheets.row_values"):
+                self._header = self._open_worksheet().row_values(1)
+        return self._header
+
+    def append_row(self, row):
+        with metrics.timer("sheets.append_row"):
+            self._open_worksheet().append_row(row)
+
+    def append_rows(self, rows):
+        with metrics.timer("sheets.append_rows"):
+            self._open_worksheet().append_rows(rows)
+
+    def read_cell(self, row_number, col):
+        with metrics.timer("sheets.cell"):
+            return self._open_worksheet().cell(row_number, col).value
+
+    def update_cells(self, row_number, values):
+        """Writes {1-based column: value} into one row with a single batch_update."""
+        with metrics.timer("sheets.batch_update"):
+            self._open_worksheet().batch_update([
+                {"range": rowcol_to_a1(row_number, col), "values": [[value]]}
+                for col, value in values.items()
+            ])
+
+
+class SQLiteBackend:
+    """Local stand-in for a worksheet, used for tests and offline development."""
+
+    def __init__(self, name, columns, path=None):
+        self.name = name
+        self.columns = list(columns)
+        self._conn = sqlite3.connect(path or REPOSITORY_SQLITE_PATH, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " sheet TEXT NOT NULL, row_id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)"
+            )
+
+    def fetch_all(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM records WHERE sheet = ? ORDER BY row_id", (self.name,)
+            ).fetchall()
+        return [dict(zip(self.columns, json.loads(data))) for (data,) in rows]
+
+    def header(self):
+        return self.columns
+
+    def stream(self, columns=None, offset=0, limit=None):
+        fields = tuple(columns or self.columns)
+        positions = [self.columns.index(c) for c in fields]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM records WHERE sheet = ? ORDER BY row_id LIMIT ? OFFSET ?",
+                (self.name, -1 if limit is None else limit, offset),
+            ).fetchall()
+        for (data,) in rows:
+            values = json.loads(data)
+            yield Record(fields, [values[i] if i < len(values) else "" for i in positions])
+
+    def page(self, page=1, per_page=50, columns=None):
+        records = list(self.stream(columns, offset=(page - 1) * per_page, limit=per_page + 1))
+        return records[:per_page], len(records) > per_page
+
+    def append_row(self, row):
+        row = list(row) + [""] * (len(self.columns) - len(row))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO records (sheet, data) VALUES (?, ?)", (self.name, json.dumps(row))
+            )
+
+    def append_rows(self, rows):
+        padded = [list(row) + [""] * (len(self.columns) - len(row)) for row in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO records (sheet, data) VALUES (?, ?)",
+                [(self.name, json.dumps(row)) for row in padded],
+            )
+
+    def read_cell(self, row_number, col):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM records WHERE sheet = ? ORDER BY row_id LIMIT 1 OFFSET ?",
+                (self.name, row_number - 2),
+            ).fetchone()
+        values = json.loads(row[0]) if row else []
+        return values[col - 1] if col - 1 < len(values) else ""
+
+    def update_cells(self, row_number, values):
+        with self._lock, self._conn:
+            row_id, data = self._conn.execute(
+                "SELECT row_id, data FROM records WHERE sheet = ? ORDER BY row_id LIMIT 1 OFFSET ?",
+                (self.name, row_number - 2),
+            ).fetchone()
+            row = json.loads(data)
+            for col, value in values.items():
+                row[col - 1] = value
+            self._conn.execute("UPDATE records SET data = ? WHERE row_id = ?", (json.dumps(row), row_id))
+
+
+class Repository:
+    """
+    Read-through cache over a backend with a hash index on one key column.
+
+    Records are fetched in one call and kept for `ttl` seconds; lookups are
+    dict hits. Appends are written through to the backend and to the cache.
+    A lookup that misses triggers a refetch (rate-limited by `miss_refresh`)
+    so records written by other workers are not reported as missing.
+    """
+
+    def __init__(self, backend, key="Email", ttl=None, miss_refresh=None):
+        self.backend = backend
+        self.key = key
+        self.ttl = REPOSITORY_TTL if ttl is None else ttl
+        self.miss_refresh = REPOSITORY_MISS_REFRESH if miss_refresh is None else miss_refresh
+        self._records = None
+        self._index = {}
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        # Bumped on every load or write, so derived indexes know when to resync
+        self.version = 0
+
+    def _load(self):
+        records = self.backend.fetch_all()
+        index = {}
+        for i, record in enumerate(records):
+            index.setdefault(normalize_key(record.get(self.key)), i)
+        self._records, self._index = records, index
+        self._loaded_at = time.time()
+        self.fetches += 1
+        self.version += 1
+
+    def _ensure_fresh(self):
+        if self._records is None or time.time() - self._loaded_at > self.ttl:
+            self._load()
+
+    def invalidate(self):
+        with self._lock:
+            self._records = None
+            self._index = {}
+
+    def get(self, key_value):
+        """Returns the record whose key column matches `key_value` (case-insensitive), or None."""
+        key_value = normalize_key(key_value)
+        with self._lock:
+            self._ensure_fresh()
+            i = self._index.get(key_value)
+            if i is None and time.time() - self._loaded_at > self.miss_refresh:
+                self._load()
+                i = self._index.get(key_value)
+            if i is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._records[i]
+
+    def exists(self, key_value):
+        return self.get(key_value) is not None
+
+    def row_number(self, key_value):
+        """1-based sheet row of the record (header is row 1), or None."""
+        key_value = normalize_key(key_value)
+        with self._lock:
+            self._ensure_fresh()
+            i = self._index.get(key_value)
+            return None if i is None else i + 2
+
+    def all(self):
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._records)
+
+    def stream(self, columns=None, offset=0, limit=None):
+        """
+        Uncached, lazily fetched Records of only `columns`, straight from the
+        backend; memory stays flat however large the sheet is.
+        """
+        return self.backend.stream(columns, offset, limit)
+
+    def page(self, page=1, per_page=50, columns=None):
+        """(records, has_more) for one 1-based page of uncached Records of `columns`."""
+        return self.backend.page(page, per_page, columns)
+
+    def _as_row(self, header, record):
+        """(row, record dict) for a record given as a dict keyed by column name or a positional list."""
+        if isinstance(record, dict):
+            return [record.get(column, "") for column in header], record
+        row = list(record)
+        return row, {column: (row[i] if i < len(row) else "") for i, column in enumerate(header)}
+
+    def _cache_appended(self, records):
+        if self._records is not None:
+            for record in records:
+                self._index.setdefault(normalize_key(record.get(self.key)), len(self._records))
+                self._records.append(record)
+        self.version += 1
+
+    def append(self, record):
+        """Appends a record (dict keyed by column name, or a positional row list)."""
+        row, record = self._as_row(self.backend.header(), record)
+        with self._lock:
+            self.backend.append_row(row)
+            self._cache_appended([record])
+
+    def append_many(self, records):
+        """Appends many records with a single backend call (append_rows); returns how many."""
+        header = self.backend.header()
+        converted = [self._as_row(header, record) for record in records]
+        if not converted:
+            return 0
+        with self._lock:
+            self.backend.append_rows([row for row, _ in converted])
+            self._cache_appended([record for _, record in converted])
+        return len(converted)
+
+    def keys(self):
+        """Normalized key values of every record, e.g. to dedupe a bulk import in memory."""
+        with self._lock:
+            self._ensure_fresh()
+            return set(self._index)
+
+    def _confirmed_row(self, key_value, key_col):
+        """Cached row number of the record, if the sheet still holds its key there."""
+        row_number = self.row_number(key_value)
+        if row_number is None:
+            return None
+        if normalize_key(self.backend.read_cell(row_number, key_col)) != normalize_key(key_value):
+            return None
+        return row_number
+
+    def update(self, key_value, fields):
+        """
+        Writes {column name: value} into the record's row and the cached copy.
+        The row's key cell is re-read first; if rows moved since the cache was
+        loaded, the cache is reloaded rather than writing into someone else's row.
+        """
+        header = self.backend.header()
+        key_col = header.index(self.key) + 1
+        values = {header.index(column) + 1: value for column, value in fields.items()}
+        with self._lock:
+            row_number = self._confirmed_row(key_value, key_col)
+            if row_number is None:
+                self.invalidate()
+                row_number = self._confirmed_row(key_value, key_col)
+            if row_number is None:
+                raise KeyError(f"No record with {self.key} = {key_value}")
+
+            self.backend.update_cells(row_number, values)
+            self._records[row_number - 2].update(fields)
+            self.version += 1
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def _get_repository(name, open_worksheet, columns, key="Email", project=False):
+    with _repositories_lock:
+        if name not in _repositories:
+            if REPOSITORY_BACKEND == "sqlite":
+                backend = SQLiteBackend(name, columns)
+            else:
+                backend = SheetsBackend(open_worksheet, columns if project else None)
+            _repositories[name] = Repository(backend, key=key)
+        return _repositories[name]
+
+
+def get_users_repository():
+    """Login accounts ("AI Talent Users" sheet)."""
+    return _get_repository(
+        "users",
+        lambda: get_worksheet(name=USERS_SHEET_NAME),
+        USER_COLUMNS,
+        project=True,
+    )
+
+
+def get_registered_users_repository():
+    """Accounts created through CandidateRegistrationSystem.register (USERS_SHEET_ID)."""
+    return _get_repository(
+        "registered_users",
+        lambda: get_worksheet(key=os.getenv("USERS_SHEET_ID")),
+        ["Email", "Password_Hash", "Type"],
+        project=True,
+    )
+
+
+def get_candidates_repository():
+    """Candidate profiles (CANDIDATES_SHEET_ID)."""
+    def open_worksheet():
+        sheet_id = os.getenv("CANDIDATES_SHEET_ID")
+        if not sheet_id:
+            raise ValueError("❌ Environment variable CANDIDATES_SHEET_ID is missing.")
+        return get_worksheet(key=sheet_id)
+
+    return _get_repository("candidates", open_worksheet, CANDIDATE_COLUMNS)
+
+
+def jobs_configured():
+    """Whether a jobs source exists: the SQLite backend always has one, Sheets needs JOBS_SHEET_ID."""
+    return REPOSITORY_BACKEND == "sqlite" or bool(os.getenv("JOBS_SHEET_ID"))
+
+
+def get_jobs_repository():
+    """Job postings matched against candidates (JOBS_SHEET_ID)."""
+    def open_worksheet():
+        sheet_id = os.getenv("JOBS_SHEET_ID")
+        if not sheet_id:
+            raise ValueError("❌ Environment variable JOBS_SHEET_ID is missing.")
+        return get_worksheet(key=sheet_id)
+
+    return _get_repository("jobs", open_worksheet, JOB_COLUMNS, key="Job Summary")
@@ -0,0 +1,327 @@
+import os
+import tempfile
+import threading
+import numpy as np
+import smart_matcher
+import metrics
+import services
+from embedding_store import deserialize_embedding, is_current_cell
+from geo import haversine_km, vincenty_km
+from ranking import parse_radius
+from vector_codec import QuantizedMatrix
+
+# Candidate embeddings in the sheet are written with the one shared model
+EMBEDDING_MODEL = smart_matcher.EMBEDDING_MODEL
+REVERSE_PAGE_SIZE = int(os.getenv("REVERSE_PAGE_SIZE", "20"))
+REVERSE_MAX_PAGE_SIZE = 100
+# With a lossy search codec, this many times the rows up to the page end are re-ranked exactly
+REVERSE_RERANK_FACTOR = int(os.getenv("REVERSE_RERANK_FACTOR", "4"))
+
+# Haversine and the ellipsoid differ by under 0.5%, so this margin never drops an in-radius candidate
+_HAVERSINE_SLACK = 1.005
+
+
+class EmbeddingMismatch(RuntimeError):
+    """Query and stored candidate embeddings come from different models or dimensions."""
+
+
+def queue_reembedding(records):
+    """Hands candidates without a current embedding to the enrichment queue's "embedding" task."""
+    items = [(str(r.get("Email", "")).strip(), "embedding",
+              {"skills": r.get("Skills", ""), "summary": r.get("Summary", ""),
+               "location": r.get("Location", ""), "radius_km": r.get("Radius", "")})
+             for r in records]
+    try:
+        services.get("registration").queue.enqueue_many(items)
+    except Exception as e:
+        print(f"⚠️ Could not queue {len(items)} candidate re-embeddings: {e}")
+
+
+def _disk_rows(capacity, dim):
+    """Float32 matrix backed by an anonymous temporary file, paged in by the OS on demand."""
+    return np.memmap(tempfile.TemporaryFile(prefix="candidate-vectors-"), dtype=np.float32,
+                     mode="w+", shape=(capacity, dim))
+
+
+class CandidateMatrix:
+    """
+    Stored candidate embeddings decoded once into a compact search matrix
+    (vector_codec: int8/float16 codes, optionally truncated to the leading
+    dimensions), with each candidate's coordinates and radius alongside.
+    When the codec is lossy, unit float32 rows are also kept in a disk-backed
+    memmap so a shortlist can be re-ranked exactly; RAM holds only the codes.
+
+    The matrix holds one model's vectors (`model`, default EMBEDDING_MODEL).
+    As in precompute_embeddings, only cells tagged as that model's embedding
+    of the candidate's current text are used. Other rows (another model,
+    older text, untagged legacy cells) are left out of the query and handed
+    once to `reembed` (default: the enrichment queue), whose rewritten cells
+    a later sync picks up.
+
+    `sync` is incremental: only candidates whose Embedding, Location or Radius
+    cell changed are decoded or geocoded again, and removed candidates are
+    swapped out. Rows are never copied on a query.
+    """
+
+    def __init__(self, capacity=1024, codec=None, dims=None, model=None, reembed=None):
+        self.model = model or EMBEDDING_MODEL
+        self.spec = smart_matcher.model_spec(self.model)
+        self.dim = None
+        self.capacity = capacity
+        self.codec = codec
+        self.dims = dims
+        self._search = None
+        self._full = None
+        self._coords = np.full((capacity, 2), np.nan)
+        self._radius = np.zeros(capacity)
+        self._emails = []
+        self._records = []
+        self._cells = []
+        self._rows = {}
+        # The queue writes the shared model's cells only; other models' stale rows are just skipped
+        self.reembed = reembed or (queue_reembedding if self.model == EMBEDDING_MODEL else None)
+        self._queued = {}
+        self._lock = threading.RLock()
+        self.stats = {"decoded": 0, "queued": 0, "skipped": 0}
+
+    def __len__(self):
+        return len(self._emails)
+
+    @property
+    def exact(self):
+        return self._search is None or self._search.exact
+
+    @property
+    def nbytes(self):
+        """Resident bytes of the search codes (the re-rank rows live on disk)."""
+        return self._search.nbytes if self._search is not None else 0
+
+    def _grow(self, n):
+        if self._search is None:
+            self._search = QuantizedMatrix(self.dim, codec=self.codec, dims=self.dims,
+                                           capacity=self.capacity)
+            if not self._search.exact:
+                self._full = _disk_rows(self.capacity, self.dim)
+        if n <= self.capacity:
+            return
+        capacity = max(self.capacity, 1)
+        while capacity < n:
+            capacity *= 2
+        size = len(self._emails)
+        self._search.grow(capacity, size)
+        if self._full is not None:
+            full = _disk_rows(capacity, self.dim)
+            full[:size] = self._full[:size]
+            self._full = full
+        coords = np.full((capacity, 2), np.nan)
+        radius = np.zeros(capacity)
+        coords[:size] = self._coords[:size]
+        radius[:size] = self._radius[:size]
+        self._coords, self._radius, self.capacity = coords, radius, capacity
+
+    def _remove(self, email):
+        row = self._rows.pop(email)
+        last = len(self._emails) - 1
+        if row != last:
+            moved = self._emails[last]
+            self._search.move(row, last)
+            if self._full is not None:
+                self._full[row] = self._full[last]
+            self._coords[row] = self._coords[last]
+            self._radius[row] = self._radius[last]
+            self._emails[row], self._records[row], self._cells[row] = (
+                moved, self._records[last], self._cells[last])
+            self._rows[moved] = row
+        self._emails.pop()
+        self._records.pop()
+        self._cells.pop()
+
+    def _check_dim(self, dim, source):
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise EmbeddingMismatch(
+                f"{source} has {dim} dimensions but the candidate matrix holds {self.dim}-dimensional "
+                f"{self.spec} vectors; check EMBEDDING_MODEL and EMBEDDING_DIMENSIONS")
+
+    def _stored_vector(self, email, record, cell):
+        """The cell's vector if it is this model's embedding of the record's text, else None."""
+        if not is_current_cell(cell, self.spec, smart_matcher.candidate_text(record)):
+            return None
+        try:
+            vector = np.asarray(deserialize_embedding(cell), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Could not decode stored embedding for {email}: {e}")
+            return None
+        if self.dim is None:
+            self.dim = len(vector)
+        if len(vector) != self.dim:
+            return None
+        return vector
+
+    def sync(self, candidates, dim=None):
+        """
+        Makes the matrix hold exactly the candidates with a current stored
+        embedding; the rest are skipped and queued for re-embedding, once per
+        cell. `dim` (the query's dimension) fixes the matrix width on the first sync.
+        """
+        with self._lock:
+            if dim is not None:
+                self._check_dim(dim, f"{self.spec} query")
+            seen, kept, changed, stale, queued = set(), set(), [], [], {}
+            for record in candidates:
+                email = str(record.get("Email", "")).strip().lower()
+                cell = str(record.get("Embedding", "")).strip()
+                if not email or not cell or email in seen:
+                    continue
+                seen.add(email)
+                cells = (cell, str(record.get("Location", "")).strip(), str(record.get("Radius", "")))
+                row = self._rows.get(email)
+                if row is not None and self._cells[row] == cells:
+                    self._records[row] = record
+                    kept.add(email)
+                    continue
+                vector = self._stored_vector(email, record, cell)
+                if vector is not None:
+                    changed.append((email, record, cells, vector))
+                    kept.add(email)
+                    continue
+                self.stats["skipped"] += 1
+                queued[email] = cells
+                if self._queued.get(email) != cells:
+                    stale.append(record)
+
+            # Rows only the queue can fix stay out of this query rather than being embedded inline
+            self._queued = queued
+            if stale and self.reembed is not None:
+                self.reembed(stale)
+                self.stats["queued"] += len(stale)
+
+            for email in [e for e in self._rows if e not in kept]:
+                self._remove(email)
+            if not changed:
+                return 0
+
+            coords = smart_matcher.resolve_locations([cells[1] for _, _, cells, _ in changed])
+            self._grow(len(self._emails) + len(changed))
+            for (email, record, cells, vector), latlon in zip(changed, coords):
+                row = self._rows.get(email)
+                if row is None:
+                    row = self._rows[email] = len(self._emails)
+                    self._emails.append(email)
+                    self._records.append(record)
+                    self._cells.append(cells)
+                else:
+                    self._records[row], self._cells[row] = record, cells
+                unit = vector / (np.linalg.norm(vector) or 1.0)
+                self._search.set(row, unit)
+                if self._full is not None:
+                    self._full[row] = unit
+                self._coords[row] = latlon
+                self._radius[row] = parse_radius(cells[2])
+            self.stats["decoded"] += len(changed)
+            return len(changed)
+
+    def score(self, query, origin=None, keep_unknown_locations=False):
+        """
+        Cosine similarity of every candidate to `query` (a blocked scan of the
+        search codes, approximate unless the codec is exact) plus distances,
+        masked to candidates whose own radius covers `origin`.
+        Returns (rows, scores, distances_km) for the eligible candidates.
+        """
+        with self._lock:
+            n = len(self._emails)
+            if not n:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty(0)
+            q = np.asarray(query, dtype=np.float32)
+            self._check_dim(len(q), "Query")
+            scores = self._search.scores(q, n)
+
+            distances = np.full(n, np.nan)
+            if origin is None:
+                return np.arange(n), scores, distances
+
+            coords, radius = self._coords[:n], self._radius[:n]
+            known = ~np.isnan(coords[:, 0])
+            rough = np.full(n, np.inf)
+            rough[known] = haversine_km(origin[0], origin[1], coords[known, 0], coords[known, 1])
+            near = np.flatnonzero(rough <= radius * _HAVERSINE_SLACK)
+            distances[near] = vincenty_km(origin[0], origin[1], coords[near, 0], coords[near, 1])
+            eligible = distances <= radius
+            if keep_unknown_locations:
+                eligible |= ~known
+            rows = np.flatnonzero(eligible)
+            return rows, scores[rows], distances[rows]
+
+    def exact_scores(self, rows, query):
+        """Full-precision cosine similarity of `rows` to `query`, for re-ranking a shortlist."""
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        with self._lock:
+            if self._full is None:
+                return self._search.scores(q, len(self._emails))[rows]
+            # Read the memmap in row order so pages are touched sequentially
+            order = np.argsort(rows)
+            out = np.empty(len(rows), dtype=np.float32)
+            out[order] = self._full[rows[order]] @ q
+            return out
+
+    def record(self, row):
+        return self._records[row]
+
+
+class ReverseMatcher:
+    """Ranks stored candidates for a job: embedding similarity within each candidate's radius, paged."""
+
+    def __init__(self, model=None, keep_unknown_locations=False, codec=None, dims=None, rerank_factor=None):
+        self.model = model or EMBEDDING_MODEL
+        self.keep_unknown_locations = keep_unknown_locations
+        self.matrix = CandidateMatrix(codec=codec, dims=dims, model=self.model)
+        self.rerank_factor = REVERSE_RERANK_FACTOR if rerank_factor is None else rerank_factor
+        self._synced_version = None
+
+    def rank(self, job, candidates, page=1, per_page=None, version=None):
+        """
+        One page of candidates for `job`. Pass the candidate source's `version`
+        to skip the resync scan when nothing changed since the last call.
+        """
+        per_page = max(1, min(per_page or REVERSE_PAGE_SIZE, REVERSE_MAX_PAGE_SIZE))
+        page = max(1, page)
+        query = smart_matcher.get_embedding(smart_matcher.job_text(job), model=self.model)
+        if query is None:
+            raise ValueError("Embedding request failed")
+        if version is None or version != self._synced_version:
+            with metrics.timer("reverse.sync"):
+                self.matrix.sync(candidates, dim=len(query))
+            self._synced_version = version
+
+        location = job.get("Job Location", "").strip()
+        origin = smart_matcher.get_coordinates(location) if location else None
+        with metrics.timer("reverse.score"):
+            rows, scores, distances = self.matrix.score(query, origin, self.keep_unknown_locations)
+
+        # Only the rows up to the end of the requested page are sorted; with a
+        # lossy codec a wider shortlist is re-scored exactly before sorting
+        end = min(page * per_page, len(rows))
+        start = (page - 1) * per_page
+        if start < end:
+            k = end if self.matrix.exact else min(len(rows), end * max(1, self.rerank_factor))
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+            if not self.matrix.exact:
+                with metrics.timer("reverse.rerank"):
+                    scores[top] = self.matrix.exact_scores(rows[top], query)
+            top = top[np.argsort(-scores[top], kind="stable")][start:end]
+        else:
+            top = np.empty(0, dtype=np.int64)
+
+        results = []
+        for i in top:
+            candidate = self.matrix.record(rows[i])
+            results.append({
+                "name": candidate.get("Name", "Unknown"),
+                "email": candidate.get("Email", "Unknown"),
+                "location": candidate.get("Location", ""),
+                "score": round(float(scores[i]), 4),
+                "distance_km": None if np.isnan(distances[i]) else round(float(distances[i]), 2),
+            })
+        return {"total": int(len(rows)), "page": page, "per_page": per_page, "results": results}
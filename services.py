@@ -0,0 +1,107 @@
+import time
+import threading
+
+# Reference point for the startup report: when the app's first module imported this one
+_PROCESS_STARTED = time.perf_counter()
+
+
+class LazyService:
+    """A client or subsystem built by `factory` on first `get()`, once per process."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._instance = None
+        self._created = False
+        self._lock = threading.Lock()
+        self.init_ms = None
+        self.created_after_s = None
+
+    def get(self):
+        if self._created:
+            return self._instance
+        with self._lock:
+            if not self._created:
+                started = time.perf_counter()
+                self._instance = self.factory()
+                self.init_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.created_after_s = round(started - _PROCESS_STARTED, 3)
+                self._created = True
+                print(f"🧩 Service '{self.name}' ready in {self.init_ms} ms")
+        return self._instance
+
+    def set(self, instance):
+        """Replaces the instance (tests and benchmarks inject fakes this way)."""
+        with self._lock:
+            self._instance = instance
+            self._created = True
+            self.init_ms = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._instance = None
+            self._created = False
+            self.init_ms = self.created_after_s = None
+
+    @property
+    def created(self):
+        return self._created
+
+
+_services = {}
+_phases = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Declares a lazily built service; re-registering an existing name keeps the first factory."""
+    with _registry_lock:
+        if name not in _services:
+            _services[name] = LazyService(name, factory)
+        return _services[name]
+
+
+def get(name):
+    return _services[name].get()
+
+
+def override(name, instance):
+    _services[name].set(instance)
+
+
+def reset(name=None):
+    for service in ([_services[name]] if name else list(_services.values())):
+        service.reset()
+
+
+def record_phase(name, started):
+    """Records how long a startup phase took, from a `time.perf_counter()` start."""
+    _phases[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def startup_report():
+    """Startup phases and which services have been built so far (and how long each took)."""
+    return {
+        "uptime_s": round(time.perf_counter() - _PROCESS_STARTED, 3),
+        "phases_ms": dict(_phases),
+        "services": {
+            name: {"created": s.created, "init_ms": s.init_ms, "created_after_s": s.created_after_s}
+            for name, s in sorted(_services.items())
+        },
+    }
+
+
+# --- Shared external clients (the libraries themselves are imported on first use) ---
+
+def _make_openai():
+    from openai import OpenAI
+    return OpenAI()
+
+
+def _make_geolocator():
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="ai-talent-matching")
+
+
+register("openai", _make_openai)
+register("geolocator", _make_geolocator)
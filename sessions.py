@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from gspread.utils import numericise
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+import metrics
+from repository import get_users_repository, get_candidates_repository
+
+# --- Session settings ---
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "session_token")
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(7 * 24 * 3600)))
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "0") == "1"
+# Lifetime of the status token /register hands out for polling enrichment progress
+REGISTRATION_STATUS_MAX_AGE = int(os.getenv("REGISTRATION_STATUS_MAX_AGE", str(24 * 3600)))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "2048"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "3600"))
+# bcrypt runs here instead of on request threads; bounded so logins cannot take every core
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "10"))
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+
+def hash_password(password):
+    """bcrypt hash (bytes) of `password`, computed on the bcrypt pool."""
+    with metrics.timer("auth.bcrypt"):
+        future = _bcrypt_pool.submit(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt())
+        return future.result(timeout=BCRYPT_TIMEOUT)
+
+
+def check_password(password, stored_hash):
+    """True if `password` matches the stored bcrypt hash; verified on the bcrypt pool."""
+    if not stored_hash:
+        return False
+    with metrics.timer("auth.bcrypt"):
+        future = _bcrypt_pool.submit(bcrypt.checkpw, password.encode("utf-8"), stored_hash.encode("utf-8"))
+        try:
+            return future.result(timeout=BCRYPT_TIMEOUT)
+        except ValueError:
+            # Malformed hash in the sheet
+            return False
+
+
+def profile_version(profile):
+    """
+    Short content hash of a profile; any worker computes the same value from the same data.
+    Strings are numericised first, as sheet reads are, so an edit held as "50"
+    hashes like the 50 a refetch returns.
+    """
+    normalized = {k: numericise(v) if isinstance(v, str) else v for k, v in profile.items()}
+    encoded = json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+# Columns never held in a session profile: the password hash, and the embedding cell,
+# which is large and rewritten by background tasks without changing anything a view shows
+PROFILE_EXCLUDED_COLUMNS = frozenset({"Password_Hash", "Embedding"})
+
+
+def fetch_profile(email):
+    """
+    A user's profile from the sheets: the account row merged with the
+    candidate row for candidates, without PROFILE_EXCLUDED_COLUMNS. None if unknown.
+    """
+    user = get_users_repository().get(email)
+    if user is None:
+        return None
+    profile = dict(user)
+    if str(user.get("Type", "")).strip().lower() == "candidate":
+        candidate = get_candidates_repository().get(email)
+        if candidate is not None:
+            profile.update(candidate)
+    return {k: v for k, v in profile.items() if k not in PROFILE_EXCLUDED_COLUMNS}
+
+
+class ProfileCache:
+    """
+    Per-worker LRU of profiles keyed by user id, each stored with its version.
+    A lookup only hits when the version matches the one in the caller's token,
+    so a profile updated by another worker is refetched rather than served stale.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or PROFILE_CACHE_SIZE
+        self.ttl = PROFILE_CACHE_TTL if ttl is None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.time():
+                self.stats["misses"] += 1
+                return None
+            if entry[1] != version:
+                self.stats["stale"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[2]
+
+    def put(self, user_id, version, profile):
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, version, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+class SessionManager:
+    """
+    Signed, expiring session tokens (itsdangerous, keyed by APP_SECRET_KEY)
+    carrying user id, user type and profile version, plus the per-worker
+    profile cache they index. An authenticated request whose profile is
+    cached at the token's version makes no Sheets calls at all.
+    """
+
+    def __init__(self, secret_key=None, max_age=None, cache=None):
+        secret_key = secret_key or os.getenv("APP_SECRET_KEY", "super-secret-key")
+        self.serializer = URLSafeTimedSerializer(secret_key, salt="session")
+        self.status_serializer = URLSafeTimedSerializer(secret_key, salt="registration-status")
+        self.max_age = max_age or SESSION_MAX_AGE
+        self.cache = cache or ProfileCache()
+
+    def issue(self, user_id, user_type, version):
+        return self.serializer.dumps({"uid": user_id, "typ": user_type, "ver": version})
+
+    def verify(self, token):
+        """The token's claims ({"uid", "typ", "ver"}), or None if it is forged, malformed or expired."""
+        if not token:
+            return None
+        try:
+            return self.serializer.loads(token, max_age=self.max_age)
+        except (SignatureExpired, BadSignature):
+            return None
+
+    def issue_status_token(self, email):
+        """Signed, expiring token that lets a registration's caller poll its enrichment status."""
+        return self.status_serializer.dumps(str(email).strip().lower())
+
+    def verify_status_token(self, token):
+        """The email a status token was issued for, or None if it is forged, malformed or expired."""
+        if not token:
+            return None
+        try:
+            return self.status_serializer.loads(token, max_age=REGISTRATION_STATUS_MAX_AGE)
+        except (SignatureExpired, BadSignature):
+            return None
+
+    def start(self, profile):
+        """Caches a freshly loaded profile and returns a token for it."""
+        user_id = str(profile.get("Email", "")).strip().lower()
+        version = profile_version(profile)
+        self.cache.put(user_id, version, profile)
+        return self.issue(user_id, str(profile.get("Type", "")).strip().lower(), version)
+
+    def profile(self, claims):
+        """Profile for verified token claims: from the cache, else refetched (and re-cached)."""
+        return self.resolve(claims)[0]
+
+    def resolve(self, claims):
+        """
+        (profile, token) for verified token claims. `token` is a new token when
+        the refetched profile is at a different version than the claims, else
+        None; handing it back to the client lets later requests hit the cache.
+        """
+        profile = self.cache.get(claims["uid"], claims["ver"])
+        metrics.cache("profiles", hits=profile is not None, misses=profile is None)
+        if profile is not None:
+            return profile, None
+        profile = fetch_profile(claims["uid"])
+        if profile is None:
+            return None, None
+        version = profile_version(profile)
+        self.cache.put(claims["uid"], version, profile)
+        if version == claims["ver"]:
+            return profile, None
+        return profile, self.issue(claims["uid"], claims["typ"], version)
+
+    def update(self, profile, fields):
+        """
+        Applies `fields` to a cached profile after the sheet write succeeded and
+        returns a new token carrying the new version.
+        """
+        user_id = str(profile.get("Email", "")).strip().lower()
+        self.cache.invalidate(user_id)
+        return self.start(dict(profile, **fields))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    """Process-wide SessionManager (one profile cache per worker)."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager()
+        return _manager
@@ -0,0 +1,141 @@
+import os
+from gspread.utils import rowcol_to_a1, numericise_all
+import metrics
+
+# Rows fetched per ranged read
+SHEET_BLOCK_ROWS = int(os.getenv("SHEET_BLOCK_ROWS", "500"))
+
+
+class Record:
+    """
+    One sheet row restricted to the projected columns. Read-only and dict-like
+    (`get`, `[]`, `keys`, `items`); the column tuple is shared by every record
+    from the same reader, so each record costs two slots.
+    """
+
+    __slots__ = ("_fields", "_values")
+
+    def __init__(self, fields, values):
+        self._fields = fields
+        self._values = values
+
+    def __getitem__(self, column):
+        try:
+            return self._values[self._fields.index(column)]
+        except ValueError:
+            raise KeyError(column) from None
+
+    def __contains__(self, column):
+        return column in self._fields
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+    def get(self, column, default=None):
+        try:
+            return self[column]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return zip(self._fields, self._values)
+
+    def to_dict(self):
+        return dict(zip(self._fields, self._values))
+
+
+def _column_runs(indexes):
+    """Groups sorted 1-based column indexes into contiguous (first, last) runs."""
+    runs = []
+    for i in sorted(indexes):
+        if runs and i == runs[-1][1] + 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [tuple(run) for run in runs]
+
+
+class RecordReader:
+    """
+    Streams a worksheet in ranged blocks of rows, fetching only the requested
+    columns (one batch_get per block, one range per contiguous column run).
+    A row whose column A and projected columns are all blank is skipped.
+    Values are numericised like get_all_records; memory stays at one block.
+    """
+
+    def __init__(self, worksheet, columns=None, block_rows=None):
+        self.worksheet = worksheet
+        self.block_rows = block_rows or SHEET_BLOCK_ROWS
+        header = worksheet.row_values(1)
+        if columns is None:
+            columns = [c for c in header if c]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise KeyError(f"Unknown columns: {missing}")
+        self.fields = tuple(columns)
+        self._indexes = [header.index(c) + 1 for c in self.fields]
+        # Column A is always read too: the API trims trailing blank cells, so a
+        # sparse projected column alone could end a block early
+        self._runs = _column_runs(set(self._indexes) | {1})
+
+    def _fetch(self, first_row, last_row):
+        """Projected, numericised values per row of the range; None for blank rows."""
+        ranges = [f"{rowcol_to_a1(first_row, a)}:{rowcol_to_a1(last_row, b)}" for a, b in self._runs]
+        with metrics.timer("sheets.batch_get"):
+            blocks = self.worksheet.batch_get(ranges)
+        n_rows = max((len(block) for block in blocks), default=0)
+        by_column = {}
+        for (a, b), block in zip(self._runs, blocks):
+            for r in range(n_rows):
+                row = block[r] if r < len(block) else []
+                for c in range(a, b + 1):
+                    by_column[(r, c)] = row[c - a] if c - a < len(row) else ""
+        rows = []
+        for r in range(n_rows):
+            values = [by_column[(r, c)] for c in self._indexes]
+            blank = by_column[(r, 1)] == "" and all(v == "" for v in values)
+            rows.append(None if blank else numericise_all(values))
+        return rows
+
+    def _rows(self, offset=0, limit=None):
+        """(data row index, values) for the non-blank data rows offset .. offset+limit-1."""
+        end = None if limit is None else offset + limit
+        last_row = self.worksheet.row_count
+        i = offset
+        while end is None or i < end:
+            size = self.block_rows if end is None else min(self.block_rows, end - i)
+            values = self._fetch(i + 2, i + size + 1)
+            for j, value in enumerate(values):
+                if value is not None:
+                    yield i + j, value
+            i += size
+            # The API drops trailing blank rows, so a short block only means the end
+            # once the sheet's last row is passed (rows appended since open come back full)
+            if len(values) < size and i + 1 >= last_row:
+                return
+
+    def iter_records(self, offset=0, limit=None):
+        """Yields Records for the non-blank data rows among offset, offset+1, ... (0 = first row under the header)."""
+        for _, values in self._rows(offset, limit):
+            yield Record(self.fields, values)
+
+    def all_records(self):
+        """Every data row up to the last non-blank one, blank rows included, so position + 2 is the sheet row."""
+        records, blank = [], [""] * len(self.fields)
+        for i, values in self._rows():
+            records.extend(Record(self.fields, blank) for _ in range(i - len(records)))
+            records.append(Record(self.fields, values))
+        return records
+
+    def page(self, page=1, per_page=50):
+        """(records, has_more) for one 1-based page of `per_page` data rows, blank rows left out."""
+        start = (page - 1) * per_page
+        records = []
+        for i, values in self._rows(offset=start):
+            if i >= start + per_page:
+                return records, True
+            records.append(Record(self.fields, values))
+        return records, False
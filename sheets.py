@@ -1,15 +1,129 @@
 import os
+import threading
 import gspread
 from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession, Request
+from requests.adapters import HTTPAdapter
+import metrics
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+SHEETS_POOL_SIZE = int(os.getenv("SHEETS_POOL_SIZE", "10"))
+
+
+class SheetsClientManager:
+    """
+    Process-wide holder for the authorized gspread client.
+
+    Credentials are read from disk once, the access token is refreshed only
+    when it has expired, and every request goes through one pooled HTTP session.
+    Spreadsheet and worksheet handles are memoized by key/name so repeated
+    opens skip the Drive lookup. `stats()` reports hits and misses per cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._creds = None
+        self._client = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._stats = {
+            "client_hits": 0, "client_misses": 0,
+            "spreadsheet_hits": 0, "spreadsheet_misses": 0,
+            "worksheet_hits": 0, "worksheet_misses": 0,
+            "token_refreshes": 0,
+        }
+
+    def _build_client(self):
+        creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")  # should point to credentials.json
+        print(f"📁 Loading credentials from: {creds_path}")  # helpful for debugging
+
+        self._creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
+        session = AuthorizedSession(self._creds)
+        adapter = HTTPAdapter(pool_connections=SHEETS_POOL_SIZE, pool_maxsize=SHEETS_POOL_SIZE)
+        session.mount("https://", adapter)
+        self._client = gspread.Client(auth=self._creds, session=session)
+
+    def _ensure_token(self):
+        if not self._creds.valid:
+            self._creds.refresh(Request())
+            self._stats["token_refreshes"] += 1
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._stats["client_misses"] += 1
+                self._build_client()
+            else:
+                self._stats["client_hits"] += 1
+            self._ensure_token()
+            return self._client
+
+    def open_by_key(self, key):
+        with self._lock:
+            cache_key = ("key", key)
+            if cache_key in self._spreadsheets:
+                self._stats["spreadsheet_hits"] += 1
+                return self._spreadsheets[cache_key]
+            self._stats["spreadsheet_misses"] += 1
+            spreadsheet = self.client().open_by_key(key)
+            self._spreadsheets[cache_key] = spreadsheet
+            return spreadsheet
+
+    def open(self, name):
+        with self._lock:
+            cache_key = ("name", name)
+            if cache_key in self._spreadsheets:
+                self._stats["spreadsheet_hits"] += 1
+                return self._spreadsheets[cache_key]
+            self._stats["spreadsheet_misses"] += 1
+            spreadsheet = self.client().open(name)
+            self._spreadsheets[cache_key] = spreadsheet
+            return spreadsheet
+
+    def worksheet(self, key=None, name=None, index=0):
+        """First (or `index`-th) worksheet of a spreadsheet opened by key or by name."""
+        with self._lock:
+            cache_key = (key, name, index)
+            if cache_key in self._worksheets:
+                self._stats["worksheet_hits"] += 1
+                metrics.cache("sheets.worksheet", hits=1)
+                return self._worksheets[cache_key]
+            self._stats["worksheet_misses"] += 1
+            metrics.cache("sheets.worksheet", misses=1)
+            with metrics.timer("sheets.open"):
+                spreadsheet = self.open_by_key(key) if key else self.open(name)
+                worksheet = spreadsheet.get_worksheet(index)
+            self._worksheets[cache_key] = worksheet
+            return worksheet
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, spreadsheets_cached=len(self._spreadsheets),
+                        worksheets_cached=len(self._worksheets))
+
+    def reset(self):
+        """Drops the client and all handles, e.g. after credentials rotate."""
+        with self._lock:
+            self._creds = None
+            self._client = None
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+
+_manager = SheetsClientManager()
+
 
 def get_gspread_client():
-    creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")  # should point to credentials.json
-    print(f"📁 Loading credentials from: {creds_path}")  # helpful for debugging
+    return _manager.client()
+
+
+def get_worksheet(key=None, name=None, index=0):
+    return _manager.worksheet(key=key, name=name, index=index)
 
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
 
-    creds = Credentials.from_service_account_file(creds_path, scopes=scopes)
-    return gspread.authorize(creds)
+def get_client_stats():
+    return _manager.stats()
@@ -0,0 +1,193 @@
+import threading
+import numpy as np
+from scipy import sparse
+
+
+def parse_skills(value):
+    """Normalizes a comma-separated string or list of skills into a set of lowercase names."""
+    if isinstance(value, str):
+        return set(s.strip().lower() for s in value.split(",") if s.strip())
+    if isinstance(value, list):
+        return set(s.strip().lower() for s in value if isinstance(s, str) and s.strip())
+    return set()
+
+
+def _top_k_rows(scores, tiebreak, k):
+    """Indices of the k largest scores, best first; ties go to the lower `tiebreak`."""
+    if k is None or k >= len(scores):
+        return np.lexsort((tiebreak, -scores))
+    # Widen the partition to every score tied with the k-th so ties resolve by `tiebreak`
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    part = np.flatnonzero(scores >= kth)
+    return part[np.lexsort((tiebreak[part], -scores[part]))][:k]
+
+
+class SkillIndex:
+    """
+    Inverted skill index over candidates.
+
+    Each candidate's skills are parsed once into vocabulary ids and stored as a
+    row of a binary candidates × skills CSR matrix; its transpose (skills →
+    candidates) is the inverted index. Adding or re-registering a candidate
+    appends a row (the old one is tombstoned), so nothing else is re-parsed.
+    A job query only touches the posting lists of its own skills, and
+    `score_jobs` scores many jobs with one sparse matrix multiply.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self._lock = threading.RLock()
+        self._indptr = [0]
+        self._indices = []
+        self._keys = []
+        self._records = []
+        self._alive = []
+        self._rows = {}
+        self._raw_skills = {}
+        self._positions = []
+        self._positions_arr = None
+        self._matrix = None
+        self._inverted = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _skill_ids(self, skills, grow=False):
+        ids = []
+        for skill in skills:
+            skill_id = self.vocab.get(skill)
+            if skill_id is None and grow:
+                skill_id = self.vocab[skill] = len(self.vocab)
+            if skill_id is not None:
+                ids.append(skill_id)
+        return sorted(set(ids))
+
+    # --- Updates ---
+
+    def add(self, key, record, skills_value, position=None):
+        """
+        Adds or replaces one candidate; unchanged skill strings are a no-op.
+        `position` orders tied scores (defaults to insertion order).
+        """
+        with self._lock:
+            if position is None:
+                position = len(self._keys)
+            if key in self._rows and self._raw_skills.get(key) == skills_value:
+                row = self._rows[key]
+                self._records[row] = record
+                if self._positions[row] != position:
+                    self._positions[row] = position
+                    self._positions_arr = None
+                return
+            self.remove(key)
+            ids = self._skill_ids(parse_skills(skills_value), grow=True)
+            self._indices.extend(ids)
+            self._indptr.append(len(self._indices))
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._records.append(record)
+            self._alive.append(True)
+            self._positions.append(position)
+            self._raw_skills[key] = skills_value
+            self._matrix = self._inverted = None
+            self._positions_arr = None
+
+    def remove(self, key):
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            self._records[row] = None
+            self._raw_skills.pop(key, None)
+            self._matrix = self._inverted = None
+            if len(self._alive) > 1024 and self._alive.count(False) > len(self._alive) // 2:
+                self._compact()
+            return True
+
+    def sync(self, candidates, key_fn, skills_fn):
+        """Makes the index hold exactly `candidates`, re-parsing only new or edited ones."""
+        with self._lock:
+            seen = set()
+            for position, candidate in enumerate(candidates):
+                key = key_fn(candidate, position)
+                seen.add(key)
+                self.add(key, candidate, skills_fn(candidate), position)
+            for key in [k for k in self._rows if k not in seen]:
+                self.remove(key)
+
+    def _compact(self):
+        live = [(k, self._records[r]) for k, r in sorted(self._rows.items(), key=lambda kv: kv[1])]
+        old_indptr, old_indices, old_positions = self._indptr, self._indices, self._positions
+        rows = dict(self._rows)
+        self._indptr, self._indices, self._positions = [0], [], []
+        self._keys, self._records, self._alive, self._rows = [], [], [], {}
+        for key, record in live:
+            r = rows[key]
+            self._indices.extend(old_indices[old_indptr[r]:old_indptr[r + 1]])
+            self._indptr.append(len(self._indices))
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._records.append(record)
+            self._alive.append(True)
+            self._positions.append(old_positions[r])
+        self._positions_arr = None
+
+    # --- Matrices ---
+
+    def _build(self):
+        if self._matrix is None:
+            n_rows, n_skills = len(self._keys), max(len(self.vocab), 1)
+            self._matrix = sparse.csr_matrix(
+                (np.ones(len(self._indices), dtype=np.float32),
+                 np.asarray(self._indices, dtype=np.int32),
+                 np.asarray(self._indptr, dtype=np.int64)),
+                shape=(n_rows, n_skills),
+            )
+            self._inverted = self._matrix.T.tocsr()
+            self._alive_mask = np.asarray(self._alive, dtype=bool)
+        if self._positions_arr is None:
+            self._positions_arr = np.asarray(self._positions, dtype=np.int64)
+        return self._matrix, self._inverted
+
+    # --- Queries ---
+
+    def match(self, job_skills, k=None):
+        """Returns [(record, overlap)] for candidates sharing ≥1 skill, best first."""
+        with self._lock:
+            _, inverted = self._build()
+            ids = self._skill_ids(parse_skills(job_skills))
+            if not ids:
+                return []
+            postings = [inverted.indices[inverted.indptr[i]:inverted.indptr[i + 1]] for i in ids]
+            rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+            live = self._alive_mask[rows]
+            rows, counts = rows[live], counts[live]
+            order = _top_k_rows(counts.astype(np.float64), self._positions_arr[rows], k)
+            return [(self._records[rows[i]], int(counts[i])) for i in order]
+
+    def score_jobs(self, jobs_skills, k=10):
+        """Scores many jobs at once (one sparse multiply); returns a list of [(record, overlap)] per job."""
+        with self._lock:
+            matrix, _ = self._build()
+            n_skills = matrix.shape[1]
+            indptr, indices = [0], []
+            for job_skills in jobs_skills:
+                indices.extend(i for i in self._skill_ids(parse_skills(job_skills)))
+                indptr.append(len(indices))
+            jobs = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, indptr),
+                shape=(len(jobs_skills), n_skills),
+            )
+            overlap = (jobs @ matrix.T).tocsr()
+
+            results = []
+            for j in range(overlap.shape[0]):
+                start, end = overlap.indptr[j], overlap.indptr[j + 1]
+                rows = overlap.indices[start:end]
+                scores = overlap.data[start:end]
+                live = self._alive_mask[rows] & (scores > 0)
+                rows, scores = rows[live], scores[live]
+                order = _top_k_rows(scores.astype(np.float64), self._positions_arr[rows], k)
+                results.append([(self._records[rows[i]], int(scores[i])) for i in order])
+            return results
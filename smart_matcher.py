@@ -1,114 +1,289 @@
 import os
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from openai import OpenAI
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import services
+import metrics
+from embedding_store import get_store, text_key
+from job_index import JobIndex
+from geocoding import Geocoder
+from text_tokens import token_set, skill_set
+from geo import CoordinateTable
 
-client = OpenAI()
-geolocator = Nominatim(user_agent="ai-talent-matching")
+# --- Persistent geocoding cache shared across workers, opened on first lookup ---
+services.register("geocoder", lambda: Geocoder(lambda name: _nominatim_geocode(name)))
 
-# --- Geocoding cache ---
-_geocode_cache = {}
+# --- Batch embedding settings ---
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+# Rate-limited (429) or failed (5xx, network) batches are retried whole with exponential backoff
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "4"))
+EMBEDDING_BACKOFF_BASE = float(os.getenv("EMBEDDING_BACKOFF_BASE", "1"))
+EMBEDDING_BACKOFF_MAX = float(os.getenv("EMBEDDING_BACKOFF_MAX", "30"))
+# The one embedding model used everywhere: matching, the sheet's Embedding column,
+# reverse matching and the backfill all read and write vectors from this model
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+# Matryoshka truncation requested from the API (text-embedding-3 models only); 0 keeps the native size
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
 
-def get_embedding(text, model="text-embedding-3-large"):
+# --- Job vector index, kept in sync with the job rows across requests ---
+_job_index = JobIndex()
+# Held while jobs are pruned, added and read (never across embedding calls), so a caller
+# with another catalogue can't drop them mid-query
+_job_index_lock = threading.RLock()
+# Embed-then-add rounds before reading with whatever is indexed (another catalogue's sync
+# can drop jobs while this caller embeds with the lock released)
+JOB_INDEX_SYNC_ROUNDS = 3
+# Columns a job row may carry a stable id in
+JOB_ID_COLUMNS = ("Job ID", "ID")
+
+# --- Location name → lat/lon table for the batch geo stage ---
+_coordinate_table = CoordinateTable()
+
+def candidate_text(candidate_record):
+    """Text embedded for a candidate; shared with precompute_embeddings so cache entries match."""
+    summary = candidate_record.get("Summary", "").strip()
+    location = candidate_record.get("Location", "").strip()
+    return f"{summary}. Location: {location}"
+
+def job_text(job):
+    return f"{job.get('Job Summary', '').strip()}. Location: {job.get('Job Location', '').strip()}"
+
+def embedding_dimensions(model):
+    """Vector size to request for `model`, or None for the model's native size."""
+    if EMBEDDING_DIMENSIONS and model.startswith("text-embedding-3"):
+        return EMBEDDING_DIMENSIONS
+    return None
+
+def model_spec(model=None):
+    """`model`, plus "@<dims>" when its vectors are truncated; names the store and tags sheet cells."""
+    model = model or EMBEDDING_MODEL
+    dims = embedding_dimensions(model)
+    return f"{model}@{dims}" if dims else model
+
+def embedding_store(model=None):
+    """The embedding store for `model`; truncated vectors get a store of their own."""
+    return get_store(model_spec(model))
+
+def _create_embeddings(embed_client, model, texts):
+    model = model or EMBEDDING_MODEL
+    dims = embedding_dimensions(model)
+    params = {"dimensions": dims} if dims else {}
+    with metrics.timer("openai.embeddings"):
+        return embed_client.embeddings.create(model=model, input=texts, **params)
+
+def get_embedding(text, model=None):
     if not text or not text.strip():
         return None
+    store = embedding_store(model)
+    cached = store.get(text)
+    if cached is not None:
+        metrics.cache("embeddings", hits=1)
+        return cached
+    metrics.cache("embeddings", misses=1)
     try:
-        response = client.embeddings.create(model=model, input=text.strip())
-        return response.data[0].embedding
+        response = _create_embeddings(services.get("openai"), model, text.strip())
+        embedding = response.data[0].embedding
+        store.put(text, embedding)
+        return embedding
     except Exception as e:
         print(f"🔥 Embedding error: {text[:80]}... → {e}")
         return None
 
+def _throttle(rate_limiter, token_limiter, texts):
+    if rate_limiter:
+        rate_limiter.acquire(1)
+    if token_limiter:
+        # ~4 characters per token is close enough for budgeting
+        token_limiter.acquire(max(1, sum(len(t) for t in texts) // 4))
+
+def _error_status(error):
+    """HTTP status of an API error (openai's status_code, or a plain status), or None."""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status if isinstance(status, int) else None
+
+def _is_input_error(error):
+    # 400/413/422: the request itself was rejected, so retrying it unchanged cannot help
+    return _error_status(error) in (400, 413, 422)
+
+def _embed_chunk(embed_client, texts, model, rate_limiter=None, token_limiter=None):
+    """
+    Embeds one chunk with a single API call.
+
+    A chunk rejected as invalid input is retried item by item, so one bad text
+    only costs its own slot. Rate limiting (429), server errors and network
+    failures are retried as one batch with exponential backoff instead, since
+    splitting would only multiply the requests; if they persist the chunk maps to None.
+    """
+    attempt = 0
+    while True:
+        try:
+            _throttle(rate_limiter, token_limiter, texts)
+            response = _create_embeddings(embed_client, model, texts)
+            vectors = [None] * len(texts)
+            for item in response.data:
+                vectors[item.index] = item.embedding
+            return vectors
+        except Exception as e:
+            if _is_input_error(e):
+                print(f"⚠️ Batch of {len(texts)} rejected ({e}), retrying item by item")
+                break
+            if attempt >= EMBEDDING_MAX_RETRIES:
+                print(f"🔥 Batch of {len(texts)} failed after {attempt + 1} attempts: {e}")
+                return [None] * len(texts)
+            delay = min(EMBEDDING_BACKOFF_MAX, EMBEDDING_BACKOFF_BASE * 2 ** attempt)
+            print(f"⏳ Batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            attempt += 1
+
+    vectors = []
+    for text in texts:
+        try:
+            _throttle(rate_limiter, token_limiter, [text])
+            response = _create_embeddings(embed_client, model, text)
+            vectors.append(response.data[0].embedding)
+        except Exception as e:
+            print(f"🔥 Embedding error: {text[:80]}... → {e}")
+            vectors.append(None)
+    return vectors
+
+def get_embeddings(texts, model=None, batch_size=None,
+                   max_workers=None, embed_client=None, rate_limiter=None, token_limiter=None):
+    """
+    Embeds many texts with one API call per chunk, running chunks concurrently.
+    Texts already in the embedding store are not sent to the API.
+    Optional TokenBuckets cap requests (`rate_limiter`) and estimated tokens (`token_limiter`).
+    Returns a list aligned with `texts`; blank or failed texts map to None.
+    """
+    embed_client = embed_client or services.get("openai")
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    max_workers = max_workers or EMBEDDING_MAX_WORKERS
+    store = embedding_store(model)
+
+    results = store.get_many(texts)
+    pending = [(i, t.strip()) for i, t in enumerate(texts)
+               if results[i] is None and t and t.strip()]
+    metrics.cache("embeddings", hits=sum(r is not None for r in results), misses=len(pending))
+    if not pending:
+        return results
+
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    workers = max(1, min(max_workers, len(chunks)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_embed_chunk, embed_client, [t for _, t in chunk], model,
+                        rate_limiter, token_limiter)
+            for chunk in chunks
+        ]
+        for chunk, future in zip(chunks, futures):
+            for (i, _), vector in zip(chunk, future.result()):
+                results[i] = vector
+
+    store.put_many([t for _, t in pending], [results[i] for i, _ in pending])
+    return results
+
+def _nominatim_geocode(location_name):
+    """Network lookup used by the geocoder; raises on errors so they are not cached as misses."""
+    with metrics.timer("nominatim.geocode"):
+        location = services.get("geolocator").geocode(location_name, timeout=5)
+    if location:
+        coords = (location.latitude, location.longitude)
+        print(f"📍 Geocoded '{location_name}' → {coords}")
+        return coords
+    print(f"❌ No geocoding result for '{location_name}'")
+    return None
+
 def get_coordinates(location_name):
     if not location_name:
         print("⚠️ No location provided.")
         return None
-    if location_name in _geocode_cache:
-        return _geocode_cache[location_name]
     try:
-        location = geolocator.geocode(location_name, timeout=5)
-        if location:
-            coords = (location.latitude, location.longitude)
-            _geocode_cache[location_name] = coords
-            print(f"📍 Geocoded '{location_name}' → {coords}")
-            return coords
-        else:
-            print(f"❌ No geocoding result for '{location_name}'")
+        return services.get("geocoder").lookup(location_name)
     except Exception as e:
         print(f"🌍 Geocoding error for '{location_name}': {e}")
     return None
 
-def compute_geo_penalty(loc1, loc2):
+def job_id(job):
     """
-    Returns a penalty factor (0–1).
-    Farther distances reduce similarity.
-    Max penalty (0.5) at ~20,000 km.
+    Id of a job row in the job index: its Job ID column plus a hash of its text
+    (so an edited posting is re-embedded), or the text hash alone.
     """
-    coords1 = get_coordinates(loc1)
-    coords2 = get_coordinates(loc2)
+    key = text_key(job_text(job))
+    explicit = next((str(job[c]).strip() for c in JOB_ID_COLUMNS if str(job.get(c, "")).strip()), "")
+    return f"{explicit}:{key[:16]}" if explicit else key
 
-    if not coords1 or not coords2:
-        return 1.0, None  # No penalty if geocoding fails
+def index_jobs(job_rows):
+    """{job id: job}; repeats of an id get "#2", "#3"... so identical postings stay separate jobs."""
+    jobs, counts = {}, {}
+    for job in job_rows:
+        key = job_id(job)
+        counts[key] = n = counts.get(key, 0) + 1
+        jobs[key if n == 1 else f"{key}#{n}"] = job
+    return jobs
 
-    distance_km = geodesic(coords1, coords2).km
-    penalty_factor = max(0.5, 1 - (distance_km / 20000))
-    return penalty_factor, distance_km
+def with_indexed_jobs(jobs_by_id, job_ids, read):
+    """
+    Calls `read(job_index)` under the index lock once `job_ids` are indexed;
+    jobs no longer in `jobs_by_id` are dropped from the index. Missing jobs are
+    embedded with the lock released, so one slow embedding request never
+    stalls other callers; jobs that could not be embedded are left out.
+    """
+    added, failed = [], set()
+    for attempt in range(JOB_INDEX_SYNC_ROUNDS):
+        with _job_index_lock:
+            _job_index.sync(jobs_by_id)
+            if added:
+                ids, vecs = zip(*added)
+                _job_index.add_many(list(ids), list(vecs))
+                print(f"🗂️ Indexed {len(added)} new jobs ({len(_job_index)} total)")
+            missing = [j for j in job_ids if j not in _job_index and j not in failed]
+            if not missing or attempt == JOB_INDEX_SYNC_ROUNDS - 1:
+                return read(_job_index)
+        # Jobs re-embedded in a later round come from the embedding store, not the API
+        vectors = get_embeddings([job_text(jobs_by_id[j]) for j in missing])
+        added = [(j, vec) for j, vec in zip(missing, vectors) if vec]
+        failed.update(j for j, vec in zip(missing, vectors) if not vec)
 
-def match_jobs(candidate_record, job_rows):
-    summary = candidate_record.get("Summary", "").strip()
-    location = candidate_record.get("Location", "").strip()
-    full_text = f"{summary}. Location: {location}"
-    cand_emb = get_embedding(full_text)
+def get_job_vectors(jobs_by_id, job_ids):
+    """
+    Normalized vectors for `job_ids` from the job index, embedding and indexing
+    only those it has not seen. Returns (ids found, matrix).
+    """
+    return with_indexed_jobs(jobs_by_id, job_ids, lambda index: index.get_vectors(job_ids))
 
-    if cand_emb is None:
-        return []
+def resolve_locations(names):
+    """(N, 2) lat/lon array for location names via the shared coordinate table."""
+    return _coordinate_table.resolve(names, get_coordinates)
 
-    embeddings = []
-    valid_jobs = []
-    geo_data = []
+def _ranker():
+    from ranking import default_ranker  # ranking imports this module
+    return default_ranker()
 
-    for job in job_rows:
-        job_summary = job.get("Job Summary", "").strip()
-        job_location = job.get("Job Location", "").strip()
-        job_text = f"{job_summary}. Location: {job_location}"
-        emb = get_embedding(job_text)
-
-        if emb:
-            embeddings.append(emb)
-            valid_jobs.append(job)
-            penalty, distance_km = compute_geo_penalty(location, job_location)
-            geo_data.append((penalty, distance_km))
-
-    if not embeddings:
+def rank_job_ids(candidate_record, job_rows, top_n=5):
+    """match_jobs, but returns [(job id, match)] so callers can track which jobs made the list."""
+    with metrics.timer("match.rank"):
+        return _ranker().rank_ids(candidate_record, job_rows, top_n=top_n)
+
+def score_job_ids(candidate_record, jobs_by_id, job_ids):
+    """
+    Scores only `job_ids` for a candidate, exactly as match_jobs would.
+    Returns [(job id, match)] best first; jobs pruned by radius or skills, or
+    that could not be embedded, are skipped.
+    """
+    if not job_ids:
         return []
+    return _ranker().score_ids(candidate_record, jobs_by_id, job_ids)
 
-    sim_scores = cosine_similarity([cand_emb], embeddings)[0]
-    matches = []
-
-    for idx, job in enumerate(valid_jobs):
-        sim = sim_scores[idx]
-        penalty, distance_km = geo_data[idx]
-        adjusted = sim * penalty
-        summary_words = set(word.lower().strip(".,()") for word in summary.split())
-        job_words = set(word.lower().strip(".,()") for word in job.get("Job Summary", "").split())
-        overlap = summary_words & job_words
-
-        matches.append({
-            "summary": job.get("Job Summary", ""),
-            "location": job.get("Job Location", ""),
-            "score": round(float(adjusted), 4),
-            "geo_penalty": round(penalty, 4),
-            "geo_distance_km": round(distance_km, 2) if distance_km is not None else None,
-            "reason": ", ".join(overlap) or "Semantic and location match"
-        })
-
-    matches.sort(key=lambda x: x["score"], reverse=True)
-    return matches[:5]
+def match_jobs(candidate_record, job_rows, top_n=5):
+    """
+    Top jobs for a candidate from the hybrid ranker: jobs outside the candidate's
+    radius or sharing none of their skills are pruned, the rest are scored on
+    skill overlap, embedding similarity and distance.
+    """
+    return [match for _, match in rank_job_ids(candidate_record, job_rows, top_n=top_n)]
 
 def suggest_missing_skills(candidate_skills, job_text):
-    job_keywords = set(word.lower().strip(".,()") for word in job_text.split())
-    cand_keywords = set(word.lower().strip() for word in candidate_skills.split(","))
-    missing = job_keywords - cand_keywords
+    missing = token_set(job_text) - skill_set(candidate_skills)
     return list(missing)[:5]
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# Module-level settings are read at import, so every on-disk cache and external
+# service is pointed at a scratch directory before any app module is imported
+WORKDIR = tempfile.mkdtemp(prefix="tests-")
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "APP_SECRET_KEY": "test-secret",
+    "REPOSITORY_BACKEND": "sqlite",
+    "CANDIDATES_SHEET_ID": "test-candidates",
+    "USERS_SHEET_ID": "test-users",
+    "EMBEDDING_MODEL": "text-embedding-ada-002",
+    "EMBEDDING_CACHE_DIR": os.path.join(WORKDIR, "embeddings"),
+    "GEOCODE_CACHE_PATH": os.path.join(WORKDIR, "geocode.sqlite3"),
+    "LLM_CACHE_PATH": os.path.join(WORKDIR, "llm.sqlite3"),
+    "ENRICHMENT_QUEUE_PATH": os.path.join(WORKDIR, "queue.sqlite3"),
+    "MATCH_STORE_PATH": os.path.join(WORKDIR, "matches.sqlite3"),
+    "BACKFILL_CHECKPOINT_PATH": os.path.join(WORKDIR, "checkpoint.json"),
+    "BULK_IMPORT_STATUS_DIR": os.path.join(WORKDIR, "imports"),
+    "EMBEDDING_BACKOFF_BASE": "0.01",
+    "METRICS_ENABLED": "1",
+})
+
+
+@pytest.fixture
+def fake_openai():
+    """A zero-latency FakeOpenAI installed as the shared "openai" service."""
+    import services
+    from fakes import FakeOpenAI
+    client = FakeOpenAI(dim=64)
+    services.override("openai", client)
+    yield client
+    services.reset("openai")
+
+
+@pytest.fixture
+def fake_geolocator():
+    import services
+    from fakes import FakeNominatim
+    geolocator = FakeNominatim()
+    services.override("geolocator", geolocator)
+    yield geolocator
+    services.reset("geolocator")
+
+
+@pytest.fixture
+def embedding_dir(tmp_path, monkeypatch):
+    """Fresh, empty embedding stores for one test."""
+    import embedding_store
+    monkeypatch.setattr(embedding_store, "EMBEDDING_CACHE_DIR", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(embedding_store, "_stores", {})
+    return tmp_path / "embeddings"
@@ -0,0 +1,77 @@
+import socket
+
+import pytest
+import requests
+
+from adzuna_client import AdzunaClient, AdzunaError
+from candidate_registration import CandidateRegistrationSystem
+from fakes import FakeAdzunaServer
+
+
+@pytest.fixture
+def server():
+    server = FakeAdzunaServer().start()
+    yield server
+    server.stop()
+
+
+def _client(url):
+    return AdzunaClient("id", "key", base_url=url, requests_per_minute=100000)
+
+
+def _closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+@pytest.fixture
+def registration(fake_openai):
+    system = CandidateRegistrationSystem()
+    system.adzuna_app_id, system.adzuna_app_key = "id", "key"
+    return system
+
+
+def test_counts_are_cached_per_query(server):
+    client = _client(server.url)
+    first = client.count("gb", "python developer", "Leeds")
+
+    assert client.count("gb", "python developer", "Leeds") == first
+    assert server.calls == 1
+    assert client.count_many([{"country": "gb", "what": "python developer", "where": "Leeds"},
+                              {"country": "gb", "what": "chef", "where": "Leeds"}])[0] == first
+    assert server.calls == 2
+
+
+def test_http_and_decoding_failures_raise_adzuna_error(server):
+    client = _client(server.url)
+    server.error_rate = 1.0
+    with pytest.raises(AdzunaError) as error:
+        client.count("gb", "python", "Leeds")
+    assert error.value.status == 500
+
+    server.error_rate = 0.0
+    server.raw_body = b"<html>upstream proxy error</html>"
+    with pytest.raises(AdzunaError, match="malformed"):
+        client.count("gb", "java", "Leeds")
+
+
+def test_job_count_degrades_to_zero_on_every_failure(registration, server):
+    registration.adzuna = _client(server.url)
+    assert registration.query_adzuna_job_counts("Python Developer", "Leeds") > 0
+
+    server.raw_body = b"not json"
+    assert registration.query_adzuna_job_counts("Java Developer", "Leeds") == 0
+
+    registration.adzuna = _client(_closed_port_url())
+    assert registration.query_adzuna_job_counts("Chef", "Leeds") == 0
+
+
+@pytest.mark.parametrize("error", [ValueError("bad JSON"), requests.ConnectionError("reset")])
+def test_job_count_catches_unwrapped_client_errors(registration, error):
+    class BrokenClient:
+        def count(self, *args, **kwargs):
+            raise error
+
+    registration.adzuna = BrokenClient()
+    assert registration.query_adzuna_job_counts("Chef", "Leeds") == 0
@@ -0,0 +1,79 @@
+import time
+
+import adzuna_helper
+from adzuna_client import AdzunaError
+
+# The skills that unlock least are the most frequent in the ads, so they are queried first
+EXAMPLES = [
+    {"title": "Engineer", "description": "ansible golang rust docker kubernetes terraform"},
+    {"title": "Engineer", "description": "ansible golang rust"},
+    {"title": "Engineer", "description": "ansible golang"},
+]
+COUNTS = {"docker": 500, "kubernetes": 400, "terraform": 300, "ansible": 30, "golang": 20}
+# Every job in the location: no what-if search can unlock more than this minus the base count
+LOCATION_TOTAL = 10_000
+
+
+class StubClient:
+    # One worker: queries complete in submission order
+    max_workers = 1
+
+    def __init__(self, total=LOCATION_TOTAL):
+        self.total = total
+        self.queried = []
+
+    def count(self, country, what, where, distance=None):
+        if not what:
+            return self.total
+        self.queried.append(what)
+        time.sleep(0.01)
+        skill = what.split()[-1]
+        if skill == "rust":
+            raise AdzunaError("Adzuna API request failed", status=503)
+        return 100 + COUNTS.get(skill, 0)
+
+
+def _stub(monkeypatch, client=None):
+    client = client or StubClient()
+    monkeypatch.setattr(adzuna_helper, "query_jobs", lambda **kwargs: {"count": 100, "examples": EXAMPLES})
+    monkeypatch.setattr(adzuna_helper, "get_adzuna_client", lambda: client)
+    # Each skill becomes its own search term, so every candidate is queried
+    monkeypatch.setattr(adzuna_helper, "build_search_terms", lambda keywords: keywords)
+    return client
+
+
+def test_suggestions_are_the_top_counts_regardless_of_completion_order(monkeypatch):
+    _stub(monkeypatch)
+
+    suggestions = adzuna_helper.suggest_skill_expansion(["python"], "Leeds", max_skills=3)
+
+    assert suggestions == [
+        {"skill": "docker", "extra_jobs_unlocked": 500},
+        {"skill": "kubernetes", "extra_jobs_unlocked": 400},
+        {"skill": "terraform", "extra_jobs_unlocked": 300},
+    ]
+
+
+def test_failed_counts_are_skipped(monkeypatch):
+    _stub(monkeypatch)
+
+    suggestions = adzuna_helper.suggest_skill_expansion(["python"], "Leeds", max_skills=10)
+
+    assert [s["skill"] for s in suggestions] == ["docker", "kubernetes", "terraform", "ansible", "golang"]
+
+
+def test_queries_stop_once_no_remaining_skill_can_beat_the_top(monkeypatch):
+    # docker unlocks every job in the location, so kubernetes and terraform cannot beat it
+    client = _stub(monkeypatch, StubClient(total=600))
+
+    suggestions = adzuna_helper.suggest_skill_expansion(["python"], "Leeds", max_skills=1)
+
+    assert suggestions == [{"skill": "docker", "extra_jobs_unlocked": 500}]
+    assert not any(what.endswith("terraform") for what in client.queried)
+
+
+def test_candidate_skills_skip_stopwords_and_held_skills():
+    examples = [{"title": "Senior Python Engineer", "description": "python docker team experience"},
+                {"title": "Engineer", "description": "docker aws"}]
+
+    assert adzuna_helper.candidate_skills(examples, ["Python"]) == ["docker", "engineer", "aws"]
@@ -0,0 +1,146 @@
+import uuid
+
+import pytest
+
+import services
+from repository import get_users_repository, get_candidates_repository
+from sessions import fetch_profile, get_session_manager, profile_version
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import main
+    # Tests drive the queue and refresher directly; no background threads
+    monkeypatch.setattr(main, "_workers_started", True)
+    main.app.config["TESTING"] = True
+    return main.app.test_client()
+
+
+def _candidate(name="cand", **fields):
+    """Creates a candidate account and profile; returns (email, bearer headers)."""
+    email = f"{name}-{uuid.uuid4().hex[:8]}@example.com"
+    get_users_repository().append({"Name": name, "Email": email, "Password_Hash": "", "Type": "candidate"})
+    get_candidates_repository().append(dict({"Email": email, "Name": name}, **fields))
+    token = get_session_manager().start(fetch_profile(email))
+    return email, {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def registration(fake_openai, tmp_path):
+    from enrichment_queue import EnrichmentQueue
+    from candidate_registration import CandidateRegistrationSystem
+    system = CandidateRegistrationSystem()
+    system.queue = system.workers.queue = EnrichmentQueue(str(tmp_path / "queue.sqlite3"))
+    services.override("registration", system)
+    yield system
+    services.reset("registration")
+
+
+def test_registration_status_requires_the_candidates_own_session(client, registration):
+    email, headers = _candidate()
+    _, other_headers = _candidate("other")
+    registration.queue.enqueue(email, "job_title", {})
+
+    assert client.get(f"/registration_status/{email}").status_code == 302
+    assert client.get(f"/registration_status/{email}", headers=other_headers).status_code == 403
+
+    response = client.get(f"/registration_status/{email}", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["tasks"]["job_title"]["status"] == "queued"
+
+
+
+def test_registration_status_url_works_without_a_session(client, registration):
+    email = f"new-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post("/register", json={
+        "name": "New", "email": email, "skills": "python", "location": "Berlin", "summary": "Dev"})
+    assert response.status_code == 202
+    body = response.get_json()
+
+    status = client.get(body["status_url"])
+    assert status.status_code == 200
+    assert status.get_json()["tasks"]["embedding"]["status"] == "queued"
+    assert client.get(f"/registration_status/{email}",
+                      headers={"X-Status-Token": body["status_token"]}).status_code == 200
+
+    # The token is bound to its email and must carry a valid signature
+    other, _ = _candidate("other")
+    assert client.get(f"/registration_status/{other}?token={body['status_token']}").status_code == 403
+    assert client.get(f"/registration_status/{email}?token=forged").status_code == 403
+
+
+def test_registration_status_token_expires(monkeypatch):
+    import sessions
+    manager = get_session_manager()
+    token = manager.issue_status_token("Someone@Example.com ")
+    assert manager.verify_status_token(token) == "someone@example.com"
+    monkeypatch.setattr(sessions, "REGISTRATION_STATUS_MAX_AGE", -1)
+    assert manager.verify_status_token(token) is None
+
+
+@pytest.fixture
+def refresher(tmp_path):
+    from match_store import MatchRefresher, MatchStore
+    refresher = MatchRefresher(store=MatchStore(str(tmp_path / "matches.sqlite3")))
+    services.override("match_refresher", refresher)
+    yield refresher
+    services.reset("match_refresher")
+
+
+def test_match_jobs_serves_only_the_signed_in_candidate(client, refresher, fake_openai, fake_geolocator):
+    email, headers = _candidate(Summary="Python developer", Location="Leeds")
+    other, _ = _candidate("other", Summary="Chef", Location="York")
+
+    assert client.post("/match_jobs", json={"email": other}).status_code == 401
+
+    response = client.post("/match_jobs", json={"email": other}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["email"] == email
+
+
+def test_match_jobs_without_a_jobs_sheet_degrades_cleanly(client, refresher, monkeypatch, capsys):
+    import repository
+    _, headers = _candidate()
+    monkeypatch.setattr(repository, "REPOSITORY_BACKEND", "sheets")
+    monkeypatch.delenv("JOBS_SHEET_ID", raising=False)
+
+    response = client.post("/match_jobs", headers=headers)
+    assert response.status_code == 503
+    assert "JOBS_SHEET_ID" in response.get_json()["error"]
+
+    assert refresher.refresh_once() is None and refresher.refresh_once() is None
+    assert capsys.readouterr().out.count("JOBS_SHEET_ID") == 1
+
+
+def test_profile_version_matches_numericised_sheet_values():
+    assert profile_version({"Radius": "50", "Name": "Ann"}) == profile_version({"Radius": 50, "Name": "Ann"})
+
+
+def test_embedding_rewrites_leave_the_profile_version_alone():
+    email, _ = _candidate("embedded", Embedding="f32:old")
+    profile = fetch_profile(email)
+    assert "Embedding" not in profile and "Password_Hash" not in profile
+
+    get_candidates_repository().update(email, {"Embedding": "f32:new"})
+    assert profile_version(fetch_profile(email)) == profile_version(profile)
+
+
+def test_session_moved_on_by_another_worker_is_reissued(client):
+    from sessions import SESSION_COOKIE_NAME
+    email, headers = _candidate(Summary="Python developer")
+    manager = get_session_manager()
+    # Another worker edited the row; this worker's cache and the token are behind
+    get_candidates_repository().update(email, {"Summary": "Go developer"})
+    manager.cache.invalidate(email)
+
+    response = client.get("/dashboard", headers=headers)
+    assert response.status_code == 200
+    cookie = response.headers["Set-Cookie"]
+    assert cookie.startswith(f"{SESSION_COOKIE_NAME}=")
+    token = cookie.split(";", 1)[0].split("=", 1)[1]
+    assert manager.verify(token)["ver"] != manager.verify(headers["Authorization"][7:])["ver"]
+
+    hits = manager.cache.stats["hits"]
+    response = client.get("/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert "Set-Cookie" not in response.headers
+    assert manager.cache.stats["hits"] == hits + 1
@@ -0,0 +1,31 @@
+from run import compare, summarize, timed
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    result = summarize([0.001 * i for i in range(1, 101)], errors=2, wall=2.0)
+
+    assert result["ops"] == 100 and result["errors"] == 2
+    assert result["throughput_ops_s"] == 50.0
+    assert result["p50_ms"] == 51.0 and result["p99_ms"] == 100.0
+    assert summarize([], 0, 0)["p50_ms"] is None
+
+
+def test_timed_counts_false_results_and_exceptions_as_errors():
+    def op(i):
+        if i == 1:
+            raise RuntimeError("boom")
+        return i != 2
+
+    latencies, errors, _ = timed(op, range(4))
+    assert len(latencies) == 4 and errors == 2
+
+
+def test_compare_flags_only_regressions_beyond_the_tolerance():
+    baseline = {"scenarios": {"login": {"p50_ms": 10, "p99_ms": 20, "throughput_ops_s": 100},
+                              "dashboard": {"p50_ms": 5, "p99_ms": 9, "throughput_ops_s": 50}}}
+    report = {"scenarios": {"login": {"p50_ms": 10.5, "p99_ms": 30, "throughput_ops_s": 80},
+                            "dashboard": {"error": "failed"},
+                            "bulk_import": {"p50_ms": 99}}}
+
+    assert compare(report, baseline, tolerance=0.1) == [
+        "login.p99_ms: 20 → 30", "login.throughput_ops_s: 100 → 80"]
@@ -0,0 +1,59 @@
+import uuid
+
+import pytest
+
+from bulk_import import BulkImporter
+from embedding_store import is_current_cell
+from repository import get_registered_users_repository, get_candidates_repository
+from smart_matcher import candidate_text, model_spec
+
+
+def _records(n):
+    tag = uuid.uuid4().hex[:8]
+    return [{"email": f"bulk-{tag}-{i}@x.com", "name": f"N{i}", "skills": "python", "location": "Leeds",
+             "summary": f"Developer {i}"} for i in range(n)]
+
+
+def _emails(repository, records):
+    keys = repository.keys()
+    return [r["email"] in keys for r in records]
+
+
+def test_rerun_after_a_failed_candidate_write_imports_the_chunk(monkeypatch):
+    records = _records(3)
+    first = BulkImporter(registration=object(), enrich="none")
+
+    def fail(rows):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(first.candidates, "append_many", fail)
+    with pytest.raises(RuntimeError):
+        first.run([dict(r) for r in records])
+    monkeypatch.undo()
+    assert _emails(get_registered_users_repository(), records) == [False] * 3
+
+    report = BulkImporter(registration=object(), enrich="none").run([dict(r) for r in records])
+
+    assert report["imported"] == 3 and report["duplicates"] == 0
+    assert _emails(get_candidates_repository(), records) == [True] * 3
+    assert _emails(get_registered_users_repository(), records) == [True] * 3
+
+
+def test_existing_accounts_are_not_duplicated():
+    records = _records(2)
+    users = get_registered_users_repository()
+    users.append([records[0]["email"], "hash", "candidate"])
+
+    report = BulkImporter(registration=object(), enrich="none").run([dict(r) for r in records] * 2)
+
+    assert report["imported"] == 2 and report["duplicates"] == 2
+    assert [row["Email"] for row in users.all()].count(records[0]["email"]) == 1
+
+
+def test_embedding_cells_are_tagged_with_the_shared_model(fake_openai, embedding_dir):
+    records = _records(2)
+    cells = BulkImporter(registration=object(), enrich="none")._embeddings(records)
+
+    for record, cell in zip(records, cells):
+        assert is_current_cell(cell, model_spec(), candidate_text(
+            {"Summary": record["summary"], "Location": record["location"]}))
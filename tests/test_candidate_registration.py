@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+import candidate_registration
+from candidate_registration import CandidateRegistrationSystem
+from enrichment_queue import EnrichmentQueue
+
+
+@pytest.fixture
+def system(fake_openai, tmp_path):
+    system = CandidateRegistrationSystem()
+    system.queue = system.workers.queue = EnrichmentQueue(str(tmp_path / "queue.sqlite3"))
+    return system
+
+
+def _slow(result, seconds):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+    return call
+
+
+def test_title_dependent_calls_run_concurrently(system):
+    system.extract_job_title = lambda text: "Data Engineer"
+    system.query_adzuna_job_counts = _slow(42, 0.2)
+    system.generate_interview_questions = _slow(["Q1", "Q2"], 0.2)
+
+    started = time.monotonic()
+    result = system.enrich("python", "builds pipelines", "Leeds")
+
+    assert time.monotonic() - started < 0.35
+    assert result == {"job_title": "Data Engineer", "job_count": 42,
+                      "interview_questions": ["Q1", "Q2"], "pending": []}
+
+
+def test_overrunning_call_is_reported_pending(system, monkeypatch):
+    monkeypatch.setattr(candidate_registration, "ADZUNA_TIMEOUT", 0.05)
+    system.extract_job_title = lambda text: "Data Engineer"
+    system.query_adzuna_job_counts = _slow(42, 0.5)
+    system.generate_interview_questions = lambda skills, title: ["Q1"]
+
+    result = system.enrich("python", "builds pipelines", "Leeds")
+
+    assert result["job_count"] == 0
+    assert result["interview_questions"] == ["Q1"]
+    assert result["pending"] == ["job_count"]
+
+
+def test_failed_title_marks_everything_pending(system):
+    def fail(text):
+        raise RuntimeError("LLM down")
+    system.extract_job_title = fail
+
+    result = system.enrich("python", "builds pipelines", "Leeds")
+
+    assert result["job_title"] == ""
+    assert result["pending"] == ["job_title", "job_count", "interview_questions"]
+
+
+def test_embedding_task_writes_a_tagged_cell_for_the_shared_model(system, embedding_dir):
+    from embedding_store import is_current_cell
+    from repository import get_candidates_repository
+    from smart_matcher import candidate_text, model_spec, EMBEDDING_MODEL
+
+    get_candidates_repository().append({"Email": "emb@example.com", "Name": "Emb"})
+    payload = {"summary": "Builds data pipelines", "location": "Leeds"}
+    system._task_embedding("emb@example.com", payload)
+
+    cell = get_candidates_repository().get("emb@example.com")["Embedding"]
+    text = candidate_text({"Summary": payload["summary"], "Location": payload["location"]})
+    assert is_current_cell(cell, model_spec(EMBEDDING_MODEL), text)
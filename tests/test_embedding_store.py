@@ -0,0 +1,155 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+import services
+import precompute_embeddings
+from embedding_store import (serialize_embedding, deserialize_embedding, cell_format, cell_info,
+                             is_current_cell, CELL_FORMATS)
+from smart_matcher import candidate_text, embedding_store, model_spec, EMBEDDING_MODEL
+from fakes import FakeWorksheet
+
+VECTOR = np.linspace(-1, 1, 32).tolist()
+
+
+@pytest.mark.parametrize("fmt", sorted(CELL_FORMATS))
+def test_cells_round_trip_tagged_and_untagged(fmt):
+    for cell in (serialize_embedding(VECTOR, fmt),
+                 serialize_embedding(VECTOR, fmt, model="m@8", text="some text")):
+        assert cell_format(cell) == fmt
+        assert np.allclose(deserialize_embedding(cell), VECTOR, atol=0.02)
+
+
+def test_tagged_cell_records_model_dim_and_text():
+    cell = serialize_embedding(VECTOR, model="text-embedding-3-large@256", text="Hello  World")
+
+    info = cell_info(cell)
+    assert info["model"] == "text-embedding-3-large@256"
+    assert info["dim"] == len(VECTOR)
+    assert is_current_cell(cell, "text-embedding-3-large@256", "Hello World")
+    assert not is_current_cell(cell, "text-embedding-ada-002", "Hello World")
+    assert not is_current_cell(cell, "text-embedding-3-large@256", "Goodbye World")
+
+
+def test_untagged_and_legacy_cells_have_unknown_provenance():
+    legacy = base64.b64encode(json.dumps(VECTOR).encode()).decode()
+    for cell in (legacy, serialize_embedding(VECTOR, "f16")):
+        assert cell_info(cell)["model"] is None
+        assert not is_current_cell(cell, model_spec(), "anything")
+    assert deserialize_embedding(legacy) == VECTOR
+
+
+def _run_backfill(monkeypatch, tmp_path, rows, sheet=None, **kwargs):
+    sheet = sheet or FakeWorksheet("Candidates", ["Email", "Summary", "Location", "Embedding"], rows)
+    services.override("precompute_sheet", sheet)
+    monkeypatch.setattr(precompute_embeddings, "CHECKPOINT_PATH", str(tmp_path / "checkpoint.json"))
+    try:
+        precompute_embeddings.precompute_embeddings(**kwargs)
+    finally:
+        services.reset("precompute_sheet")
+    return sheet
+
+
+def test_backfill_seeds_only_cells_known_to_embed_the_key_text(monkeypatch, tmp_path, fake_openai, embedding_dir):
+    spec = model_spec(EMBEDDING_MODEL)
+    current = {"Summary": "Python developer", "Location": "Leeds"}
+    stale = {"Summary": "Java developer", "Location": "York"}
+    legacy = {"Summary": "Go developer", "Location": "Hull"}
+    bogus = [9.0] * 64
+    rows = [
+        ["a@x.com", current["Summary"], current["Location"],
+         serialize_embedding(bogus, model=spec, text=candidate_text(current))],
+        # Tagged for an older summary of this row
+        ["b@x.com", stale["Summary"], stale["Location"],
+         serialize_embedding(bogus, model=spec, text="C++ developer. Location: York")],
+        # Legacy cell holding an embedding of the summary alone
+        ["c@x.com", legacy["Summary"], legacy["Location"],
+         base64.b64encode(json.dumps(bogus).encode()).decode()],
+    ]
+
+    sheet = _run_backfill(monkeypatch, tmp_path, rows)
+    store = embedding_store(EMBEDDING_MODEL)
+
+    assert np.allclose(store.get(candidate_text(current)), bogus)
+    assert np.allclose(store.get(candidate_text(stale)), fake_openai.vector(candidate_text(stale)))
+    assert is_current_cell(sheet.grid[2][3], spec, candidate_text(stale))
+    # The legacy cell is kept but never served as the vector of the full key text
+    assert store.get(candidate_text(legacy)) is None
+    assert sheet.grid[3][3] == rows[2][3]
+
+
+def test_convert_legacy_re_embeds_untagged_cells(monkeypatch, tmp_path, fake_openai, embedding_dir):
+    row = {"Summary": "Go developer", "Location": "Hull"}
+    legacy = base64.b64encode(json.dumps([9.0] * 64).encode()).decode()
+
+    sheet = _run_backfill(monkeypatch, tmp_path, [["c@x.com", row["Summary"], row["Location"], legacy]],
+                          convert_legacy=True)
+
+    assert is_current_cell(sheet.grid[1][3], model_spec(), candidate_text(row))
+    assert np.allclose(deserialize_embedding(sheet.grid[1][3]), fake_openai.vector(candidate_text(row)), atol=0.01)
+
+
+def test_checkpoint_stops_before_the_first_failed_row(monkeypatch, tmp_path, fake_openai, embedding_dir):
+    from test_smart_matcher import ScriptedClient
+    rows = [[f"{i}@x.com", f"Developer {i}" + (" BAD" if i == 3 else ""), "Leeds", ""] for i in range(6)]
+    services.override("openai", ScriptedClient(reject="BAD"))
+
+    sheet = _run_backfill(monkeypatch, tmp_path, rows, chunk_rows=2)
+
+    # Row 5 (sheet row of candidate 3) failed; rows after it were still written
+    assert sheet.grid[4][3] == "" and all(sheet.grid[r][3] for r in (1, 2, 3, 5, 6))
+    assert precompute_embeddings.load_checkpoint("test-candidates", EMBEDDING_MODEL) == 4
+
+    # A resumed run retries the failed row without re-embedding the ones after it
+    client = ScriptedClient()
+    services.override("openai", client)
+    sheet.grid[4][1] = "Developer 3"
+    _run_backfill(monkeypatch, tmp_path, None, sheet=sheet, chunk_rows=2)
+
+    assert sheet.grid[4][3] and client.batch_sizes == [1]
+    assert precompute_embeddings.load_checkpoint("test-candidates", EMBEDDING_MODEL) == 7
+
+
+def _vector(i, dim=8):
+    return [float(i)] + [0.5] * (dim - 1)
+
+
+def test_puts_append_to_the_log_and_other_workers_replay_it(tmp_path, monkeypatch):
+    import embedding_store
+    monkeypatch.setattr(embedding_store, "EMBEDDING_JOURNAL_COMPACT_LINES", 50)
+    writer = embedding_store.EmbeddingStore("m", root=str(tmp_path), max_entries=100)
+    reader = embedding_store.EmbeddingStore("m", root=str(tmp_path), max_entries=100)
+    writer.put("first", _vector(0))
+    snapshot = (tmp_path / "m" / "index.json").read_text()
+
+    for i in range(1, 20):
+        writer.put(f"text {i}", _vector(i))
+
+    # Single puts only append to the log; the snapshot is untouched until compaction
+    assert (tmp_path / "m" / "index.json").read_text() == snapshot
+    assert reader.get("text 7") == _vector(7) and len(reader) == 20
+
+    # Rewrites of known keys outgrow the log, which is then folded into a new snapshot
+    for _ in range(3):
+        for i in range(1, 20):
+            writer.put(f"text {i}", _vector(i + 100))
+    assert (tmp_path / "m" / "index.json").read_text() != snapshot
+    assert len((tmp_path / "m" / "index.log").read_text().splitlines()) < 50
+    assert reader.get("text 7") == _vector(107) and len(reader) == 20
+    assert embedding_store.EmbeddingStore("m", root=str(tmp_path)).get("first") == _vector(0)
+
+
+def test_full_store_evicts_least_recently_used_and_reuses_their_slots(tmp_path):
+    from embedding_store import EmbeddingStore
+    store = EmbeddingStore("m", root=str(tmp_path), max_entries=4)
+    store.put_many([f"t{i}" for i in range(4)], [_vector(i) for i in range(4)])
+    store.get("t0")
+
+    store.put("t4", _vector(4))
+
+    other = EmbeddingStore("m", root=str(tmp_path))
+    assert other.get("t1") is None
+    assert [other.get(t) for t in ("t0", "t2", "t3", "t4")] == [_vector(i) for i in (0, 2, 3, 4)]
+    assert sorted(slot for slot, _ in other._entries.values()) == [0, 1, 2, 3]
@@ -0,0 +1,46 @@
+import numpy as np
+from geopy.distance import geodesic
+
+from geo import (CoordinateTable, bounding_box_mask, distances_from, geo_penalties,
+                 haversine_km, vincenty_km)
+
+LONDON = (51.5074, -0.1278)
+POINTS = np.array([(53.4808, -2.2426), (40.7128, -74.0060), (-33.8688, 151.2093), LONDON])
+
+
+def test_vincenty_matches_geopy_geodesic():
+    distances = vincenty_km(LONDON[0], LONDON[1], POINTS[:, 0], POINTS[:, 1])
+
+    expected = [geodesic(LONDON, tuple(p)).km for p in POINTS]
+    assert np.allclose(distances, expected, atol=1e-3)
+    assert np.allclose(haversine_km(LONDON[0], LONDON[1], POINTS[:, 0], POINTS[:, 1]), expected, rtol=0.005)
+
+
+def test_geo_penalties_match_the_scalar_formula():
+    distances = np.array([0.0, 1000.0, 15000.0, np.nan])
+
+    assert geo_penalties(distances).tolist() == [1.0, 0.95, 0.5, 1.0]
+
+
+def test_bounding_box_keeps_everything_within_the_radius():
+    rng = np.random.default_rng(1)
+    coords = np.column_stack([rng.uniform(49, 55, 500), rng.uniform(-6, 2, 500)])
+
+    inside = distances_from(LONDON, coords) <= 150
+    assert not (inside & ~bounding_box_mask(LONDON, coords, 150)).any()
+
+
+def test_coordinate_table_geocodes_each_name_once_and_retries_failures():
+    calls = []
+
+    def geocode(name):
+        calls.append(name)
+        return None if name == "Nowhere" else (float(len(name)), 0.0)
+
+    table = CoordinateTable()
+    first = table.resolve(["Leeds", "York", "Leeds", "Nowhere"], geocode)
+    table.resolve(["York", "Nowhere"], geocode)
+
+    assert first[:3, 0].tolist() == [5.0, 4.0, 5.0]
+    assert np.isnan(first[3]).all()
+    assert calls == ["Leeds", "York", "Nowhere", "Nowhere"]
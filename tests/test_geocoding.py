@@ -0,0 +1,63 @@
+import threading
+import time
+
+from geocoding import Geocoder
+
+LONDON = (51.5074, -0.1278)
+
+
+def test_geocoder_layers_gazetteer_sqlite_and_network(tmp_path):
+    calls = []
+
+    def geocode(name):
+        calls.append(name)
+        return (1.0, 2.0) if name != "Atlantis" else None
+
+    path = str(tmp_path / "geocode.sqlite3")
+    geocoder = Geocoder(geocode, path=path)
+    assert geocoder.lookup("london,  UK") == LONDON
+    assert geocoder.lookup("Smallville") == (1.0, 2.0)
+    assert geocoder.lookup("Atlantis") is None
+    assert geocoder.lookup("atlantis") is None
+    assert calls == ["Smallville", "Atlantis"]
+
+    # A fresh process sees both the hit and the cached miss without the network
+    restarted = Geocoder(geocode, path=path)
+    assert restarted.lookup("Smallville") == (1.0, 2.0)
+    assert restarted.lookup("Atlantis") is None
+    assert calls == ["Smallville", "Atlantis"]
+    assert restarted.stats["sqlite"] == 2
+
+
+def test_geocoder_negative_entries_expire(tmp_path):
+    calls = []
+    geocoder = Geocoder(lambda name: calls.append(name), path=str(tmp_path / "g.sqlite3"),
+                        negative_ttl=0.01, use_gazetteer=False)
+    geocoder.lookup("Atlantis")
+    time.sleep(0.02)
+    geocoder.lookup("Atlantis")
+
+    assert calls == ["Atlantis", "Atlantis"]
+
+
+def test_concurrent_lookups_share_one_network_call(tmp_path):
+    calls = []
+    release = threading.Event()
+
+    def slow_geocode(name):
+        calls.append(name)
+        release.wait(1)
+        return (3.0, 4.0)
+
+    geocoder = Geocoder(slow_geocode, path=str(tmp_path / "g.sqlite3"), use_gazetteer=False)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(geocoder.lookup("Gotham"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["Gotham"]
+    assert results == [(3.0, 4.0)] * 5
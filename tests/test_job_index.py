@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+
+import smart_matcher
+from job_index import JobIndex
+
+
+def _unit(i, dim=8):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+def test_search_returns_best_first_and_sync_drops_removed_jobs():
+    index = JobIndex()
+    index.add_many(["a", "b", "c"], [_unit(0), _unit(1), _unit(0) + _unit(1)])
+
+    assert [job for job, _ in index.search(_unit(0), k=2)] == ["a", "c"]
+    assert sorted(index.sync(["a", "d"])) == ["d"]
+    assert index.ids == ["a"]
+    assert [job for job, _ in index.search(_unit(1), k=5)] == ["a"]
+
+
+def test_ivf_search_matches_exact_search_when_probing_every_list():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 16))
+    exact = JobIndex(ivf=False)
+    ivf = JobIndex(ivf=True, nprobe=100)
+    for index in (exact, ivf):
+        index.add_many([f"j{i}" for i in range(200)], vectors)
+    ivf.build_ivf(n_lists=8)
+
+    query = rng.standard_normal(16)
+    assert [j for j, _ in ivf.search(query, 10)] == [j for j, _ in exact.search(query, 10)]
+
+
+def test_identical_postings_stay_separate_jobs():
+    job = {"Job Summary": "Python developer", "Job Location": "Leeds"}
+    jobs = smart_matcher.index_jobs([job, dict(job), dict(job, **{"Job ID": "J-7"})])
+
+    assert len(jobs) == 3
+    base = smart_matcher.job_id(job)
+    assert base in jobs and f"{base}#2" in jobs
+    assert smart_matcher.job_id(dict(job, **{"Job ID": "J-7"})).startswith("J-7:")
+
+
+def test_duplicate_job_texts_are_ranked_separately(fake_openai, fake_geolocator):
+    job = {"Job Summary": "Python developer building APIs", "Job Location": "Leeds"}
+    other = {"Job Summary": "Pastry chef", "Job Location": "Leeds"}
+    candidate = {"Summary": "Python developer", "Location": "Leeds"}
+
+    ranked = smart_matcher.rank_job_ids(candidate, [job, dict(job), other], top_n=3)
+
+    assert len(ranked) == 3
+    assert len({key for key, _ in ranked}) == 3
+    assert [m["summary"] for _, m in ranked[:2]] == [job["Job Summary"]] * 2
+
+
+def test_concurrent_catalogues_share_the_index_safely(fake_openai, fake_geolocator):
+    catalogues = [
+        [{"Job Summary": f"Role {c}-{i} engineer", "Job Location": "London"} for i in range(20)]
+        for c in range(4)
+    ]
+    candidate = {"Summary": "engineer", "Location": "London"}
+    errors, results = [], {}
+
+    def run(c):
+        try:
+            for _ in range(5):
+                results[c] = smart_matcher.rank_job_ids(candidate, catalogues[c], top_n=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(c,)) for c in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for c, ranked in results.items():
+        summaries = {job["Job Summary"] for job in catalogues[c]}
+        assert len(ranked) == 5
+        assert all(match["summary"] in summaries for _, match in ranked)
+
+
+def test_slow_embedding_does_not_hold_the_index_lock(fake_openai, embedding_dir):
+    from fakes import FakeOpenAI
+    import services
+
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingClient(FakeOpenAI):
+        def _embed(self, model, input, dimensions=None, **kwargs):
+            texts = input if isinstance(input, list) else [input]
+            if any("slow" in t for t in texts):
+                started.set()
+                release.wait(5)
+            return super()._embed(model, input, dimensions, **kwargs)
+
+    services.override("openai", BlockingClient(dim=64))
+    slow = smart_matcher.index_jobs([{"Job Summary": "slow posting", "Job Location": "Leeds"}])
+    fast = smart_matcher.index_jobs([{"Job Summary": "fast posting", "Job Location": "Leeds"}])
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(
+        slow=smart_matcher.get_job_vectors(slow, list(slow))))
+    thread.start()
+    try:
+        assert started.wait(5)
+        other = threading.Thread(target=lambda: results.update(
+            fast=smart_matcher.get_job_vectors(fast, list(fast))))
+        other.start()
+        other.join(2)
+        assert results["fast"][0] == list(fast)
+    finally:
+        release.set()
+        thread.join()
+
+    # The slow caller re-adds its job even though the fast caller's sync dropped the index meanwhile
+    assert results["slow"][0] == list(slow)
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from candidate_registration import CandidateRegistrationSystem, LLM_MODEL
+from llm_cache import CompletionCache
+
+MESSAGES = [{"role": "user", "content": "Suggest a job title for: python, sql"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompletionCache(str(tmp_path / "llm.sqlite3"))
+
+
+def test_deterministic_calls_are_cached(cache, fake_openai):
+    first = cache.complete(fake_openai, "gpt-4o-mini", MESSAGES, temperature=0.0)
+    second = cache.complete(fake_openai, "gpt-4o-mini", MESSAGES, temperature=0.0)
+
+    assert first == second
+    assert fake_openai.calls == 1
+    # A restarted worker reads the same file
+    assert CompletionCache(cache.path).complete(fake_openai, "gpt-4o-mini", MESSAGES, temperature=0.0) == first
+    assert fake_openai.calls == 1
+
+
+def test_sampled_calls_are_cached_only_with_an_explicit_key(cache, fake_openai):
+    cache.complete(fake_openai, "gpt-4o-mini", MESSAGES, temperature=0.7)
+    cache.complete(fake_openai, "gpt-4o-mini", MESSAGES, temperature=0.7)
+    assert fake_openai.calls == 2
+
+    for _ in range(2):
+        cache.complete(fake_openai, "gpt-4o-mini", MESSAGES, cache_key=("questions", "engineer"), temperature=0.7)
+    assert fake_openai.calls == 3
+
+
+def test_entries_expire_and_are_trimmed_by_last_access(tmp_path):
+    cache = CompletionCache(str(tmp_path / "llm.sqlite3"), max_entries=2)
+    cache.put("old", "m", "a", ttl=0.01)
+    cache.put("b", "m", "b")
+    cache.put("c", "m", "c")
+    cache.put("d", "m", "d")
+    time.sleep(0.02)
+    cache.get("b")
+
+    assert cache.evict() == 2
+    assert cache.get("old") is None and cache.get("c") is None
+    assert cache.get("b") == "b" and cache.get("d") == "d"
+
+
+def test_job_titles_are_batched_and_share_single_call_keys(fake_openai, tmp_path):
+    system = CandidateRegistrationSystem()
+    system.llm_cache = CompletionCache(str(tmp_path / "llm.sqlite3"))
+    summaries = ["python sql data pipelines", "react css frontend", "java spring payments"]
+
+    titles = system.extract_job_titles(summaries)
+    assert fake_openai.calls == 1
+    assert all(titles)
+
+    # Singles and repeat batches are served from the entries the batch wrote
+    assert system.extract_job_title(summaries[1]) == titles[1]
+    assert system.extract_job_titles(summaries) == titles
+    assert fake_openai.calls == 1
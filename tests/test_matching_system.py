@@ -0,0 +1,53 @@
+from matching_system import MatchingSystem
+from skill_index import SkillIndex
+
+
+def _candidate(name, email, skills):
+    return {"Name": name, "Email": email, "Skills": skills}
+
+
+def test_matches_are_ranked_by_skill_overlap_with_ties_in_sheet_order():
+    candidates = [
+        _candidate("Ann", "ann@x.com", "Python, SQL"),
+        _candidate("Bob", "bob@x.com", "python, sql, docker"),
+        _candidate("Cat", "cat@x.com", "Java"),
+        _candidate("Dan", "dan@x.com", "SQL"),
+    ]
+    matches = MatchingSystem().find_matches({"skills": "python, sql, docker"}, candidates)
+
+    assert [(m["name"], m["match_score"]) for m in matches] == [("Bob", 3), ("Ann", 2), ("Dan", 1)]
+
+
+def test_rows_sharing_an_email_are_all_matched():
+    candidates = [
+        _candidate("Ann", "ann@x.com", "Python"),
+        _candidate("Ann (2nd profile)", "ann@x.com", "Python, SQL"),
+        _candidate("No email", "", "Python"),
+        _candidate("Also no email", "", "SQL"),
+    ]
+    matches = MatchingSystem().find_matches({"skills": "python, sql"}, candidates)
+
+    assert sorted(m["name"] for m in matches) == ["Also no email", "Ann", "Ann (2nd profile)", "No email"]
+
+
+def test_sync_reparses_only_edited_candidates_and_drops_removed_ones():
+    system = MatchingSystem()
+    candidates = [_candidate("Ann", "ann@x.com", "Python"), _candidate("Bob", "bob@x.com", "Go")]
+    system.find_matches({"skills": "python"}, candidates)
+    vocab = dict(system.index.vocab)
+
+    candidates = [_candidate("Ann", "ann@x.com", "Rust")]
+    matches = system.find_matches({"skills": "rust, go"}, candidates)
+
+    assert [m["name"] for m in matches] == ["Ann"]
+    assert len(system.index) == 1
+    assert set(vocab) < set(system.index.vocab)
+
+
+def test_batch_scoring_matches_single_queries():
+    index = SkillIndex()
+    for i, skills in enumerate(["a, b", "b, c", "c", "a, b, c"]):
+        index.add(i, f"cand{i}", skills)
+    jobs = ["a, b", "c", "z"]
+
+    assert index.score_jobs(jobs, k=10) == [index.match(job) for job in jobs]
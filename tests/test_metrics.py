@@ -0,0 +1,44 @@
+import pytest
+
+from metrics import Histogram, Registry
+
+
+def test_histogram_quantiles_stay_within_bucket_bounds():
+    histogram = Histogram()
+    for ms in [0.5] * 50 + [7.0] * 49 + [300.0]:
+        histogram.observe(ms)
+
+    assert histogram.count == 100 and histogram.max == 300.0
+    assert 0 < histogram.quantile(0.5) <= 1
+    assert 5 <= histogram.quantile(0.99) <= 10
+    assert histogram.quantile(1.0) == 300.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_timer_records_errors_and_cache_ratios():
+    registry = Registry()
+    with registry.timer("stage"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.timer("stage"):
+            raise ValueError()
+    registry.cache("embeddings", hits=3, misses=1)
+
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["stage"]["count"] == 2
+    assert snapshot["counters"] == {"stage.errors": 1}
+    assert snapshot["caches"]["embeddings"] == {"hits": 3, "misses": 1, "hit_ratio": 0.75}
+
+
+def test_prometheus_buckets_are_cumulative():
+    registry = Registry()
+    for ms in (0.5, 3.0, 20000.0):
+        registry.observe("sheets.batch_get", ms)
+    registry.inc("logins")
+
+    text = registry.prometheus()
+    assert 'app_events_total{name="logins"} 1' in text
+    assert 'app_stage_duration_ms_bucket{stage="sheets.batch_get",le="1"} 1' in text
+    assert 'app_stage_duration_ms_bucket{stage="sheets.batch_get",le="5"} 2' in text
+    assert 'app_stage_duration_ms_bucket{stage="sheets.batch_get",le="+Inf"} 3' in text
+    assert 'app_stage_duration_ms_count{stage="sheets.batch_get"} 3' in text
@@ -0,0 +1,106 @@
+import pytest
+
+import smart_matcher
+from match_store import MatchStore
+from ranking import HybridRanker, parse_radius
+
+JOBS = [
+    {"Job Summary": "Python developer building data APIs", "Job Location": "London"},
+    {"Job Summary": "Java developer on payment systems", "Job Location": "London"},
+    {"Job Summary": "Python developer for analytics", "Job Location": "Manchester"},
+    {"Job Summary": "Pastry chef", "Job Location": "London"},
+]
+
+
+def _candidate(**fields):
+    return dict({"Email": "ann@x.com", "Summary": "developer", "Location": "London",
+                 "Skills": "python, java", "Radius": "50"}, **fields)
+
+
+def _summaries(matches):
+    return [m["summary"] for m in matches]
+
+
+@pytest.fixture(autouse=True)
+def fakes(fake_openai, fake_geolocator, embedding_dir):
+    pass
+
+
+def test_parse_radius_falls_back_on_blank_or_invalid_values():
+    assert parse_radius("25") == 25.0
+    assert parse_radius("") == parse_radius("abc") == parse_radius("-5") == 50.0
+
+
+def test_radius_prunes_jobs_outside_the_candidates_area():
+    near = smart_matcher.match_jobs(_candidate(Radius="50"), JOBS, top_n=5)
+    wide = smart_matcher.match_jobs(_candidate(Radius="400"), JOBS, top_n=5)
+
+    assert JOBS[2]["Job Summary"] not in _summaries(near)
+    assert JOBS[2]["Job Summary"] in _summaries(wide)
+    assert all(m["geo_distance_km"] <= 50 for m in near)
+
+
+def test_skills_prune_and_reorder_jobs():
+    python = smart_matcher.match_jobs(_candidate(Skills="python"), JOBS, top_n=5)
+    java = smart_matcher.match_jobs(_candidate(Skills="java"), JOBS, top_n=5)
+
+    assert _summaries(python) == [JOBS[0]["Job Summary"]]
+    assert _summaries(java) == [JOBS[1]["Job Summary"]]
+    assert python[0]["skill_overlap"] == 1 and python[0]["reason"] == "developer"
+
+
+def test_more_shared_skills_rank_higher():
+    jobs = [
+        {"Job Summary": "Engineer", "Job Location": "London", "Job Skills": "python"},
+        {"Job Summary": "Engineer", "Job Location": "London", "Job Skills": "python, sql, docker"},
+    ]
+    ranked = HybridRanker(weights={"skill": 1, "embedding": 0, "geo": 0}).rank(
+        _candidate(Skills="python, sql, docker"), jobs, top_n=2)
+
+    assert [m["skill_overlap"] for m in ranked] == [3, 1]
+
+
+def test_incremental_scores_match_full_ranking(tmp_path):
+    candidate = _candidate(Radius="400")
+    ranked = dict(smart_matcher.rank_job_ids(candidate, JOBS, top_n=10))
+    jobs_by_id = smart_matcher.index_jobs(JOBS)
+    added = list(jobs_by_id)[2:]
+
+    scored = dict(smart_matcher.score_job_ids(candidate, jobs_by_id, added))
+
+    assert scored and all(scored[key] == ranked[key] for key in scored)
+    assert smart_matcher.job_id(JOBS[3]) not in scored
+
+
+def test_match_store_recompute_uses_the_hybrid_ranking(tmp_path):
+    store = MatchStore(str(tmp_path / "matches.sqlite3"), top_n=5)
+    view = store.recompute(_candidate(Skills="python"), JOBS)
+
+    assert _summaries(view["matches"]) == [JOBS[0]["Job Summary"]]
+
+
+def test_jobs_whose_location_does_not_geocode_are_kept_without_penalty():
+    jobs = JOBS[:1] + [{"Job Summary": "Python developer, fully remote", "Job Location": "Nowhere"}]
+    ranked = smart_matcher.match_jobs(_candidate(Skills="python"), jobs, top_n=5)
+
+    remote = next(m for m in ranked if m["location"] == "Nowhere")
+    assert remote["geo_penalty"] == 1.0 and remote["geo_distance_km"] is None
+
+    strict = HybridRanker(keep_unknown_locations=False).rank(_candidate(Skills="python"), jobs)
+    assert [m["location"] for m in strict] == ["London"]
+
+
+def test_top_n_ranking_reads_the_job_index_search(monkeypatch):
+    from job_index import JobIndex
+    calls = []
+    search = JobIndex.search
+    monkeypatch.setattr(JobIndex, "search", lambda self, q, k=5: calls.append(k) or search(self, q, k))
+    jobs = [{"Job Summary": f"Python developer {i}", "Job Location": "London"} for i in range(30)]
+
+    ranked = smart_matcher.rank_job_ids(_candidate(Skills="python"), jobs, top_n=3)
+    jobs_by_id = smart_matcher.index_jobs(jobs)
+    exact = smart_matcher.score_job_ids(_candidate(Skills="python"), jobs_by_id, list(jobs_by_id))[:3]
+
+    assert calls and calls[0] == 12
+    assert [key for key, _ in ranked] == [key for key, _ in exact]
+    assert all(0.5 <= m["geo_penalty"] <= 1.0 for _, m in ranked)
@@ -0,0 +1,107 @@
+import pytest
+
+from repository import Repository, SheetsBackend, SQLiteBackend, CANDIDATE_COLUMNS
+from fakes import FakeWorksheet
+
+
+def _sqlite_repository(tmp_path, name="candidates", **kwargs):
+    backend = SQLiteBackend(name, CANDIDATE_COLUMNS, path=str(tmp_path / "repo.sqlite3"))
+    return Repository(backend, **kwargs)
+
+
+def test_lookups_are_served_from_one_fetch(tmp_path):
+    repo = _sqlite_repository(tmp_path)
+    repo.append_many([{"Email": "Ann@X.com", "Name": "Ann"}, {"Email": "bob@x.com", "Name": "Bob"}])
+    repo.invalidate()
+
+    assert repo.get(" ann@x.com ")["Name"] == "Ann"
+    assert repo.get("BOB@x.com")["Name"] == "Bob"
+    assert repo.exists("ann@x.com")
+    assert repo.fetches == 1
+    assert repo.row_number("bob@x.com") == 3
+
+
+def test_miss_refetches_to_see_other_workers_rows(tmp_path):
+    repo = _sqlite_repository(tmp_path, miss_refresh=0)
+    other_worker = _sqlite_repository(tmp_path)
+    repo.all()
+
+    other_worker.append({"Email": "new@x.com", "Name": "New"})
+
+    assert repo.get("new@x.com")["Name"] == "New"
+    assert repo.get("missing@x.com") is None
+    assert repo.misses == 1
+
+
+def test_miss_refresh_is_rate_limited(tmp_path):
+    repo = _sqlite_repository(tmp_path, miss_refresh=3600)
+    repo.all()
+    for _ in range(5):
+        assert repo.get("missing@x.com") is None
+    assert repo.fetches == 1
+
+
+def test_update_writes_through_and_bumps_the_version(tmp_path):
+    repo = _sqlite_repository(tmp_path)
+    repo.append({"Email": "ann@x.com", "Name": "Ann", "Location": "Leeds"})
+    version = repo.version
+
+    repo.update("ann@x.com", {"Location": "York"})
+
+    assert repo.get("ann@x.com")["Location"] == "York"
+    assert repo.version > version
+    repo.invalidate()
+    assert repo.get("ann@x.com")["Location"] == "York"
+    with pytest.raises(KeyError):
+        repo.update("nobody@x.com", {"Location": "York"})
+
+
+def test_sheets_backend_reads_once_and_appends_rows():
+    sheet = FakeWorksheet("Candidates", CANDIDATE_COLUMNS, [["ann@x.com", "Ann"]])
+    repo = Repository(SheetsBackend(lambda: sheet))
+
+    assert repo.get("ann@x.com")["Name"] == "Ann"
+    repo.append_many([{"Email": "bob@x.com", "Name": "Bob"}])
+
+    assert repo.get("bob@x.com")["Name"] == "Bob"
+    assert repo.fetches == 1
+    assert sheet.grid[-1][:2] == ["bob@x.com", "Bob"]
+
+
+def test_update_reloads_when_rows_moved_under_the_cache():
+    sheet = FakeWorksheet("Candidates", CANDIDATE_COLUMNS, [["ann@x.com", "Ann"], ["bob@x.com", "Bob"]])
+    repo = Repository(SheetsBackend(lambda: sheet))
+    assert repo.row_number("bob@x.com") == 3
+
+    # Another writer inserts a row above Bob's
+    sheet.grid.insert(1, ["zed@x.com", "Zed"])
+    repo.update("bob@x.com", {"Location": "York"})
+
+    location = CANDIDATE_COLUMNS.index("Location")
+    assert sheet.grid[3][:2] == ["bob@x.com", "Bob"] and sheet.grid[3][location] == "York"
+    assert all(len(row) <= location or row[location] == "" for row in sheet.grid[1:3])
+    assert repo.get("bob@x.com")["Location"] == "York"
+
+
+def _gappy_sheet():
+    """Rows at data positions 0-3 and 6, with blank rows between them and at the end of the first block."""
+    header = ["Email", "Name", "Radius"]
+    rows = [[f"{i}@x.com", f"N{i}", i] for i in range(4)] + [["", "", ""], ["", "", ""], ["6@x.com", "N6", 6]]
+    return FakeWorksheet("Candidates", header, rows + [["", "", ""]] * 3)
+
+
+def test_streaming_reads_past_blank_rows_to_the_last_row():
+    from sheet_reader import RecordReader
+    reader = RecordReader(_gappy_sheet(), ["Email", "Radius"], block_rows=3)
+
+    assert [r["Email"] for r in reader.iter_records()] == ["0@x.com", "1@x.com", "2@x.com", "3@x.com", "6@x.com"]
+    assert [r["Radius"] for r in reader.iter_records(offset=3, limit=2)] == [3]
+    assert [len(records) for records, _ in (reader.page(1, 4), reader.page(2, 4))] == [4, 1]
+    assert reader.page(1, 4)[1] and not reader.page(2, 4)[1]
+
+
+def test_projected_loads_keep_sheet_row_numbers_across_blank_rows():
+    repo = Repository(SheetsBackend(lambda: _gappy_sheet(), ["Email", "Name"]))
+
+    assert repo.row_number("6@x.com") == 8
+    assert len(repo.all()) == 7
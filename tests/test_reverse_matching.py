@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from embedding_store import serialize_embedding
+from reverse_matching import CandidateMatrix, EmbeddingMismatch, ReverseMatcher
+from smart_matcher import candidate_text, model_spec
+
+
+def _candidate(name, cell=None, **fields):
+    record = dict({"Email": f"{name}@x.com", "Name": name, "Summary": f"{name} developer", "Location": ""},
+                  **fields)
+    record["Embedding"] = cell(record) if cell else ""
+    return record
+
+
+def _current(fake_openai):
+    return lambda r: serialize_embedding(fake_openai.vector(candidate_text(r)), "f32",
+                                         model=model_spec(), text=candidate_text(r))
+
+
+def test_only_current_cells_are_used_and_the_rest_are_queued(fake_openai, embedding_dir):
+    rows = [
+        _candidate("current", _current(fake_openai)),
+        _candidate("other", lambda r: serialize_embedding(np.ones(64), "f32", model="other-model",
+                                                          text=candidate_text(r))),
+        _candidate("edited", lambda r: serialize_embedding(np.ones(64), "f32", model=model_spec(),
+                                                           text="an older summary")),
+        # Untagged (legacy) cells are never trusted, whatever their size
+        _candidate("untagged", lambda r: serialize_embedding(fake_openai.vector(candidate_text(r)), "f32")),
+        _candidate("pending"),
+    ]
+    queued = []
+    matrix = CandidateMatrix(reembed=queued.extend)
+    calls = fake_openai.calls
+
+    assert matrix.sync(rows, dim=64) == 1
+    assert len(matrix) == 1 and matrix.record(0)["Email"] == "current@x.com"
+    assert [r["Email"] for r in queued] == ["other@x.com", "edited@x.com", "untagged@x.com"]
+    assert fake_openai.calls == calls
+
+    # Each stale cell is queued once; the queue's rewritten cell is picked up by the next sync
+    matrix.sync(rows, dim=64)
+    assert len(queued) == 3
+    rows[1]["Embedding"] = _current(fake_openai)(rows[1])
+    assert matrix.sync(rows, dim=64) == 1
+    assert len(matrix) == 2 and len(queued) == 3
+
+
+def test_stale_rows_go_to_the_enrichment_queue(fake_openai, embedding_dir, tmp_path):
+    import main  # noqa: F401 (registers the "registration" service)
+    import services
+    from enrichment_queue import EnrichmentQueue
+    from candidate_registration import CandidateRegistrationSystem
+    system = CandidateRegistrationSystem()
+    system.queue = EnrichmentQueue(str(tmp_path / "queue.sqlite3"))
+    services.override("registration", system)
+    try:
+        row = _candidate("legacy", lambda r: serialize_embedding(np.ones(64), "f32"), Location="Berlin")
+        CandidateMatrix().sync([row], dim=64)
+        assert system.enrichment_status("legacy@x.com")["tasks"]["embedding"]["status"] == "queued"
+    finally:
+        services.reset("registration")
+
+
+def test_query_from_another_model_is_a_configuration_error(fake_openai, embedding_dir):
+    matrix = CandidateMatrix(reembed=list)
+    matrix.sync([_candidate("a", _current(fake_openai))], dim=64)
+
+    with pytest.raises(EmbeddingMismatch, match="EMBEDDING_DIMENSIONS"):
+        matrix.score(np.ones(32))
+
+
+def test_rank_serves_candidates_whatever_the_first_rows_size(fake_openai, fake_geolocator, embedding_dir):
+    rows = [
+        _candidate("short", lambda r: serialize_embedding(np.ones(16), "f32")),
+        _candidate("python", _current(fake_openai)),
+        _candidate("java", _current(fake_openai)),
+    ]
+    matcher = ReverseMatcher()
+    matcher.matrix.reembed = list
+
+    result = matcher.rank({"Job Summary": "python developer"}, rows)
+
+    assert result["total"] == 2
+    assert result["results"][0]["email"] == "python@x.com"
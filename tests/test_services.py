@@ -0,0 +1,38 @@
+import threading
+
+import services
+
+
+def test_services_are_built_once_on_first_use():
+    calls = []
+    service = services.LazyService("thing", lambda: calls.append(1) or object())
+    assert not service.created
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert service.created and service.init_ms is not None
+
+
+def test_override_and_reset_swap_the_instance():
+    services.register("test-service", lambda: "real")
+    try:
+        services.override("test-service", "fake")
+        assert services.get("test-service") == "fake"
+        services.reset("test-service")
+        assert services.get("test-service") == "real"
+        assert services.startup_report()["services"]["test-service"]["created"]
+    finally:
+        services.reset("test-service")
+
+
+def test_registering_again_keeps_the_first_factory():
+    first = services.register("test-once", lambda: "first")
+    assert services.register("test-once", lambda: "second") is first
+    assert services.get("test-once") == "first"
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import sheets
+
+
+class FakeCreds:
+    def __init__(self):
+        self.valid = True
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.valid = True
+
+
+class FakeSpreadsheet:
+    def __init__(self, name):
+        self.name = name
+
+    def get_worksheet(self, index):
+        return SimpleNamespace(spreadsheet=self.name, index=index)
+
+
+def _manager(monkeypatch):
+    manager = sheets.SheetsClientManager()
+    opened = []
+
+    def build():
+        manager._creds = FakeCreds()
+        manager._client = SimpleNamespace(
+            open_by_key=lambda key: opened.append(key) or FakeSpreadsheet(key),
+            open=lambda name: opened.append(name) or FakeSpreadsheet(name),
+        )
+
+    monkeypatch.setattr(manager, "_build_client", build)
+    monkeypatch.setattr(sheets, "Request", lambda: None)
+    return manager, opened
+
+
+def test_client_and_handles_are_built_once(monkeypatch):
+    manager, opened = _manager(monkeypatch)
+
+    first = manager.worksheet(key="sheet-1")
+    assert manager.worksheet(key="sheet-1") is first
+    manager.worksheet(key="sheet-1", index=1)
+    manager.worksheet(name="Users")
+
+    assert opened == ["sheet-1", "Users"]
+    stats = manager.stats()
+    assert stats["client_misses"] == 1
+    assert stats["worksheet_hits"] == 1
+    assert stats["spreadsheet_hits"] == 1
+    assert stats["worksheets_cached"] == 3
+
+
+def test_expired_token_is_refreshed_without_rebuilding(monkeypatch):
+    manager, _ = _manager(monkeypatch)
+    client = manager.client()
+    manager._creds.valid = False
+
+    assert manager.client() is client
+    assert manager._creds.refreshes == 1
+    assert manager.stats()["token_refreshes"] == 1
+
+
+def test_reset_drops_cached_handles(monkeypatch):
+    manager, opened = _manager(monkeypatch)
+    manager.worksheet(key="sheet-1")
+    manager.reset()
+    manager.worksheet(key="sheet-1")
+
+    assert opened == ["sheet-1", "sheet-1"]
+    assert manager.stats()["client_misses"] == 2
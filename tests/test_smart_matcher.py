@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import smart_matcher
+from fakes import FakeOpenAI, FakeServiceError
+
+
+class ScriptedClient(FakeOpenAI):
+    """FakeOpenAI whose batch calls fail with scripted statuses before succeeding."""
+
+    def __init__(self, failures=(), reject=None):
+        super().__init__(dim=16)
+        self.failures = list(failures)
+        self.reject = reject
+        self.batch_sizes = []
+
+    def _embed(self, model, input, dimensions=None, **kwargs):
+        texts = input if isinstance(input, list) else [input]
+        self.batch_sizes.append(len(texts))
+        if self.failures:
+            raise FakeServiceError("scripted failure", status=self.failures.pop(0))
+        if self.reject and any(self.reject in t for t in texts):
+            raise FakeServiceError("invalid input", status=400)
+        return super()._embed(model, input, dimensions, **kwargs)
+
+
+def test_input_error_falls_back_to_single_items(embedding_dir):
+    client = ScriptedClient(reject="BAD")
+    vectors = smart_matcher.get_embeddings(["one", "BAD text", "three"], embed_client=client)
+
+    assert vectors[0] is not None and vectors[2] is not None
+    assert vectors[1] is None
+    assert client.batch_sizes == [3, 1, 1, 1]
+
+
+def test_rate_limited_batch_is_retried_whole(embedding_dir):
+    client = ScriptedClient(failures=[429, 503])
+    vectors = smart_matcher.get_embeddings(["alpha", "beta", "gamma"], embed_client=client)
+
+    assert all(v is not None for v in vectors)
+    # Two backoffs, then one successful batch call; never split into single items
+    assert client.batch_sizes == [3, 3, 3]
+
+
+def test_persistent_server_errors_give_up_without_per_item_calls(embedding_dir, monkeypatch):
+    monkeypatch.setattr(smart_matcher, "EMBEDDING_MAX_RETRIES", 2)
+    client = ScriptedClient(failures=[500] * 10)
+    vectors = smart_matcher.get_embeddings(["alpha", "beta"], embed_client=client)
+
+    assert vectors == [None, None]
+    assert client.batch_sizes == [2, 2, 2]
+
+
+def test_batches_are_chunked_and_cached(embedding_dir):
+    client = ScriptedClient()
+    texts = [f"text {i}" for i in range(7)]
+    first = smart_matcher.get_embeddings(texts, embed_client=client, batch_size=3)
+    second = smart_matcher.get_embeddings(texts, embed_client=client, batch_size=3)
+
+    assert sorted(client.batch_sizes) == [1, 3, 3]
+    assert first == second
+
+
+def test_error_status_reads_openai_and_plain_errors():
+    assert smart_matcher._error_status(SimpleNamespace(status_code=429)) == 429
+    assert smart_matcher._error_status(FakeServiceError("x", status=400)) == 400
+    assert smart_matcher._error_status(ValueError("x")) is None
+
+
+
+def _settings_in_fresh_process(**env):
+    """(EMBEDDING_MODEL, model_spec()) as a new process with only `env` embedding settings sees them."""
+    import os
+    import subprocess
+    import sys
+    base = {k: v for k, v in os.environ.items() if k not in ("EMBEDDING_MODEL", "EMBEDDING_DIMENSIONS")}
+    code = "import smart_matcher as m; print(m.EMBEDDING_MODEL, m.model_spec())"
+    result = subprocess.run([sys.executable, "-c", code], env=dict(base, **env), capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(smart_matcher.__file__))
+    return result.stdout.split()[-2:]
+
+
+def test_default_model_is_text_embedding_3_large_and_truncatable():
+    assert _settings_in_fresh_process() == ["text-embedding-3-large", "text-embedding-3-large"]
+    assert _settings_in_fresh_process(EMBEDDING_DIMENSIONS="256") == [
+        "text-embedding-3-large", "text-embedding-3-large@256"]
@@ -0,0 +1,34 @@
+import text_tokens
+from smart_matcher import suggest_missing_skills
+from text_tokens import token_set, skill_set, overlap_count, overlap_counts, tokenize
+
+
+def test_token_sets_match_the_original_tokenization():
+    text = "Python (Django), SQL. Python developer"
+
+    assert token_set(text) == tokenize(text) == {"python", "django", "sql", "developer"}
+    assert skill_set("Python, SQL , docker") == {"python", "sql", "docker"}
+
+
+def test_token_sets_are_cached_per_text():
+    text_tokens.clear_cache()
+    first = token_set("cached text here")
+    second = token_set("cached text here")
+
+    assert first is second
+    assert text_tokens.stats == {"hits": 1, "misses": 1}
+
+
+def test_overlap_counts_agree_with_set_intersections():
+    text = "python sql docker aws"
+    others = ["python developer", "SQL and Docker", "pastry chef", ""]
+
+    expected = [len(token_set(text) & token_set(o)) for o in others]
+    assert overlap_counts(text, others).tolist() == expected == [1, 2, 0, 0]
+    assert overlap_count(text, others[1]) == 2
+
+
+def test_missing_skills_are_job_words_the_candidate_lacks():
+    missing = suggest_missing_skills("python, sql", "Python and Docker")
+
+    assert sorted(missing) == ["and", "docker"]
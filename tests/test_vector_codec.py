@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from vector_codec import QuantizedMatrix, dequantize, quantize, truncate
+
+
+def _unit_rows(n, dim, seed=0):
+    rows = np.random.default_rng(seed).standard_normal((n, dim))
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_int8_round_trip_error_is_within_half_a_step():
+    rows = _unit_rows(20, 64)
+    codes, scales = quantize(rows, "int8")
+
+    assert codes.dtype == np.int8
+    assert np.abs(dequantize(codes, scales) - rows).max() <= scales.max() / 2 + 1e-6
+
+
+@pytest.mark.parametrize("codec,tolerance", [("float32", 1e-6), ("float16", 1e-3), ("int8", 0.02)])
+def test_scores_approximate_cosine_similarity(codec, tolerance):
+    rows, query = _unit_rows(300, 64), _unit_rows(1, 64, seed=1)[0] * 3.0
+    matrix = QuantizedMatrix(64, codec=codec, capacity=4)
+    matrix.grow(len(rows), 0)
+    for i, row in enumerate(rows):
+        matrix.set(i, row)
+
+    expected = rows @ (query / np.linalg.norm(query))
+    assert np.abs(matrix.scores(query, len(rows)) - expected).max() < tolerance
+    assert matrix.exact == (codec == "float32")
+
+
+def test_truncated_matrix_scores_the_leading_dimensions():
+    rows, query = _unit_rows(10, 32), _unit_rows(1, 32, seed=2)[0]
+    matrix = QuantizedMatrix(32, codec="float32", dims=8)
+    for i, row in enumerate(rows):
+        matrix.set(i, row)
+
+    assert not matrix.exact and matrix.codes.shape[1] == 8
+    assert np.allclose(matrix.scores(query, 10), truncate(rows, 8) @ truncate(query, 8), atol=1e-6)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="Unknown vector codec"):
+        QuantizedMatrix(8, codec="int4")
@@ -0,0 +1,82 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Token sets are cached per document text, next to the embeddings the matcher reuses
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0}
+
+
+def normalize_word(word):
+    return word.lower().strip(".,()")
+
+
+def tokenize(text):
+    """Set of normalized words in `text` (the tokenization match_jobs has always used)."""
+    return set(normalize_word(word) for word in (text or "").split())
+
+
+def parse_skill_list(text):
+    """Set of comma-separated skills, lowercased and trimmed."""
+    return set(word.lower().strip() for word in (text or "").split(","))
+
+
+def hash_token(token):
+    """Stable 63-bit id for a token (same value in every process)."""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") >> 1
+
+
+def _cached(kind, text, build):
+    key = (kind, text or "")
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            stats["hits"] += 1
+            return entry
+    entry = build(text)
+    with _lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        stats["misses"] += 1
+        while len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def token_set(text):
+    """Cached frozenset of normalized words for a document."""
+    return _cached("words", text, lambda t: frozenset(tokenize(t)))
+
+
+def skill_set(text):
+    """Cached frozenset of comma-separated skills."""
+    return _cached("skills", text, lambda t: frozenset(parse_skill_list(t)))
+
+
+def token_ids(text):
+    """Cached sorted array of hashed token ids, for vectorized overlap counts."""
+    return _cached("ids", text, lambda t: np.unique(
+        np.fromiter((hash_token(w) for w in token_set(t)), dtype=np.uint64)))
+
+
+def overlap_count(text_a, text_b):
+    return len(np.intersect1d(token_ids(text_a), token_ids(text_b), assume_unique=True))
+
+
+def overlap_counts(text, others):
+    """Overlap size between one document and each of `others`, as an int array."""
+    ids = token_ids(text)
+    return np.array([len(np.intersect1d(ids, token_ids(o), assume_unique=True)) for o in others],
+                    dtype=np.int64)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        stats["hits"] = stats["misses"] = 0
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+
+# --- Compact vector settings ---
+# In-memory search precision: "float32", "float16" or "int8" (per-vector scale)
+VECTOR_CODEC = os.getenv("VECTOR_CODEC", "int8")
+# Leading dimensions kept for the in-memory scan (Matryoshka truncation); 0 keeps all
+VECTOR_SEARCH_DIMS = int(os.getenv("VECTOR_SEARCH_DIMS", "0"))
+# Size of the float32 temporary a scan converts one block of rows into (cache-sized is fastest)
+VECTOR_SCAN_BLOCK_BYTES = int(os.getenv("VECTOR_SCAN_BLOCK_KB", "1024")) * 1024
+
+CODECS = ("float32", "float16", "int8")
+
+
+def truncate(vectors, dims):
+    """
+    Keeps the first `dims` components and re-normalizes (Matryoshka truncation,
+    as the API's `dimensions` parameter does). Accepts one vector or a matrix.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dims and dims < vectors.shape[-1]:
+        vectors = vectors[..., :dims]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def quantize(vectors, codec):
+    """
+    (codes, scales) for a matrix of vectors. int8 stores round(x / scale) with
+    scale = max|x| / 127 per row; float codecs use a scale of 1.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if codec == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    if codec in ("float16", "float32"):
+        return vectors.astype(codec), np.ones(len(vectors), dtype=np.float32)
+    raise ValueError(f"Unknown vector codec '{codec}' (expected one of {CODECS})")
+
+
+def dequantize(codes, scales):
+    return np.atleast_2d(codes).astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+class QuantizedMatrix:
+    """
+    Growable matrix of unit vectors held as codes plus one float32 scale per
+    row, optionally truncated to the leading `dims` components. Scores are
+    approximate cosine similarities, computed block by block so a scan over
+    millions of int8 rows never materializes a full float32 copy.
+    """
+
+    def __init__(self, dim, codec=None, dims=None, capacity=1024):
+        self.codec = codec or VECTOR_CODEC
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown vector codec '{self.codec}' (expected one of {CODECS})")
+        dims = VECTOR_SEARCH_DIMS if dims is None else dims
+        self.full_dim = dim
+        self.dim = min(dims, dim) if dims else dim
+        self.capacity = capacity
+        self.codes = np.zeros((capacity, self.dim), dtype=self.codec)
+        self.scales = np.ones(capacity, dtype=np.float32)
+
+    @property
+    def exact(self):
+        """True when scores equal full-precision cosine similarity (no truncation or rounding)."""
+        return self.codec == "float32" and self.dim == self.full_dim
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def bytes_per_vector(self):
+        return self.codes.itemsize * self.dim + self.scales.itemsize
+
+    def grow(self, n, size):
+        """Ensures room for `n` rows, keeping the first `size`."""
+        if n <= self.capacity:
+            return
+        capacity = max(self.capacity, 1)
+        while capacity < n:
+            capacity *= 2
+        codes = np.zeros((capacity, self.dim), dtype=self.codec)
+        scales = np.ones(capacity, dtype=np.float32)
+        codes[:size], scales[:size] = self.codes[:size], self.scales[:size]
+        self.codes, self.scales, self.capacity = codes, scales, capacity
+
+    def set(self, row, vector):
+        codes, scales = quantize(truncate(vector, self.dim), self.codec)
+        self.codes[row], self.scales[row] = codes[0], scales[0]
+
+    def move(self, dst, src):
+        self.codes[dst], self.scales[dst] = self.codes[src], self.scales[src]
+
+    def scores(self, query, n):
+        """Approximate cosine similarity of rows [0, n) to `query` (full-dimension, any norm)."""
+        q = truncate(query, self.dim)
+        out = np.empty(n, dtype=np.float32)
+        block = max(1, VECTOR_SCAN_BLOCK_BYTES // (4 * self.dim))
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            out[start:stop] = np.asarray(self.codes[start:stop], dtype=np.float32) @ q
+        if self.codec == "int8":
+            out *= self.scales[:n]
+        return out